@@ -0,0 +1,252 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The benchmark cases of the hot paths in PaddleSlim.
+
+The sizes of model cases are 'mobilenet_<scale>' and 'resnet<depth>', built
+by the MobileNet and ResNet in paddleslim.models.
+"""
+
+import os
+import shutil
+import tempfile
+import numpy as np
+import paddle
+from harness import register
+
+paddle.enable_static()
+
+MODEL_SIZES = [
+    'mobilenet_0.25', 'mobilenet_0.5', 'mobilenet_1.0', 'resnet34',
+    'resnet50', 'resnet101'
+]
+
+
+def _build_model(size):
+    """Build the inference program of the model, and return the program,
+    startup program and the names of conv weights."""
+    from paddleslim.models import MobileNet, ResNet
+    main_program = paddle.static.Program()
+    startup_program = paddle.static.Program()
+    with paddle.static.program_guard(main_program, startup_program):
+        image = paddle.static.data(
+            name='image', shape=[None, 3, 224, 224], dtype='float32')
+        if size.startswith('mobilenet_'):
+            MobileNet().net(image, scale=float(size.split('_')[1]))
+        else:
+            ResNet(layers=int(size[len('resnet'):])).net(image)
+    params = [
+        param.name for param in main_program.all_parameters()
+        if len(param.shape) == 4
+    ]
+    return main_program, startup_program, params
+
+
+def _new_scope(startup_program):
+    scope = paddle.static.Scope()
+    exe = paddle.static.Executor(paddle.CPUPlace())
+    exe.run(startup_program, scope=scope)
+    return scope
+
+
+def _noop():
+    pass
+
+
+@register(
+    'graph_wrapper_traversal',
+    MODEL_SIZES,
+    counted=[
+        'paddleslim.core.graph_wrapper:GraphWrapper.ops',
+        'paddleslim.core.graph_wrapper:GraphWrapper.next_ops',
+        'paddleslim.core.graph_wrapper:GraphWrapper.pre_ops'
+    ])
+def graph_wrapper_traversal(size):
+    from paddleslim.core import GraphWrapper
+    program, _, _ = _build_model(size)
+
+    def run():
+        graph = GraphWrapper(program)
+        for op in graph.ops():
+            op.all_inputs()
+            op.all_outputs()
+            graph.next_ops(op)
+            graph.pre_ops(op)
+
+    return _noop, run
+
+
+@register(
+    'pruner_prune',
+    MODEL_SIZES,
+    counted=[
+        'paddleslim.core.graph_wrapper:GraphWrapper.ops',
+        'paddleslim.prune.prune_worker:PruneWorker.prune'
+    ])
+def pruner_prune(size):
+    from paddleslim.prune import Pruner
+    program, startup_program, params = _build_model(size)
+    state = {}
+
+    def setup():
+        # The pruning changes the program and the tensors in scope.
+        state['program'] = program.clone()
+        state['scope'] = _new_scope(startup_program)
+
+    def run():
+        Pruner().prune(
+            state['program'],
+            state['scope'],
+            params=params,
+            ratios=[0.3] * len(params),
+            place=paddle.CPUPlace())
+
+    return setup, run
+
+
+@register(
+    'create_pruning_collections',
+    MODEL_SIZES,
+    counted=['paddleslim.prune.prune_worker:PruneWorker.prune'])
+def create_pruning_collections(size):
+    from paddleslim.core import GraphWrapper
+    from paddleslim.prune import StaticPruningCollections
+    program, _, params = _build_model(size)
+
+    def run():
+        StaticPruningCollections(params, GraphWrapper(program))
+
+    return _noop, run
+
+
+@register(
+    'flops',
+    MODEL_SIZES,
+    counted=['paddleslim.core.graph_wrapper:GraphWrapper.ops'])
+def flops(size):
+    from paddleslim.analysis import flops
+    program, _, _ = _build_model(size)
+
+    def run():
+        flops(program)
+
+    return _noop, run
+
+
+@register(
+    'latency_table_lookup',
+    MODEL_SIZES,
+    counted=['paddleslim.analysis.latency_predictor:get_key_from_op'])
+def latency_table_lookup(size):
+    # TableLatencyPredictor.predict converts the model by the opt tool of
+    # Paddle-Lite first, which is not timed here. This case times the op
+    # keys of the predictor and the latency costs of conv weights, looked
+    # up in a table prebuilt for the model.
+    import pickle
+    from paddleslim.core import GraphWrapper
+    from paddleslim.analysis import LatencyPredictor, TableLatencyPredictor
+    from paddleslim.quant import latency_costs
+    from paddleslim.quant.mixed_precision import _weight_ops, _latency_key
+    program, _, params = _build_model(size)
+    graph = GraphWrapper(program)
+    table = dict((key, 1.)
+                 for key in LatencyPredictor()._get_key_info_from_graph(graph)
+                 if key != '')
+    for op, _ in _weight_ops(graph, ['conv2d', 'depthwise_conv2d']):
+        for data_type in ['fp32', 'int8']:
+            table[_latency_key(op, data_type)] = 1.
+    table_dir = tempfile.mkdtemp()
+    try:
+        table_file = os.path.join(table_dir, 'table.pkl')
+        with open(table_file, 'wb') as f:
+            pickle.dump(table, f)
+        predictor = TableLatencyPredictor(table_file=table_file)
+    finally:
+        shutil.rmtree(table_dir)
+
+    def run():
+        keys = predictor._get_key_info_from_graph(GraphWrapper(program))
+        sum(predictor.table_dict[key] for key in keys if key != '')
+        latency_costs(program, predictor, params)
+
+    return _noop, run
+
+
+@register(
+    'quant_embedding', [10000, 100000, 500000],
+    counted=['paddleslim.quant.quant_embedding:_quant_embedding_abs_max'])
+def quant_embedding(size):
+    from paddleslim.quant import quant_embedding
+    program = paddle.static.Program()
+    startup_program = paddle.static.Program()
+    with paddle.static.program_guard(program, startup_program):
+        ids = paddle.static.data(name='ids', shape=[None, 1], dtype='int64')
+        paddle.static.nn.embedding(ids, size=[size, 128])
+    state = {}
+
+    def setup():
+        state['program'] = program.clone(for_test=True)
+        state['scope'] = _new_scope(startup_program)
+
+    def run():
+        quant_embedding(
+            state['program'], paddle.CPUPlace(), scope=state['scope'])
+
+    return setup, run
+
+
+@register('cached_reader', [100, 1000])
+def cached_reader(size):
+    # Write the sampled batches into cache by the first pass, and read them
+    # from cache by the second pass.
+    from paddleslim.common import cached_reader
+    cache_dir = tempfile.mkdtemp()
+    batch = np.random.random([32, 3, 32, 32]).astype('float32')
+
+    def reader():
+        for _ in range(size):
+            yield batch
+
+    def setup():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        os.makedirs(cache_dir)
+
+    def run():
+        for _ in range(2):
+            for _ in cached_reader(reader, 0.5, cache_dir, 0)():
+                pass
+
+    return setup, run
+
+
+@register(
+    'controller_round_trip', [10, 100],
+    counted=['paddleslim.common.sa_controller:SAController.next_tokens'])
+def controller_round_trip(size):
+    # The rounds of next_tokens and update between a client and a
+    # ControllerServer on localhost.
+    from paddleslim.common import SAController, ControllerServer, ControllerClient
+    range_table = ([0] * 20, [10] * 20)
+    controller = SAController(range_table=range_table, init_tokens=[0] * 20)
+    server = ControllerServer(
+        controller=controller, address=('127.0.0.1', 0), key='benchmark')
+    server.start()
+    client = ControllerClient(
+        server.ip(), server.port(), key='benchmark', client_name='benchmark')
+
+    def run():
+        for step in range(size):
+            tokens = client.next_tokens()
+            client.update(tokens, float(np.sum(tokens)), step)
+
+    return _noop, run
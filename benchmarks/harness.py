@@ -0,0 +1,315 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Run benchmark cases in isolated processes, record and compare the results."""
+
+import os
+import sys
+import json
+import time
+import inspect
+import platform
+import importlib
+import subprocess
+import multiprocessing
+from queue import Empty
+from collections import OrderedDict
+
+__all__ = [
+    'Case', 'register', 'registered_cases', 'run_case', 'run_cases',
+    'load_history', 'append_history', 'compare'
+]
+
+
+class Case(object):
+    """
+    A benchmark case.
+
+    Args:
+        name(str): The name of case.
+        prepare(function): It accepts the size and returns a tuple of two
+            functions ``(setup, run)``. ``setup`` is called before each
+            repeat and ``run`` is timed.
+        sizes(list): The sizes to run.
+        counted(list<str>): The functions whose calls are counted, in format
+            ``"module:Class.method"`` or ``"module:function"``.
+    """
+
+    def __init__(self, name, prepare, sizes, counted=None):
+        self.name = name
+        self.prepare = prepare
+        self.sizes = sizes
+        self.counted = counted or []
+
+
+_cases = OrderedDict()
+
+
+def register(name, sizes, counted=None):
+    """Register the decorated prepare function as a benchmark case."""
+
+    def _register(prepare):
+        _cases[name] = Case(name, prepare, sizes, counted)
+        return prepare
+
+    return _register
+
+
+def registered_cases():
+    return list(_cases.values())
+
+
+def _peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux.
+    return peak / (1024. * 1024.) if sys.platform == 'darwin' else peak / 1024.
+
+
+class _CallCounter(object):
+    """Wrap the counted functions during one run and restore them after."""
+
+    def __init__(self, targets):
+        self._targets = targets
+        self._patched = []
+        self.counts = OrderedDict((target, 0) for target in targets)
+
+    def _resolve(self, target):
+        module_name, attr_path = target.split(':')
+        owner = importlib.import_module(module_name)
+        attrs = attr_path.split('.')
+        for attr in attrs[:-1]:
+            owner = getattr(owner, attr)
+        return owner, attrs[-1]
+
+    def __enter__(self):
+        for target in self._targets:
+            owner, attr = self._resolve(target)
+            own = attr in vars(owner)
+            # Get the staticmethod and classmethod objects without binding.
+            original = inspect.getattr_static(owner, attr)
+            func = original.__func__ if isinstance(
+                original, (staticmethod, classmethod)) else original
+
+            def _counted(*args, _target=target, _func=func, **kwargs):
+                self.counts[_target] += 1
+                return _func(*args, **kwargs)
+
+            if isinstance(original, staticmethod):
+                wrapped = staticmethod(_counted)
+            elif isinstance(original, classmethod):
+                wrapped = classmethod(_counted)
+            else:
+                wrapped = _counted
+            setattr(owner, attr, wrapped)
+            self._patched.append((owner, attr, original, own))
+        return self
+
+    def __exit__(self, *args):
+        for owner, attr, original, own in reversed(self._patched):
+            if own:
+                setattr(owner, attr, original)
+            else:
+                # The counted method was inherited.
+                delattr(owner, attr)
+        self._patched = []
+
+
+def _run_in_process(case_module, name, size, repeat, queue):
+    try:
+        importlib.import_module(case_module)
+        case = _cases[name]
+        setup, run = case.prepare(size)
+        times = []
+        for _ in range(repeat):
+            setup()
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        # The calls are counted in an extra run, so the timed runs are not
+        # slowed down by the wrappers.
+        setup()
+        with _CallCounter(case.counted) as counter:
+            run()
+        queue.put({
+            'times': times,
+            'time_min': min(times),
+            'time_mean': sum(times) / len(times),
+            'peak_rss_mb': _peak_rss_mb(),
+            'calls': dict(counter.counts)
+        })
+    except Exception as e:
+        queue.put({'error': "{}: {}".format(type(e).__name__, e)})
+
+
+def run_case(case_module, name, size, repeat=3, timeout=None):
+    """
+    Run one case with one size in a new process, so that the peak RSS and
+    the global states of Paddle are not shared with other cases.
+
+    Returns:
+        dict: The wall times in seconds, peak RSS in MB and call counts, or
+              the error message.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(
+        target=_run_in_process, args=(case_module, name, size, repeat, queue))
+    process.start()
+    deadline = None if timeout is None else time.time() + timeout
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1)
+        except Empty:
+            if not process.is_alive():
+                # The result may be put just before the process exits.
+                try:
+                    result = queue.get(timeout=1)
+                except Empty:
+                    result = {
+                        'error': 'process exited with code {}'.format(
+                            process.exitcode)
+                    }
+            elif deadline is not None and time.time() > deadline:
+                result = {'error': 'timeout after {}s'.format(timeout)}
+    process.join(5)
+    if process.is_alive():
+        process.terminate()
+    return result
+
+
+def _result_key(name, size):
+    return "{}/{}".format(name, size)
+
+
+def run_cases(case_module, names=None, sizes=None, repeat=3, timeout=None,
+              log=print):
+    """
+    Run the registered cases of case_module.
+
+    Args:
+        case_module(str): The module registering the cases.
+        names(list<str>): The names of cases to run. None means all.
+        sizes(list): The sizes to run. None means the sizes of each case.
+        repeat(int): The number of timed repeats.
+        timeout(float): The max seconds of one case. None means no limit.
+
+    Returns:
+        OrderedDict: The results keyed by ``"name/size"``.
+    """
+    importlib.import_module(case_module)
+    results = OrderedDict()
+    for case in registered_cases():
+        if names and case.name not in names:
+            continue
+        for size in case.sizes:
+            if sizes and size not in sizes:
+                continue
+            result = run_case(case_module, case.name, size, repeat, timeout)
+            key = _result_key(case.name, size)
+            results[key] = result
+            if 'error' in result:
+                log("{:<48} ERROR {}".format(key, result['error']))
+            else:
+                log("{:<48} min {:9.4f}s  mean {:9.4f}s  rss {:8.1f}MB".
+                    format(key, result['time_min'], result['time_mean'],
+                           result['peak_rss_mb']))
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def _environment():
+    env = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'commit': _git_commit()
+    }
+    try:
+        import paddle
+        env['paddle'] = paddle.__version__
+    except Exception:
+        env['paddle'] = None
+    return env
+
+
+def load_history(history_file):
+    """Load the list of runs in the history file."""
+    if not os.path.exists(history_file):
+        return []
+    with open(history_file) as f:
+        return json.load(f)
+
+
+def append_history(history_file, results, tag=None):
+    """Append a run to the history file, and return the run."""
+    history = load_history(history_file)
+    run = OrderedDict()
+    run['time'] = time.strftime('%Y-%m-%d %H:%M:%S')
+    run['tag'] = tag
+    run['env'] = _environment()
+    run['results'] = results
+    history.append(run)
+    tmp_file = history_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp_file, history_file)
+    return run
+
+
+def compare(baseline, current, time_threshold=1.2, rss_threshold=1.2):
+    """
+    Compare the results of two runs. A case regresses if its min time or
+    peak RSS grows by more than the threshold ratio, or it calls a counted
+    function more times, or it fails only in the current run.
+
+    Args:
+        baseline(dict): The baseline run in history.
+        current(dict): The current run in history.
+        time_threshold(float): The max ratio of min time. Default: 1.2.
+        rss_threshold(float): The max ratio of peak RSS. Default: 1.2.
+
+    Returns:
+        list: The rows of ``(key, metric, baseline, current, ratio, regressed)``.
+    """
+    rows = []
+    for key, cur in current['results'].items():
+        base = baseline['results'].get(key)
+        if base is None:
+            continue
+        if 'error' in cur or 'error' in base:
+            rows.append((key, 'error', base.get('error'), cur.get('error'),
+                         None, 'error' in cur and 'error' not in base))
+            continue
+        for metric, threshold in [('time_min', time_threshold),
+                                  ('peak_rss_mb', rss_threshold)]:
+            ratio = cur[metric] / base[metric] if base[metric] > 0 else 1.
+            rows.append((key, metric, base[metric], cur[metric], ratio,
+                         ratio > threshold))
+        for func, count in cur.get('calls', {}).items():
+            base_count = base.get('calls', {}).get(func)
+            if base_count is None:
+                continue
+            ratio = count / float(base_count) if base_count > 0 else 1.
+            rows.append((key, 'calls:' + func, base_count, count, ratio,
+                         count > base_count))
+    return rows
@@ -0,0 +1,144 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Run the benchmarks into a JSON history, and compare two runs in it.
+
+    python run.py run --history history.json --tag v2.1
+    python run.py compare --history history.json
+"""
+
+import os
+import sys
+import argparse
+
+_benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _benchmarks_dir)
+sys.path.insert(1, os.path.join(_benchmarks_dir, '..'))
+
+from harness import run_cases, load_history, append_history, compare
+
+
+def _split(value):
+    return value.split(',') if value else None
+
+
+def _run(args):
+    sizes = _split(args.sizes)
+    if sizes is not None:
+        sizes = [int(size) if size.isdigit() else size for size in sizes]
+    results = run_cases(
+        'cases',
+        names=_split(args.cases),
+        sizes=sizes,
+        repeat=args.repeat,
+        timeout=args.timeout)
+    append_history(args.history, results, tag=args.tag)
+    print("Appended the results to {}".format(args.history))
+    return 0
+
+
+def _find_run(history, ref):
+    """Find the run by its index or tag."""
+    try:
+        return history[int(ref)]
+    except ValueError:
+        for run in reversed(history):
+            if run['tag'] == ref:
+                return run
+    raise KeyError("Run {} is not in history.".format(ref))
+
+
+def _compare(args):
+    history = load_history(args.history)
+    if len(history) < 2:
+        print("At least two runs are needed in {}.".format(args.history))
+        return 0
+    baseline = _find_run(history, args.baseline)
+    current = _find_run(history, args.current)
+    rows = compare(
+        baseline,
+        current,
+        time_threshold=args.time_threshold,
+        rss_threshold=args.rss_threshold)
+    print("baseline: {} {} {}".format(baseline['time'], baseline['tag'],
+                                      baseline['env'].get('commit')))
+    print("current:  {} {} {}".format(current['time'], current['tag'],
+                                      current['env'].get('commit')))
+    regressions = 0
+    for key, metric, base, cur, ratio, regressed in rows:
+        if not regressed and not args.verbose:
+            continue
+        regressions += int(regressed)
+        ratio = '-' if ratio is None else "{:.2f}x".format(ratio)
+        print("{:<8} {:<40} {:<40} {} -> {} ({})".format(
+            'REGRESS' if regressed else 'ok', key, metric, base, cur, ratio))
+    print("{} regressions found.".format(regressions))
+    return 1 if regressions > 0 else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser('run', help='Run the benchmarks.')
+    run_parser.add_argument(
+        '--history', default='history.json', help='The JSON history file.')
+    run_parser.add_argument('--tag', default=None, help='The tag of this run.')
+    run_parser.add_argument(
+        '--cases', default=None, help='The cases to run, separated by comma.')
+    run_parser.add_argument(
+        '--sizes', default=None, help='The sizes to run, separated by comma.')
+    run_parser.add_argument(
+        '--repeat', type=int, default=3, help='The timed repeats of a case.')
+    run_parser.add_argument(
+        '--timeout',
+        type=float,
+        default=None,
+        help='The max seconds of a case.')
+
+    compare_parser = subparsers.add_parser(
+        'compare', help='Compare two runs and exit with 1 on regressions.')
+    compare_parser.add_argument(
+        '--history', default='history.json', help='The JSON history file.')
+    compare_parser.add_argument(
+        '--baseline',
+        default='-2',
+        help='The index or tag of baseline run. Default: the second last.')
+    compare_parser.add_argument(
+        '--current',
+        default='-1',
+        help='The index or tag of current run. Default: the last.')
+    compare_parser.add_argument(
+        '--time_threshold',
+        type=float,
+        default=1.2,
+        help='The max ratio of min time.')
+    compare_parser.add_argument(
+        '--rss_threshold',
+        type=float,
+        default=1.2,
+        help='The max ratio of peak RSS.')
+    compare_parser.add_argument(
+        '--verbose', action='store_true', help='Print all the metrics.')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        return _run(args)
+    elif args.command == 'compare':
+        return _compare(args)
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -45,6 +45,7 @@ add_arg('epochs',            int,   200,             "Epoch number.")
 add_arg('class_num',         int,   100,             "Class number of dataset.")
 add_arg('trainset_num',      int,   50000,           "Images number of trainset.")
 add_arg('model_save_dir',    str,   'saved_models',  "The path to save model.")
+add_arg('fuse',              bool,  False,           "Whether to compute the losses of all models in batched expressions and update them after one backward.")
 # yapf: enable
 
 
@@ -166,7 +167,7 @@ def main(args):
     optimizers, lr = create_optimizer(models, args)
 
     # 3. Use PaddleSlim DML strategy
-    dml_model = DML(models)
+    dml_model = DML(models, fuse=args.fuse)
     dml_optimizer = dml_model.opt(optimizers)
 
     # 4. Train your network
@@ -0,0 +1,166 @@
+"""NumPy reference benchmark of sparse GEMM for the sparse patterns of UnstructuredPruner.
+
+It prunes a random weight matrix to the target ratio by each pattern, runs
+the GEMM of the pruned weights in the storage format that fits the pattern,
+and reports the speedup over the dense GEMM:
+
+- element: CSR, one gather per non-zero weight.
+- N:M: the same number of kept weights in each output channel, so the
+  gathered inputs form dense tensors.
+- KxK block: one dense GEMM per column of blocks, skipping the zero blocks.
+
+The numbers show how much of the sparsity each pattern can turn into speedup
+without dedicated kernels, not the speed of inference backends.
+"""
+import sys
+import time
+import argparse
+import functools
+import numpy as np
+sys.path.append("..")
+from paddleslim.prune.sparse_pattern import parse_sparse_pattern, pattern_scores
+from utility import add_arguments, print_arguments
+
+parser = argparse.ArgumentParser(description=__doc__)
+add_arg = functools.partial(add_arguments, argparser=parser)
+# yapf: disable
+add_arg('in_features',      int,  1024,               "The number of input channels.")
+add_arg('out_features',     int,  1024,               "The number of output channels.")
+add_arg('batch_size',       int,  256,                "The number of input rows.")
+add_arg('ratio',            float, 0.5,               "The sparsity of weights.")
+add_arg('patterns',         str,  "element,2:4,4x4,8x8", "The sparse patterns to benchmark, separated by comma.")
+add_arg('repeat',           int,  10,                 "The times to repeat each GEMM.")
+# yapf: enable
+
+
+def prune(weight, pattern, ratio):
+    """Prune weight [in, out] like UnstructuredPruner in ratio mode. The N:M
+    patterns are always pruned to exact N:M sparsity."""
+    scores = pattern_scores(weight, pattern)
+    if pattern[0] == 'nm':
+        threshold = np.inf
+    else:
+        index = max(0, int(ratio * scores.size) - 1)
+        threshold = np.partition(scores.ravel(), index)[index]
+    return weight * (scores >= threshold)
+
+
+def dense_gemm(x, weight):
+    return x.dot(weight)
+
+
+def _chunks(num, size):
+    for start in range(0, num, size):
+        yield start, min(start + size, num)
+
+
+def csr_gemm(x, indptr, indices, values, chunk=64):
+    # Weights are stored by output channel, and every chunk of output
+    # channels gathers the inputs of their non-zero weights.
+    out_features = len(indptr) - 1
+    y = np.zeros([x.shape[0], out_features], dtype=x.dtype)
+    for start, end in _chunks(out_features, chunk):
+        lo, hi = indptr[start], indptr[end]
+        if lo == hi: continue
+        products = x[:, indices[lo:hi]] * values[lo:hi]
+        starts = indptr[start:end] - lo
+        nonempty = np.diff(indptr[start:end + 1]) > 0
+        y[:, start:end][:, nonempty] = np.add.reduceat(
+            products, starts[nonempty], axis=1)
+    return y
+
+
+def csr_compress(weight):
+    matrix = weight.T
+    rows, cols = np.nonzero(matrix)
+    indptr = np.zeros(matrix.shape[0] + 1, dtype='int64')
+    np.cumsum(np.bincount(rows, minlength=matrix.shape[0]), out=indptr[1:])
+    return indptr, cols, matrix[rows, cols]
+
+
+def nm_compress(weight, n, m):
+    """Compress N:M sparse weight [in, out] into the indices and values of the
+    in/m*n kept weights of each output channel."""
+    groups = weight.T.reshape([weight.shape[1], -1, m])
+    offsets = np.argsort(groups == 0, axis=2, kind='stable')[:, :, :n]
+    values = np.take_along_axis(groups, offsets, axis=2)
+    indices = offsets + np.arange(groups.shape[1])[None, :, None] * m
+    return indices.reshape([weight.shape[1], -1]), values.reshape(
+        [weight.shape[1], -1])
+
+
+def nm_gemm(x, indices, values, chunk=64):
+    # Every output channel has the same number of weights, so the gathered
+    # inputs of a chunk of output channels form a dense tensor.
+    y = np.empty([x.shape[0], indices.shape[0]], dtype=x.dtype)
+    for start, end in _chunks(indices.shape[0], chunk):
+        y[:, start:end] = np.einsum('bok,ok->bo', x[:, indices[start:end]],
+                                    values[start:end])
+    return y
+
+
+def bsr_compress(weight, kh, kw):
+    """Compress block sparse weight [in, out] into the input indices and the
+    stacked non-zero blocks of each column of blocks."""
+    rows, cols = weight.shape
+    blocks = weight.reshape([rows // kh, kh, cols // kw, kw])
+    nonzero = np.abs(blocks).sum(axis=(1, 3)) != 0
+    columns = []
+    for j in range(cols // kw):
+        block_rows = np.nonzero(nonzero[:, j])[0]
+        indices = (block_rows[:, None] * kh + np.arange(kh)).reshape([-1])
+        columns.append((indices, weight[indices, j * kw:(j + 1) * kw]))
+    return columns
+
+
+def bsr_gemm(x, columns, kw):
+    # One dense GEMM for each column of blocks, which skips the zero blocks.
+    y = np.zeros([x.shape[0], len(columns) * kw], dtype=x.dtype)
+    for j, (indices, weight) in enumerate(columns):
+        if len(indices) == 0: continue
+        y[:, j * kw:(j + 1) * kw] = x[:, indices].dot(weight)
+    return y
+
+
+def timeit(func, repeat):
+    func()
+    start = time.time()
+    for _ in range(repeat):
+        func()
+    return (time.time() - start) / repeat
+
+
+def main(args):
+    rng = np.random.RandomState(0)
+    x = rng.standard_normal(
+        [args.batch_size, args.in_features]).astype('float32')
+    weight = rng.standard_normal(
+        [args.in_features, args.out_features]).astype('float32')
+    dense_time = timeit(lambda: dense_gemm(x, weight), args.repeat)
+    print("dense: {:.3f} ms".format(dense_time * 1000))
+    for sparse_pattern in args.patterns.split(','):
+        pattern = parse_sparse_pattern(sparse_pattern)
+        pruned = prune(weight, pattern, args.ratio)
+        expected = dense_gemm(x, pruned)
+        if pattern[0] == 'element':
+            indptr, indices, values = csr_compress(pruned)
+            func = lambda: csr_gemm(x, indptr, indices, values)
+        elif pattern[0] == 'nm':
+            indices, values = nm_compress(pruned, *pattern[1])
+            func = lambda: nm_gemm(x, indices, values)
+        else:
+            columns = bsr_compress(pruned, *pattern[1])
+            func = lambda: bsr_gemm(x, columns, pattern[1][1])
+        assert np.allclose(func(), expected, rtol=1e-3, atol=1e-3)
+        sparse_time = timeit(func, args.repeat)
+        density = float(np.count_nonzero(pruned)) / pruned.size
+        print(
+            "{}: sparsity {:.3f}, {:.3f} ms, speedup {:.2f}x, ideal speedup {:.2f}x".
+            format(sparse_pattern, 1 - density, sparse_time * 1000,
+                   dense_time / sparse_time, 1 / density))
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    print_arguments(args)
+    main(args)
@@ -52,6 +52,7 @@ add_arg('pruning_steps',    int, 120,        "How many times you want to increas
 add_arg('initial_ratio',    float, 0.15,         "The initial pruning ratio used at the start of pruning stage. Default: 0.15")
 add_arg('prune_params_type', str, None,           "Which kind of params should be pruned, we only support None (all but norms) and conv1x1_only for now. Default: None")
 add_arg('local_sparsity', bool, False,            "Whether to prune all the parameter matrix at the same ratio or not. Default: False")
+add_arg('sparse_pattern', str, None,            "The pattern of sparsity, such as '2:4' for N:M sparsity and '4x4' for block sparsity. None means element-wise sparsity. Default: None")
 add_arg('ce_test',                 bool,   False,                                        "Whether to CE test. Default: False")
 add_arg('num_workers',      int, 32,              "number of workers when loading dataset. Default: 32")
 # yapf: enable
@@ -102,7 +103,8 @@ def create_unstructured_pruner(train_program, args, place, configs):
             threshold=args.threshold,
             prune_params_type=args.prune_params_type,
             place=place,
-            local_sparsity=args.local_sparsity)
+            local_sparsity=args.local_sparsity,
+            sparse_pattern=args.sparse_pattern)
     else:
         return GMPUnstructuredPruner(
             train_program,
@@ -110,7 +112,8 @@ def create_unstructured_pruner(train_program, args, place, configs):
             prune_params_type=args.prune_params_type,
             place=place,
             local_sparsity=args.local_sparsity,
-            configs=configs)
+            configs=configs,
+            sparse_pattern=args.sparse_pattern)
 
 
 def compress(args):
@@ -61,13 +61,64 @@ def _static_flops(program, only_conv=True, detail=False):
     return _graph_flops(graph, only_conv=only_conv, detail=detail)
 
 
-def _graph_flops(graph, only_conv=True, detail=False):
+# The operators whose output has the same channels as input 'X'.
+_CHANNEL_UNCHANGED_OPS = [
+    'relu', 'sigmoid', 'relu6', 'leaky_relu', 'hard_swish', 'swish',
+    'hard_sigmoid', 'tanh', 'pool2d', 'dropout', 'scale', 'elementwise_add',
+    'elementwise_mul', 'elementwise_sub', 'batch_norm', 'sync_batch_norm'
+]
+
+
+def _channel_scale(var, pruned_shapes):
+    """Get the ratio of remained channels of an activation by tracing back to
+    the nearest operator whose output channels are decided by parameter."""
+    visited = set()
+    while var is not None and var.name() not in visited:
+        visited.add(var.name())
+        pre_ops = var.inputs()
+        if len(pre_ops) == 0:
+            return 1.
+        op = pre_ops[0]
+        if op.type() in ['conv2d', 'depthwise_conv2d']:
+            param, axis = op.inputs("Filter")[0], 0
+        elif op.type() == 'mul':
+            param, axis = op.inputs("Y")[0], 1
+        elif op.type() in ['batch_norm', 'sync_batch_norm']:
+            param, axis = op.inputs("Scale")[0], 0
+        elif op.type() in _CHANNEL_UNCHANGED_OPS and len(op.inputs("X")) > 0:
+            var = op.inputs("X")[0]
+            continue
+        else:
+            return 1.
+        origin = param.shape()[axis]
+        return float(pruned_shapes.get(param.name(), param.shape())[
+            axis]) / origin if origin > 0 else 1.
+    return 1.
+
+
+def _graph_flops(graph, only_conv=True, detail=False, pruned_shapes=None):
+    """
+    Args:
+        pruned_shapes(dict|None): The shapes of parameters after pruning. If it is
+            set, the FLOPs is computed as if the parameters were pruned to the given
+            shapes without changing the graph. Default: None.
+    """
     assert isinstance(graph, GraphWrapper)
+    pruned_shapes = {} if pruned_shapes is None else pruned_shapes
+
+    def _shape(var):
+        return pruned_shapes.get(var.name(), var.shape())
+
+    def _scale(var):
+        if len(pruned_shapes) == 0:
+            return 1.
+        return _channel_scale(var, pruned_shapes)
+
     flops = 0
     params2flops = {}
     for op in graph.ops():
         if op.type() in ['conv2d', 'depthwise_conv2d']:
-            filter_shape = op.inputs("Filter")[0].shape()
+            filter_shape = _shape(op.inputs("Filter")[0])
             output_shape = op.outputs("Output")[0].shape()
             c_out, c_in, k_h, k_w = filter_shape
             _, _, h_out, w_out = output_shape
@@ -84,13 +135,18 @@ def _graph_flops(graph, only_conv=True, detail=False):
             output_shape = op.outputs("Out")[0].shape()
             _, c_out, h_out, w_out = output_shape
             k_size = op.attr("ksize")
-            flops += h_out * w_out * c_out * (k_size[0]**2)
+            flops += h_out * w_out * c_out * (k_size[0]**2) * _scale(
+                op.outputs("Out")[0])
 
         elif op.type() == 'mul':
-            x_shape = list(op.inputs("X")[0].shape())
-            y_shape = op.inputs("Y")[0].shape()
+            x_var = op.inputs("X")[0]
+            x_shape = list(_shape(x_var))
+            origin_y_shape = op.inputs("Y")[0].shape()
+            y_shape = _shape(op.inputs("Y")[0])
             if x_shape[0] == -1:
                 x_shape[0] = 1
+            if x_var.name() not in pruned_shapes and origin_y_shape[0] > 0:
+                x_shape[1] = x_shape[1] * y_shape[0] // origin_y_shape[0]
 
             op_flops = x_shape[0] * x_shape[1] * y_shape[1]
             flops += op_flops
@@ -101,7 +157,13 @@ def _graph_flops(graph, only_conv=True, detail=False):
             input_shape = list(op.inputs("X")[0].shape())
             if input_shape[0] == -1:
                 input_shape[0] = 1
-            flops += np.product(input_shape)
+            if op.type() == 'batch_norm':
+                scale = op.inputs("Scale")[0]
+                op_scale = float(_shape(scale)[0]) / scale.shape()[0] if len(
+                    pruned_shapes) > 0 else 1.
+            else:
+                op_scale = _scale(op.inputs("X")[0])
+            flops += np.product(input_shape) * op_scale
 
     if detail:
         return flops, params2flops
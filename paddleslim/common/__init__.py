@@ -14,6 +14,7 @@
 from .controller import EvolutionaryController, RLBaseController
 from .sa_controller import SAController
 from .log_helper import get_logger
+from .trace import Tracer, tracer, traced
 from .controller_server import ControllerServer
 from .controller_client import ControllerClient
 from .lock import lock, unlock
@@ -27,7 +28,8 @@ from paddleslim.common import wrapper_function
 __all__ = [
     'EvolutionaryController', 'SAController', 'get_logger', 'ControllerServer',
     'ControllerClient', 'lock', 'unlock', 'cached_reader', 'AvgrageMeter',
-    'Server', 'Client', 'RLBaseController', 'VarCollector'
+    'Server', 'Client', 'RLBaseController', 'VarCollector', 'Tracer', 'tracer',
+    'traced'
 ]
 
 __all__ += wrapper_function.__all__
@@ -17,15 +17,9 @@ import signal
 import zmq
 import socket
 import logging
-import time
 import threading
-import six
-if six.PY2:
-    import cPickle as pickle
-else:
-    import pickle
 from .log_helper import get_logger
-from .rl_controller.utils import compute_grad, ConnectMessage
+from .rl_controller.utils import compute_grad, ConnectMessage, pack_params, unpack_params
 
 _logger = get_logger(__name__, level=logging.INFO)
 
@@ -38,9 +32,19 @@ class Client(object):
         self._port = self._address[1]
         self._client_name = client_name
         self._params_dict = None
+        ### the version of cached params, -1 means no params cached
+        self._version = -1
         self.init_wait = False
         self._connect_server()
 
+    def _send(self, sock, cmd, *frames, **kwargs):
+        sock.send_multipart(
+            [
+                ConnectMessage.encode(cmd),
+                ConnectMessage.encode(self._client_name)
+            ] + list(frames),
+            **kwargs)
+
     def _connect_server(self):
         self._ctx = zmq.Context()
         self._client_socket = self._ctx.socket(zmq.REQ)
@@ -49,11 +53,9 @@ class Client(object):
                                        ConnectMessage.TIMEOUT * 1000)
         client_address = "{}:{}".format(self._ip, self._port)
         self._client_socket.connect("tcp://{}".format(client_address))
-        self._client_socket.send_multipart([
-            pickle.dumps(ConnectMessage.INIT), pickle.dumps(self._client_name)
-        ])
+        self._send(self._client_socket, ConnectMessage.INIT)
         message = self._client_socket.recv_multipart()
-        if pickle.loads(message[0]) != ConnectMessage.INIT_DONE:
+        if ConnectMessage.decode(message[0]) != ConnectMessage.INIT_DONE:
             _logger.error("Client {} init failure, Please start it again".
                           format(self._client_name))
             pid = os.getpid()
@@ -67,28 +69,31 @@ class Client(object):
         self._wait_socket = self._ctx.socket(zmq.REQ)
         wait_address = "{}:{}".format(self._ip, port)
         self._wait_socket.connect("tcp://{}".format(wait_address))
-        self._wait_socket.send_multipart([
-            pickle.dumps(ConnectMessage.WAIT_PARAMS),
-            pickle.dumps(self._client_name)
-        ])
+        self.init_wait = True
+
+    def _wait_params(self, version):
+        """Block until the server pushes the params newer than version."""
+        self._send(self._wait_socket, ConnectMessage.WAIT_PARAMS,
+                   ConnectMessage.encode(version))
         message = self._wait_socket.recv_multipart()
-        return pickle.loads(message[0])
+        return ConnectMessage.decode(message[0])
 
     def next_tokens(self, obs, is_inference=False):
         _logger.debug("Client: requests for weight {}".format(
             self._client_name))
-        self._client_socket.send_multipart([
-            pickle.dumps(ConnectMessage.GET_WEIGHT),
-            pickle.dumps(self._client_name)
-        ])
+        self._send(self._client_socket, ConnectMessage.GET_WEIGHT,
+                   ConnectMessage.encode(self._version))
         try:
-            message = self._client_socket.recv_multipart()
+            message = self._client_socket.recv_multipart(copy=False)
         except zmq.error.Again as e:
             _logger.error(
                 "CANNOT recv params from server in next_archs, Please check whether the server is alive!!! {}".
                 format(e))
             os._exit(0)
-        self._params_dict = pickle.loads(message[0])
+        ### only the version is sent back if the cached params are up to date
+        if len(message) > 1:
+            self._params_dict = unpack_params(message[1:])
+            self._version = int(ConnectMessage.decode(message[0]))
         tokens = self._controller.next_tokens(
             obs, params_dict=self._params_dict, is_inference=is_inference)
         _logger.debug("Client: client_name is {}, current token is {}".format(
@@ -101,10 +106,11 @@ class Client(object):
             rewards, self._params_dict, **kwargs)
         params_grad = compute_grad(current_params_dict, self._params_dict)
         _logger.debug("Client: update weight {}".format(self._client_name))
-        self._client_socket.send_multipart([
-            pickle.dumps(ConnectMessage.UPDATE_WEIGHT),
-            pickle.dumps(self._client_name), pickle.dumps(params_grad)
-        ])
+        self._send(
+            self._client_socket,
+            ConnectMessage.UPDATE_WEIGHT,
+            *pack_params(params_grad),
+            copy=False)
         _logger.debug("Client: update done {}".format(self._client_name))
 
         try:
@@ -115,33 +121,22 @@ class Client(object):
                 format(e))
             os._exit(0)
 
-        if pickle.loads(message[0]) == ConnectMessage.WAIT:
+        reply = ConnectMessage.decode(message[0])
+        if reply == ConnectMessage.WAIT:
             _logger.debug("Client: self.init_wait: {}".format(self.init_wait))
             if not self.init_wait:
-                wait_port = pickle.loads(message[1])
-                wait_signal = self._connect_wait_socket(wait_port)
-                self.init_wait = True
-            else:
-                wait_signal = pickle.loads(message[0])
-            while wait_signal != ConnectMessage.OK:
-                time.sleep(1)
-                self._wait_socket.send_multipart([
-                    pickle.dumps(ConnectMessage.WAIT_PARAMS),
-                    pickle.dumps(self._client_name)
-                ])
-                wait_signal = self._wait_socket.recv_multipart()
-                wait_signal = pickle.loads(wait_signal[0])
-                _logger.debug("Client: {} {}".format(self._client_name,
-                                                     wait_signal))
+                self._connect_wait_socket(
+                    int(ConnectMessage.decode(message[1])))
+            wait_signal = self._wait_params(
+                int(ConnectMessage.decode(message[2])))
+            _logger.debug("Client: {} {}".format(self._client_name,
+                                                 wait_signal))
 
-        return pickle.loads(message[0])
+        return reply
 
     def __del__(self):
         try:
-            self._client_socket.send_multipart([
-                pickle.dumps(ConnectMessage.EXIT),
-                pickle.dumps(self._client_name)
-            ])
+            self._send(self._client_socket, ConnectMessage.EXIT)
             _ = self._client_socket.recv_multipart()
         except:
             pass
@@ -13,3 +13,4 @@
 # limitations under the License.
 
 from .ddpg_controller import *
+from .replay_memory import *
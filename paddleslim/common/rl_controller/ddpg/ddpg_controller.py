@@ -12,16 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import threading
 import numpy as np
 import parl
 from parl import layers
 import paddle
 from paddle import fluid
-from ..utils import RLCONTROLLER, action_mapping
+from ..utils import RLCONTROLLER, action_mapping, add_grad, compute_grad
 from ...controller import RLBaseController
 from .ddpg_model import DefaultDDPGModel as default_ddpg_model
 from .noise import AdaptiveNoiseSpec as default_noise
-from parl.utils import ReplayMemory
+from .replay_memory import PrioritizedReplayMemory
 
 __all__ = ['DDPG']
 
@@ -56,6 +57,17 @@ class DDPGAgent(parl.Agent):
                 name='next_obs', shape=[None, self.obs_dim], dtype='float32')
             terminal = fluid.data(
                 name='terminal', shape=[None, 1], dtype='bool')
+            ### the TD errors before learning, used as the priorities of
+            ### the sampled transitions
+            q = self.alg.model.value(obs, act)
+            next_q = self.alg.target_model.value(
+                next_obs, self.alg.target_model.policy(next_obs))
+            not_terminal = 1.0 - paddle.squeeze(
+                paddle.cast(
+                    terminal, dtype='float32'), axis=[1])
+            self.td_error = paddle.abs(reward + not_terminal * self.alg.gamma
+                                       * next_q - q)
+            self.td_error.stop_gradient = True
             _, self.critic_cost = self.alg.learn(obs, act, reward, next_obs,
                                                  terminal)
 
@@ -73,11 +85,12 @@ class DDPGAgent(parl.Agent):
             'next_obs': next_obs,
             'terminal': terminal
         }
-        critic_cost = self.fluid_executor.run(self.learn_program,
-                                              feed=feed,
-                                              fetch_list=[self.critic_cost])[0]
+        critic_cost, td_error = self.fluid_executor.run(
+            self.learn_program,
+            feed=feed,
+            fetch_list=[self.critic_cost, self.td_error])
         self.alg.sync_target()
-        return critic_cost
+        return critic_cost, td_error
 
 
 @RLCONTROLLER.register
@@ -102,6 +115,12 @@ class DDPG(RLBaseController):
             'controller_batch_size') if 'controller_batch_size' in kwargs else 1
         self.actions_noise = kwargs.get(
             'actions_noise') if 'actions_noise' in kwargs else default_noise
+        self.learn_steps = kwargs.get(
+            'learn_steps') if 'learn_steps' in kwargs else 1
+        self.priority_alpha = kwargs.get(
+            'priority_alpha') if 'priority_alpha' in kwargs else 0.6
+        self.async_learn = kwargs.get(
+            'async_learn') if 'async_learn' in kwargs else False
         self.action_dist = 0.0
         self.place = paddle.CUDAPlace(0) if self.use_gpu else paddle.CPUPlace()
 
@@ -117,16 +136,70 @@ class DDPG(RLBaseController):
             actor_lr=self.actor_lr,
             critic_lr=self.critic_lr)
         self.agent = DDPGAgent(algorithm, self.obs_dim, self.act_dim)
-        self.rpm = ReplayMemory(self.memory_size, self.obs_dim, self.act_dim)
+        self.rpm = PrioritizedReplayMemory(
+            self.memory_size,
+            self.obs_dim,
+            self.act_dim,
+            alpha=self.priority_alpha)
 
         self.pred_program = self.agent.pred_program
         self.learn_program = self.agent.learn_program
         self.param_dict = self.get_params(self.learn_program)
 
+        ### the lock of params in scope, shared with the learning thread
+        self._lock = threading.Lock()
+        if self.async_learn:
+            ### the params synced with server, the params in scope minus
+            ### them is the learned delta not reported yet
+            self._base_params = None
+            self._pending_steps = 0
+            self._new_data = threading.Event()
+            learn_thread = threading.Thread(target=self._learn_loop)
+            learn_thread.setDaemon(True)
+            learn_thread.start()
+
+    def _sync_params(self, params_dict, reported):
+        """Set params_dict plus the delta learned in background to scope.
+        The delta is kept unless it is reported to server by update."""
+        synced_params = params_dict
+        if self._base_params is not None:
+            params_dict = add_grad(
+                params_dict,
+                compute_grad(
+                    self.get_params(self.learn_program), self._base_params))
+        self.set_params(self.learn_program, params_dict, self.place)
+        self._base_params = params_dict if reported else synced_params
+        return params_dict
+
+    def _learn_batch(self):
+        if self.rpm.size() < self.batch_size:
+            return
+        obs, actions, rewards, obs_next, terminal, index = self.rpm.sample_batch(
+            self.batch_size)
+        _, td_error = self.agent.learn(obs, actions, rewards, obs_next,
+                                       terminal)
+        self.rpm.update_priority(index, td_error)
+
+    def _learn_loop(self):
+        while True:
+            self._new_data.wait()
+            with self._lock:
+                steps = self._pending_steps
+                self._pending_steps = 0
+                self._new_data.clear()
+            for _ in range(steps):
+                with self._lock:
+                    self._learn_batch()
+
     def next_tokens(self, obs, params_dict, is_inference=False):
-        batch_obs = np.expand_dims(obs, axis=0)
-        self.set_params(self.pred_program, params_dict, self.place)
-        actions = self.agent.predict(batch_obs.astype('float32'))
+        obs = np.asarray(obs)
+        batch_obs = obs if obs.ndim == 2 else np.expand_dims(obs, axis=0)
+        with self._lock:
+            if self.async_learn:
+                self._sync_params(params_dict, reported=False)
+            else:
+                self.set_params(self.pred_program, params_dict, self.place)
+            actions = self.agent.predict(batch_obs.astype('float32'))
         ### add noise to action
         if self.actions_noise and is_inference == False:
             actions_noise = np.clip(
@@ -144,14 +217,29 @@ class DDPG(RLBaseController):
         self.actions_noise.update(actions_dist)
 
     def update(self, rewards, params_dict, obs, actions, obs_next, terminal):
-        self.set_params(self.learn_program, params_dict, self.place)
-        self.rpm.append(obs, actions, self.reward_scale * rewards, obs_next,
-                        terminal)
-        if self.actions_noise:
-            self._update_noise(self.action_dist)
-        if self.rpm.size() > self.memory_size:
-            obs, actions, rewards, obs_next, terminal = rpm.sample_batch(
-                self.batch_size)
-        self.agent.learn(obs, actions, rewards, obs_next, terminal)
-        params_dict = self.get_params(self.learn_program)
+        """
+        Append transitions into the replay memory and learn from mini-batches
+        sampled from it by priorities. All the arguments except params_dict
+        can be a batch of transitions.
+
+        If 'async_learn' is True, the mini-batches are learned in a background
+        thread, and the params returned contain what was learned since last
+        update.
+        """
+        with self._lock:
+            if self.async_learn:
+                params_dict = self._sync_params(params_dict, reported=True)
+            else:
+                self.set_params(self.learn_program, params_dict, self.place)
+            self.rpm.append(obs, actions, self.reward_scale * np.asarray(
+                rewards, dtype='float32'), obs_next, terminal)
+            if self.actions_noise:
+                self._update_noise(self.action_dist)
+            if self.async_learn:
+                self._pending_steps += self.learn_steps
+                self._new_data.set()
+                return params_dict
+            for _ in range(self.learn_steps):
+                self._learn_batch()
+            params_dict = self.get_params(self.learn_program)
         return params_dict
@@ -0,0 +1,124 @@
+# Copyright (c) 2021 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+
+__all__ = ['PrioritizedReplayMemory']
+
+
+class PrioritizedReplayMemory(object):
+    """
+    Replay memory stored in preallocated numpy arrays used as a ring buffer.
+    Transitions are sampled with probabilities proportional to
+    priority ** alpha, and new transitions get the max priority seen so far,
+    so they are likely to be sampled at least once.
+
+    Args:
+        max_size(int): The max number of transitions. The oldest ones are
+                       overwritten when the memory is full.
+        obs_dim(int): The dimension of observations.
+        act_dim(int): The dimension of actions.
+        alpha(float): How much the priorities are used. 0 means uniform
+                      sampling. Default: 0.6.
+        eps(float): The small value added to priorities, so every transition
+                    can be sampled. Default: 1e-6.
+    """
+
+    def __init__(self, max_size, obs_dim, act_dim, alpha=0.6, eps=1e-6):
+        self.max_size = int(max_size)
+        self.obs_dim = obs_dim
+        self.act_dim = act_dim
+        self.alpha = alpha
+        self.eps = eps
+
+        self.obs = np.zeros((self.max_size, obs_dim), dtype='float32')
+        self.action = np.zeros((self.max_size, act_dim), dtype='float32')
+        self.reward = np.zeros((self.max_size, ), dtype='float32')
+        self.next_obs = np.zeros((self.max_size, obs_dim), dtype='float32')
+        self.terminal = np.zeros((self.max_size, ), dtype='bool')
+        self.priority = np.zeros((self.max_size, ), dtype='float64')
+
+        self._max_priority = 1.0
+        self._curr_size = 0
+        self._curr_pos = 0
+
+    def size(self):
+        return self._curr_size
+
+    def append(self, obs, act, reward, next_obs, terminal):
+        """
+        Append one or a batch of transitions.
+
+        Args:
+            obs(np.ndarray): The observations with shape [obs_dim] or [N, obs_dim].
+            act(np.ndarray): The actions with shape [act_dim] or [N, act_dim].
+            reward(float|np.ndarray): The rewards, broadcast to [N].
+            next_obs(np.ndarray): The next observations, the same shape as obs.
+            terminal(bool|np.ndarray): The terminal flags, broadcast to [N].
+        """
+        obs = np.asarray(obs, dtype='float32').reshape([-1, self.obs_dim])
+        num = obs.shape[0]
+        act = np.asarray(act, dtype='float32').reshape([num, self.act_dim])
+        next_obs = np.asarray(
+            next_obs, dtype='float32').reshape([num, self.obs_dim])
+        reward = np.broadcast_to(
+            np.asarray(
+                reward, dtype='float32').reshape([-1]), [num])
+        terminal = np.broadcast_to(
+            np.asarray(
+                terminal, dtype='bool').reshape([-1]), [num])
+        if num > self.max_size:
+            obs, act, reward, next_obs, terminal = [
+                item[-self.max_size:]
+                for item in [obs, act, reward, next_obs, terminal]
+            ]
+            num = self.max_size
+
+        index = (self._curr_pos + np.arange(num)) % self.max_size
+        self.obs[index] = obs
+        self.action[index] = act
+        self.reward[index] = reward
+        self.next_obs[index] = next_obs
+        self.terminal[index] = terminal
+        self.priority[index] = self._max_priority
+        self._curr_pos = (self._curr_pos + num) % self.max_size
+        self._curr_size = min(self._curr_size + num, self.max_size)
+
+    def sample_batch(self, batch_size):
+        """
+        Sample a batch of transitions by priorities.
+
+        Returns:
+            tuple: The observations, actions, rewards, next observations and
+                   terminal flags with shape [batch_size, 1], and the indices
+                   of the sampled transitions for 'update_priority'.
+        """
+        assert self._curr_size > 0, "The replay memory is empty."
+        weights = self.priority[:self._curr_size]**self.alpha
+        cumsum = np.cumsum(weights)
+        index = np.searchsorted(
+            cumsum,
+            np.random.uniform(0, cumsum[-1], batch_size),
+            side='right')
+        index = np.minimum(index, self._curr_size - 1)
+        return (self.obs[index], self.action[index], self.reward[index],
+                self.next_obs[index], self.terminal[index].reshape([-1, 1]),
+                index)
+
+    def update_priority(self, index, priority):
+        """Set the priorities of the sampled transitions, usually their
+        absolute TD errors."""
+        priority = np.abs(np.asarray(priority, dtype='float64')) + self.eps
+        self.priority[index] = priority
+        self._max_priority = max(self._max_priority, float(priority.max()))
@@ -72,12 +72,17 @@ class LSTM(RLBaseController):
 
         self.max_range_table = max(self.range_tables) + 1
 
-        self._create_parameter()
-        self._build_program()
-
         self.place = paddle.CUDAPlace(0) if self.use_gpu else paddle.CPUPlace()
         self.exe = paddle.static.Executor(self.place)
-        self.exe.run(paddle.static.default_startup_program())
+
+        ### the programs are built once and cached by the times the
+        ### controller batch is repeated in them.
+        ### {(repeat_times, is_inference): (program, tokens)}
+        self._pred_programs = {}
+        ### {repeat_times: (program, loss)}
+        self._learn_programs = {}
+        self.pred_program, self.tokens = self._get_pred_program(1, False)
+        self.learn_program, self.loss = self._get_learn_program(1)
 
         self.param_dict = self.get_params(self.learn_program)
 
@@ -108,14 +113,25 @@ class LSTM(RLBaseController):
             name='baseline')
         self.baseline.stop_gradient = True
 
-    def _network(self, hidden, cell, init_actions=None, is_inference=False):
+    def _network(self,
+                 hidden,
+                 cell,
+                 repeat_times=1,
+                 init_actions=None,
+                 is_inference=False,
+                 inputs=None):
         actions = []
         entropies = []
         sample_log_probs = []
 
         with fluid.unique_name.guard('Controller'):
             self._create_parameter()
-            inputs = self.g_emb
+            ### the inputs of first step default to emb_g of each repeat
+            if inputs is None:
+                inputs = self.g_emb
+                if repeat_times > 1:
+                    inputs = paddle.tile(
+                        inputs, repeat_times=[repeat_times, 1])
 
             for idx in range(len(self.range_tables)):
                 logits, output, states = self._lstm(
@@ -154,49 +170,88 @@ class LSTM(RLBaseController):
                     param_attr=paddle.ParamAttr(
                         name='emb_w', initializer=uniform_initializer(1.0)))
 
-            self.sample_log_probs = paddle.concat(sample_log_probs, axis=0)
+            ### [batch_size, len(range_tables)]
+            self.sample_log_probs = paddle.concat(sample_log_probs, axis=1)
 
-            entropies = paddle.stack(entropies)
-            self.sample_entropies = paddle.sum(entropies)
+            entropies = paddle.concat(entropies, axis=1)
+            self.sample_entropies = paddle.sum(entropies, axis=1)
 
         return actions
 
-    def _build_program(self, is_inference=False):
-        self.pred_program = paddle.static.Program()
-        self.learn_program = paddle.static.Program()
-        with paddle.static.program_guard(self.pred_program):
-            self.g_emb = paddle.static.create_parameter(
-                name='emb_g',
-                shape=(self.controller_batch_size, self.hidden_size),
-                dtype='float32',
-                default_initializer=uniform_initializer(1.0))
-
-            paddle.assign(
-                fluid.layers.uniform_random(shape=self.g_emb.shape), self.g_emb)
+    def _init_program(self, startup_program):
+        """Run the startup program of a new cached program without resetting
+        the variables initialized by the programs built before."""
+        scope = paddle.static.global_scope()
+        values = {}
+        for var in startup_program.global_block().vars.values():
+            scope_var = scope.find_var(var.name)
+            if scope_var is not None and scope_var.get_tensor(
+            )._is_initialized():
+                values[var.name] = np.array(scope_var.get_tensor())
+        self.exe.run(startup_program)
+        for name, value in values.items():
+            scope.find_var(name).get_tensor().set(value, self.place)
+
+    def _get_pred_program(self, repeat_times, is_inference):
+        key = (repeat_times, is_inference)
+        if key in self._pred_programs:
+            return self._pred_programs[key]
+        pred_program = paddle.static.Program()
+        startup_program = paddle.static.Program()
+        with paddle.static.program_guard(pred_program, startup_program):
+            ### the random inputs are drawn for all the archs in the batch,
+            ### so that each controller batch gets different inputs.
+            inputs = fluid.layers.uniform_random(shape=[
+                repeat_times * self.controller_batch_size, self.hidden_size
+            ])
             hidden = fluid.data(name='hidden', shape=[None, self.hidden_size])
             cell = fluid.data(name='cell', shape=[None, self.hidden_size])
-            self.tokens = self._network(hidden, cell, is_inference=is_inference)
-
-        with paddle.static.program_guard(self.learn_program):
+            tokens = self._network(
+                hidden,
+                cell,
+                repeat_times=repeat_times,
+                is_inference=is_inference,
+                inputs=inputs)
+        self._init_program(startup_program)
+        self._pred_programs[key] = (pred_program, tokens)
+        return self._pred_programs[key]
+
+    def _get_learn_program(self, repeat_times):
+        if repeat_times in self._learn_programs:
+            return self._learn_programs[repeat_times]
+        learn_program = paddle.static.Program()
+        startup_program = paddle.static.Program()
+        ### the same names of optimizer states in all learn programs
+        with paddle.static.program_guard(
+                learn_program, startup_program), fluid.unique_name.guard(
+                    'ControllerLearn'):
             hidden = fluid.data(name='hidden', shape=[None, self.hidden_size])
             cell = fluid.data(name='cell', shape=[None, self.hidden_size])
             init_actions = fluid.data(
                 name='init_actions',
                 shape=[None, len(self.range_tables)],
                 dtype='int64')
-            self._network(hidden, cell, init_actions=init_actions)
+            self._network(
+                hidden,
+                cell,
+                repeat_times=repeat_times,
+                init_actions=init_actions)
 
             rewards = fluid.data(name='rewards', shape=[None])
-            self.rewards = paddle.mean(rewards)
+            ### 0 for the padding archs in the batch
+            reward_mask = fluid.data(name='reward_mask', shape=[None])
 
             if self.weight_entropy is not None:
-                self.rewards += self.weight_entropy * self.sample_entropies
+                rewards += self.weight_entropy * self.sample_entropies
+            self.rewards = paddle.sum(rewards * reward_mask) / paddle.sum(
+                reward_mask)
 
-            self.sample_log_probs = paddle.sum(self.sample_log_probs)
+            sample_log_probs = paddle.sum(self.sample_log_probs, axis=1)
 
             paddle.assign(self.baseline - (1.0 - self.decay) *
                           (self.baseline - self.rewards), self.baseline)
-            self.loss = self.sample_log_probs * (self.rewards - self.baseline)
+            loss = paddle.sum(sample_log_probs * (rewards - self.baseline) *
+                              reward_mask)
             clip = fluid.clip.GradientClipByNorm(clip_norm=5.0)
             if self.decay_steps is not None:
                 lr = paddle.optimizer.lr.ExponentialDecay(
@@ -206,85 +261,76 @@ class LSTM(RLBaseController):
             else:
                 lr = self.controller_lr
             optimizer = paddle.optimizer.Adam(learning_rate=lr, grad_clip=clip)
-            optimizer.minimize(self.loss)
+            optimizer.minimize(loss)
+        self._init_program(startup_program)
+        self._learn_programs[repeat_times] = (learn_program, loss)
+        return self._learn_programs[repeat_times]
 
-    def _create_input(self, is_test=True, actual_rewards=None):
+    def _create_input(self, batch_size):
         feed_dict = dict()
-        np_init_hidden = np.zeros(
-            (self.controller_batch_size, self.hidden_size)).astype('float32')
-        np_init_cell = np.zeros(
-            (self.controller_batch_size, self.hidden_size)).astype('float32')
-
-        feed_dict["hidden"] = np_init_hidden
-        feed_dict["cell"] = np_init_cell
-
-        if is_test == False:
-            if isinstance(actual_rewards, np.float32):
-                assert actual_rewards != None, "if you want to update controller, you must inputs a reward"
-                actual_rewards = np.expand_dims(actual_rewards, axis=0)
-            elif isinstance(actual_rewards, np.float) or isinstance(
-                    actual_rewards, np.float64):
-                actual_rewards = np.float32(actual_rewards)
-                assert actual_rewards != None, "if you want to update controller, you must inputs a reward"
-                actual_rewards = np.expand_dims(actual_rewards, axis=0)
-            else:
-                assert actual_rewards.all(
-                ) != None, "if you want to update controller, you must inputs a reward"
-                actual_rewards = actual_rewards.astype(np.float32)
-
-            feed_dict['rewards'] = actual_rewards
-            feed_dict['init_actions'] = np.array(self.init_tokens).astype(
-                'int64')
-
+        feed_dict["hidden"] = np.zeros(
+            (batch_size, self.hidden_size)).astype('float32')
+        feed_dict["cell"] = np.zeros(
+            (batch_size, self.hidden_size)).astype('float32')
         return feed_dict
 
+    def _repeat_times(self, num_archs):
+        return int(np.ceil(float(num_archs) / self.controller_batch_size))
+
     def next_tokens(self, num_archs=1, params_dict=None, is_inference=False):
-        """ sample next tokens according current parameter and inputs"""
+        """ sample next tokens according current parameter and inputs.
+        All the archs are sampled in one run of the cached program."""
         self.num_archs = num_archs
+        repeat_times = self._repeat_times(num_archs)
+        program, tokens = self._get_pred_program(repeat_times, is_inference)
 
-        self.set_params(self.pred_program, params_dict, self.place)
+        self.set_params(program, params_dict, self.place)
 
-        batch_tokens = []
-        feed_dict = self._create_input()
-
-        for _ in range(
-                int(np.ceil(float(num_archs) / self.controller_batch_size))):
-            if is_inference:
-                self._build_program(is_inference=True)
-
-            actions = self.exe.run(self.pred_program,
-                                   feed=feed_dict,
-                                   fetch_list=self.tokens)
-
-            for idx in range(self.controller_batch_size):
-                each_token = {}
-                for i, action in enumerate(actions):
-                    token = action[idx]
-                    if idx in each_token:
-                        each_token[idx].append(int(token))
-                    else:
-                        each_token[idx] = [int(token)]
-                batch_tokens.append(each_token[idx])
+        feed_dict = self._create_input(repeat_times *
+                                       self.controller_batch_size)
+        actions = self.exe.run(program, feed=feed_dict, fetch_list=tokens)
+        ### [batch_size, len(range_tables)]
+        batch_tokens = np.stack(
+            [np.array(action).reshape([-1]) for action in actions],
+            axis=1).astype('int64').tolist()
 
         self.init_tokens = batch_tokens
-        mod_token = (self.controller_batch_size -
-                     (num_archs % self.controller_batch_size)
-                     ) % self.controller_batch_size
-        if mod_token != 0:
-            return batch_tokens[:-mod_token]
-        else:
-            return batch_tokens
+        return batch_tokens[:num_archs]
 
     def update(self, rewards, params_dict=None):
-        """train controller according reward"""
-        self.set_params(self.learn_program, params_dict, self.place)
-
-        feed_dict = self._create_input(is_test=False, actual_rewards=rewards)
-
-        loss = self.exe.run(self.learn_program,
-                            feed=feed_dict,
-                            fetch_list=[self.loss])
+        """train controller according reward.
+        The rewards is a reward for all the archs sampled by last next_tokens,
+        or a list of rewards for each of them."""
+        rewards = np.array(rewards, dtype='float32').reshape([-1])
+        assert rewards.size > 0, "if you want to update controller, you must inputs a reward"
+        if rewards.size == 1:
+            rewards = np.repeat(rewards, self.num_archs)
+        num_archs = len(rewards)
+        assert num_archs <= len(
+            self.init_tokens
+        ), "got {} rewards for {} archs sampled by next_tokens".format(
+            num_archs, len(self.init_tokens))
+
+        repeat_times = self._repeat_times(num_archs)
+        batch_size = repeat_times * self.controller_batch_size
+        program, loss = self._get_learn_program(repeat_times)
+        self.set_params(program, params_dict, self.place)
+
+        feed_dict = self._create_input(batch_size)
+        init_actions = np.zeros(
+            [batch_size, len(self.range_tables)], dtype='int64')
+        init_actions[:num_archs] = np.array(
+            self.init_tokens[:num_archs], dtype='int64')
+        batch_rewards = np.zeros([batch_size], dtype='float32')
+        batch_rewards[:num_archs] = rewards
+        reward_mask = np.zeros([batch_size], dtype='float32')
+        reward_mask[:num_archs] = 1.0
+        feed_dict['init_actions'] = init_actions
+        feed_dict['rewards'] = batch_rewards
+        feed_dict['reward_mask'] = reward_mask
+
+        loss = self.exe.run(program, feed=feed_dict, fetch_list=[loss])
         _logger.info("Controller: current reward is {}, loss is {}".format(
             rewards, loss))
-        params_dict = self.get_params(self.learn_program)
+        params_dict = self.get_params(program)
         return params_dict
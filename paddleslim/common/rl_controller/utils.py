@@ -12,12 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 import numpy as np
 from ...core import Registry
 
 __all__ = [
     "RLCONTROLLER", "action_mapping", "add_grad", "compute_grad",
-    "ConnectMessage"
+    "ConnectMessage", "pack_params", "unpack_params"
 ]
 
 RLCONTROLLER = Registry('RLController')
@@ -34,6 +35,15 @@ class ConnectMessage:
     EXIT = 'EXIT'
     TIMEOUT = 10
 
+    @staticmethod
+    def encode(message):
+        return str(message).encode('utf-8')
+
+    @staticmethod
+    def decode(frame):
+        return (frame.bytes if hasattr(frame, 'bytes') else frame).decode(
+            'utf-8')
+
 
 def action_mapping(actions, range_table):
     actions = (actions - (-1.0)) * (range_table / np.asarray(2.0))
@@ -52,3 +62,24 @@ def compute_grad(dict1, dict2):
     for key, value in dict1.items():
         dict3[key] = dict1[key] - dict2[key]
     return dict3
+
+
+def pack_params(params_dict):
+    """Pack a dict of numpy arrays into zmq frames. The first frame is a json header of names,
+    dtypes and shapes, and each array is sent as a raw frame without pickling or copying.
+    """
+    names = list(params_dict.keys())
+    arrays = [np.ascontiguousarray(params_dict[name]) for name in names]
+    header = [[name, array.dtype.str, list(array.shape)]
+              for name, array in zip(names, arrays)]
+    return [json.dumps(header).encode('utf-8')] + arrays
+
+
+def unpack_params(frames):
+    """Unpack the frames packed by pack_params. The arrays are read-only views of the received frames."""
+    header = json.loads(ConnectMessage.decode(frames[0]))
+    params_dict = dict()
+    for (name, dtype, shape), frame in zip(header, frames[1:]):
+        buf = frame.buffer if hasattr(frame, 'buffer') else frame
+        params_dict[name] = np.frombuffer(buf, dtype=dtype).reshape(shape)
+    return params_dict
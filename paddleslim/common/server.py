@@ -25,34 +25,59 @@ import logging
 import time
 import threading
 from .log_helper import get_logger
-from .rl_controller.utils import add_grad, ConnectMessage
+from .rl_controller.utils import add_grad, ConnectMessage, pack_params, unpack_params
 
 _logger = get_logger(__name__, level=logging.INFO)
 
 
 class Server(object):
+    """
+    The server holding the parameters of controller for clients.
+
+    The parameters are versioned. A client fetches the parameters only when
+    its version is out of date, and the numpy arrays are sent as raw frames.
+    In sync mode, the gradients of all clients are summed in one round and the
+    waiting clients are notified when the round is done. The parameters are
+    saved by a background thread every 'save_interval' seconds if changed.
+
+    Args:
+        controller: The controller.
+        address(tuple): The ip and port of server.
+        is_sync(bool): Whether to update parameters after all clients reported. Default: False.
+        load_controller(str): The directory to load parameters from. Default: None.
+        save_controller(str|bool): The directory to save parameters to. False means not to save. Default: None.
+        save_interval(float): The seconds between two checkpoints. Default: 60.
+    """
+
     def __init__(self,
                  controller,
                  address,
                  is_sync=False,
                  load_controller=None,
-                 save_controller=None):
+                 save_controller=None,
+                 save_interval=60):
         self._controller = controller
         self._address = address
         self._ip = self._address[0]
         self._port = self._address[1]
         self._is_sync = is_sync
-        self._done = False
         self._load_controller = load_controller
         self._save_controller = save_controller
+        self._save_interval = save_interval
         ### key-value : client_name-update_times
         self._client_dict = dict()
+        ### clients and gradients reported in current round of sync mode
         self._client = list()
+        self._grads = list()
+        self._version = 0
+        self._saved_version = 0
         self._lock = threading.Lock()
         self._server_alive = True
         self._max_update_times = 0
 
     def close(self):
+        if self._server_alive and self._save_controller != False:
+            self.save_params()
         self._server_alive = False
         _logger.info("server closed")
         pid = os.getpid()
@@ -68,9 +93,6 @@ class Server(object):
         _logger.info("ControllerServer Start!!!")
         _logger.debug("ControllerServer - listen on: [{}]".format(
             server_address))
-        thread = threading.Thread(target=self.run, args=())
-        thread.setDaemon(True)
-        thread.start()
 
         if self._load_controller:
             assert os.path.exists(
@@ -88,107 +110,158 @@ class Server(object):
             self._params_dict = self._controller.param_dict
 
         if self._is_sync:
-            self._wait_socket = self._ctx.socket(zmq.REP)
+            ### waiting clients are answered when a round is done
+            self._wait_socket = self._ctx.socket(zmq.ROUTER)
             self._wait_port = self._wait_socket.bind_to_random_port(
                 addr="tcp://*")
-            self._wait_socket_linger = 0
+            self._wait_socket.linger = 0
+            notify_address = "inproc://rlnas_notify_{}".format(id(self))
+            self._notify_recv = self._ctx.socket(zmq.PAIR)
+            self._notify_recv.bind(notify_address)
+            self._notify_send = self._ctx.socket(zmq.PAIR)
+            self._notify_send.connect(notify_address)
             wait_thread = threading.Thread(
                 target=self._wait_for_params, args=())
             wait_thread.setDaemon(True)
             wait_thread.start()
 
+        if self._save_controller != False:
+            self._save_event = threading.Event()
+            save_thread = threading.Thread(target=self._save_loop, args=())
+            save_thread.setDaemon(True)
+            save_thread.start()
+
+        thread = threading.Thread(target=self.run, args=())
+        thread.setDaemon(True)
+        thread.start()
+
     def _wait_for_params(self):
+        poller = zmq.Poller()
+        poller.register(self._wait_socket, zmq.POLLIN)
+        poller.register(self._notify_recv, zmq.POLLIN)
+        ### [(identity, version the client is waiting to be passed)]
+        waiting = []
         try:
             while self._server_alive:
-                message = self._wait_socket.recv_multipart()
-                cmd = pickle.loads(message[0])
-                client_name = pickle.loads(message[1])
-                if cmd == ConnectMessage.WAIT_PARAMS:
-                    _logger.debug("Server: wait for params")
-                    self._lock.acquire()
-                    self._wait_socket.send_multipart([
-                        pickle.dumps(ConnectMessage.OK)
-                        if self._done else pickle.dumps(ConnectMessage.WAIT)
-                    ])
-                    if self._done and client_name in self._client:
-                        self._client.remove(client_name)
-                    if len(self._client) == 0:
-                        if self._save_controller != False:
-                            self.save_params()
-                        self._done = False
-                    self._lock.release()
-                else:
-                    _logger.error("Error message {}".format(message))
-                    raise NotImplementedError
+                events = dict(poller.poll(1000))
+                if self._notify_recv in events:
+                    self._notify_recv.recv()
+                if self._wait_socket in events:
+                    message = self._wait_socket.recv_multipart()
+                    identity, cmd = message[0], ConnectMessage.decode(
+                        message[2])
+                    if cmd != ConnectMessage.WAIT_PARAMS:
+                        _logger.error("Error message {}".format(message))
+                        raise NotImplementedError
+                    waiting.append((identity,
+                                    int(ConnectMessage.decode(message[4]))))
+                with self._lock:
+                    version = self._version
+                still_waiting = []
+                for identity, client_version in waiting:
+                    if version > client_version:
+                        self._wait_socket.send_multipart([
+                            identity, b'', ConnectMessage.encode(
+                                ConnectMessage.OK)
+                        ])
+                    else:
+                        still_waiting.append((identity, client_version))
+                waiting = still_waiting
         except Exception as err:
-            logger.error(err)
+            _logger.error(err)
+
+    def _save_loop(self):
+        while self._server_alive:
+            self._save_event.wait(self._save_interval)
+            if self._version != self._saved_version:
+                self.save_params()
+
+    def _get_weight(self, message):
+        client_version = int(ConnectMessage.decode(message[2])) if len(
+            message) > 2 else -1
+        with self._lock:
+            version, params_dict = self._version, self._params_dict
+        reply = [ConnectMessage.encode(version)]
+        if client_version != version:
+            reply += pack_params(params_dict)
+        self._server_socket.send_multipart(reply, copy=False)
+
+    def _update_weight(self, client_name, params_dict_grad):
+        if self._is_sync:
+            with self._lock:
+                self._grads.append(params_dict_grad)
+                self._client.append(client_name)
+                version = self._version
+                done = self._finish_round()
+            self._server_socket.send_multipart([
+                ConnectMessage.encode(ConnectMessage.WAIT),
+                ConnectMessage.encode(self._wait_port),
+                ConnectMessage.encode(version)
+            ])
+            if done:
+                self._notify_send.send(b'')
+        else:
+            with self._lock:
+                self._params_dict = add_grad(self._params_dict,
+                                             params_dict_grad)
+                self._version += 1
+                self._client_dict[client_name] += 1
+                if self._client_dict[client_name] > self._max_update_times:
+                    self._max_update_times = self._client_dict[client_name]
+            self._server_socket.send_multipart(
+                [ConnectMessage.encode(ConnectMessage.OK)])
+
+    def _finish_round(self):
+        """Apply the gradients of current round if all clients reported.
+        It should be called with the lock held."""
+        if len(self._client) == 0 or len(self._client) < len(
+                self._client_dict):
+            return False
+        params_dict = self._params_dict
+        for grad in self._grads:
+            params_dict = add_grad(params_dict, grad)
+        self._params_dict = params_dict
+        self._version += 1
+        self._grads = list()
+        self._client = list()
+        return True
 
     def run(self):
         try:
             while self._server_alive:
                 try:
-                    sum_params_dict = dict()
-                    message = self._server_socket.recv_multipart()
-                    cmd = pickle.loads(message[0])
-                    client_name = pickle.loads(message[1])
+                    message = self._server_socket.recv_multipart(copy=False)
+                    cmd = ConnectMessage.decode(message[0])
+                    client_name = ConnectMessage.decode(message[1])
                     if cmd == ConnectMessage.INIT:
-                        self._server_socket.send_multipart(
-                            [pickle.dumps(ConnectMessage.INIT_DONE)])
+                        self._server_socket.send_multipart([
+                            ConnectMessage.encode(ConnectMessage.INIT_DONE)
+                        ])
                         _logger.debug("Server: init client {}".format(
                             client_name))
                         self._client_dict[client_name] = 0
                     elif cmd == ConnectMessage.GET_WEIGHT:
-                        self._lock.acquire()
                         _logger.debug("Server: get weight {}".format(
                             client_name))
-                        self._server_socket.send_multipart(
-                            [pickle.dumps(self._params_dict)])
+                        self._get_weight(message)
                         _logger.debug("Server: send params done {}".format(
                             client_name))
-                        self._lock.release()
                     elif cmd == ConnectMessage.UPDATE_WEIGHT:
                         _logger.info("Server: update {}".format(client_name))
-                        params_dict_grad = pickle.loads(message[2])
-                        if self._is_sync:
-                            if not sum_params_dict:
-                                sum_params_dict = self._params_dict
-                            self._lock.acquire()
-                            sum_params_dict = add_grad(sum_params_dict,
-                                                       params_dict_grad)
-                            self._client.append(client_name)
-                            self._lock.release()
-
-                            if len(self._client) == len(
-                                    self._client_dict.items()):
-                                self._done = True
-                                self._params_dict = sum_params_dict
-                                del sum_params_dict
-
-                            self._server_socket.send_multipart([
-                                pickle.dumps(ConnectMessage.WAIT),
-                                pickle.dumps(self._wait_port)
-                            ])
-                        else:
-                            self._lock.acquire()
-                            self._params_dict = add_grad(self._params_dict,
-                                                         params_dict_grad)
-                            self._client_dict[client_name] += 1
-                            if self._client_dict[
-                                    client_name] > self._max_update_times:
-                                self._max_update_times = self._client_dict[
-                                    client_name]
-                            self._lock.release()
-                            if self._save_controller != False:
-                                self.save_params()
-                            self._server_socket.send_multipart(
-                                [pickle.dumps(ConnectMessage.OK)])
-
+                        self._update_weight(client_name,
+                                            unpack_params(message[2:]))
                     elif cmd == ConnectMessage.EXIT:
-                        self._client_dict.pop(client_name)
-                        if client_name in self._client:
-                            self._client.remove(client_name)
+                        with self._lock:
+                            self._client_dict.pop(client_name, None)
+                            if client_name in self._client:
+                                index = self._client.index(client_name)
+                                self._client.pop(index)
+                                self._grads.pop(index)
+                            done = self._is_sync and self._finish_round()
                         self._server_socket.send_multipart(
-                            [pickle.dumps(ConnectMessage.EXIT)])
+                            [ConnectMessage.encode(ConnectMessage.EXIT)])
+                        if done:
+                            self._notify_send.send(b'')
                 except zmq.error.Again as e:
                     _logger.error(e)
             self.close()
@@ -211,6 +284,13 @@ class Server(object):
                 os.makedirs('./.rlnas_controller')
             output_dir = './.rlnas_controller'
 
-        with open(os.path.join(output_dir, 'rlnas.params'), 'wb') as f:
-            pickle.dump(self._params_dict, f)
+        ### the arrays are replaced rather than modified by updates, so a
+        ### shallow copy is a consistent snapshot.
+        with self._lock:
+            version, params_dict = self._version, dict(self._params_dict)
+        params_file = os.path.join(output_dir, 'rlnas.params')
+        with open(params_file + '.tmp', 'wb') as f:
+            pickle.dump(params_dict, f)
+        os.replace(params_file + '.tmp', params_file)
+        self._saved_version = version
         _logger.debug("Save params done")
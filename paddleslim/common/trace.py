@@ -0,0 +1,247 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Timing spans, counters and gauges of the compression APIs."""
+
+import os
+import json
+import time
+import logging
+import threading
+import functools
+from .log_helper import get_logger
+
+__all__ = ['Tracer', 'tracer', 'traced']
+
+_logger = get_logger(__name__, level=logging.INFO)
+
+
+class _NoopSpan(object):
+    """The span returned when tracing is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span(object):
+    def __init__(self, tracer, name, phase, args):
+        self._tracer = tracer
+        self._name = name
+        self._phase = phase
+        self._args = args
+        self._children = 0.
+
+    def __enter__(self):
+        self._tracer._stack().append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        duration = time.perf_counter() - self._start
+        stack = self._tracer._stack()
+        stack.pop()
+        if len(stack) > 0:
+            stack[-1]._children += duration
+        self._tracer._add_span(self._name, self._phase, self._start, duration,
+                               duration - self._children, self._args)
+        return False
+
+
+class Tracer(object):
+    """
+    Record the nested timing spans, counters and byte-size gauges. It does
+    nothing until ``enable`` is called, and a disabled span costs a check of
+    one flag.
+
+    The spans are grouped by phase, such as 'graph_walk', 'tensor_copy',
+    'eval' and 'io'. The self time of a span excludes the time of its child
+    spans, so the self times of all phases add up to the traced wall time.
+
+    Examples:
+        .. code-block:: python
+
+            from paddleslim.common import tracer
+
+            tracer.enable()
+            pruner.prune(program, scope, params, ratios, place)
+            print(tracer.summary())
+            tracer.export_chrome_trace('prune_trace.json')
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """Clear the recorded events."""
+        with self._lock:
+            self._origin = time.perf_counter()
+            self._events = []
+            self._phases = {}
+            self._counters = {}
+            self._gauges = {}
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, *span_args, **args):
+        """
+        Get a context manager timing the code in it, called as
+        ``span(name, phase=None, **args)``. The name and phase are only
+        taken by position, so ``name`` and ``phase`` can be the keys of
+        args too.
+
+        Args:
+            name(str): The name of span.
+            phase(str): The phase of span. None means the name. Default: None.
+            args: The extra information shown in the trace.
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        assert 1 <= len(span_args) <= 2, \
+            "span takes the name and an optional phase by position, but got {}.".format(
+                span_args)
+        name, phase = (tuple(span_args) + (None, ))[:2]
+        return _Span(self, name, phase or name, args)
+
+    def _add_span(self, name, phase, start, duration, self_time, args):
+        event = {
+            'name': name,
+            'cat': phase,
+            'ph': 'X',
+            'ts': (start - self._origin) * 1e6,
+            'dur': duration * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident()
+        }
+        if args:
+            event['args'] = dict((k, str(v)) for k, v in args.items())
+        with self._lock:
+            self._events.append(event)
+            stat = self._phases.setdefault(phase,
+                                           {'count': 0,
+                                            'total': 0.,
+                                            'self': 0.})
+            stat['count'] += 1
+            stat['total'] += duration
+            stat['self'] += self_time
+
+    def _add_value(self, values, name, value, accumulate):
+        with self._lock:
+            if accumulate:
+                value = values.get(name, 0) + value
+            values[name] = value
+            self._events.append({
+                'name': name,
+                'ph': 'C',
+                'ts': (time.perf_counter() - self._origin) * 1e6,
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'args': {
+                    name: value
+                }
+            })
+
+    def counter(self, name, value=1):
+        """Add value to the counter."""
+        if self.enabled:
+            self._add_value(self._counters, name, value, True)
+
+    def gauge(self, name, nbytes):
+        """Set the gauge to the size in bytes, such as the size of the
+        tensors copied."""
+        if self.enabled:
+            self._add_value(self._gauges, name, nbytes, False)
+
+    def summary(self):
+        """
+        Returns:
+            dict: The count, total time and self time in seconds of each
+                  phase, and the values of counters and gauges, in format
+                  ``{'phases': {phase: {'count', 'total', 'self'}}, 'counters': {}, 'gauges': {}}``.
+        """
+        with self._lock:
+            return {
+                'phases': dict((phase, dict(stat))
+                               for phase, stat in self._phases.items()),
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges)
+            }
+
+    def log_summary(self):
+        """Log the phases sorted by self time."""
+        summary = self.summary()
+        phases = sorted(
+            summary['phases'].items(),
+            key=lambda item: item[1]['self'],
+            reverse=True)
+        for phase, stat in phases:
+            _logger.info(
+                "phase: {}; count: {}; total: {:.4f}s; self: {:.4f}s".format(
+                    phase, stat['count'], stat['total'], stat['self']))
+        for name, value in summary['counters'].items():
+            _logger.info("counter: {}; value: {}".format(name, value))
+        for name, value in summary['gauges'].items():
+            _logger.info("gauge: {}; bytes: {}".format(name, value))
+
+    def export_chrome_trace(self, path):
+        """Save the events in the Chrome trace format, which can be opened
+        by chrome://tracing or Perfetto."""
+        with self._lock:
+            events = list(self._events)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+tracer = Tracer()
+
+
+def traced(name=None, phase=None):
+    """
+    Decorate a function to be timed by the span of ``tracer``.
+
+    Args:
+        name(str): The name of span. None means the qualified name of function.
+        phase(str): The phase of span. None means the name. Default: None.
+    """
+
+    def _decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def _wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with _Span(tracer, span_name, phase or span_name, None):
+                return func(*args, **kwargs)
+
+        return _wrapper
+
+    return _decorator
@@ -14,3 +14,4 @@
 
 from .single_distiller import merge, fsp_loss, l2_loss, soft_label_loss, loss
 from .dml import DML
+from .teacher_store import save_teacher_outputs, TeacherOutputStore
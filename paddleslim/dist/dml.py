@@ -24,10 +24,23 @@ from paddle.nn import LogSoftmax
 
 
 class DML(nn.Layer):
-    def __init__(self, model, use_parallel=False):
+    """
+    Deep mutual learning of peer models.
+
+    Args:
+        model(list<nn.Layer>): The peer models.
+        use_parallel(bool): Whether the models are trained by data parallel. Default: False.
+        fuse(bool): Whether to compute the losses of all peers in batched expressions and
+                    update all peers after a single backward. The peer distributions in
+                    the KL losses are treated as constant targets, so each loss only
+                    trains its own model. Default: False.
+    """
+
+    def __init__(self, model, use_parallel=False, fuse=False):
         super(DML, self).__init__()
         self.model = model
         self.use_parallel = use_parallel
+        self.fuse = fuse
         self.model_num = len(self.model)
 
     def full_name(self):
@@ -40,13 +53,16 @@ class DML(nn.Layer):
         assert len(
             optimizer
         ) == self.model_num, "The number of optimizers must match the number of models"
-        optimizer = DMLOptimizers(self.model, optimizer, self.use_parallel)
+        optimizer = DMLOptimizers(self.model, optimizer, self.use_parallel,
+                                  self.fuse)
         return optimizer
 
     def ce_loss(self, logits, labels):
         assert len(
             logits
         ) == self.model_num, "The number of logits must match the number of models"
+        if self.fuse:
+            return self._fused_ce_loss(logits, labels)
         ce_losses = []
         for i in range(self.model_num):
             ce_losses.append(
@@ -61,6 +77,8 @@ class DML(nn.Layer):
         ) == self.model_num, "The number of logits must match the number of models"
         if self.model_num == 1:
             return []
+        if self.fuse:
+            return self._fused_kl_loss(logits)
         kl_losses = []
         for i in range(self.model_num):
             cur_kl_loss = 0
@@ -75,6 +93,28 @@ class DML(nn.Layer):
             kl_losses.append(cur_kl_loss / (self.model_num - 1))
         return kl_losses
 
+    def _fused_ce_loss(self, logits, labels):
+        # The logits of all peers are [model_num * batch_size, class_num].
+        stacked = paddle.concat(logits, axis=0)
+        labels = paddle.concat([labels] * self.model_num, axis=0)
+        ce = paddle.nn.functional.softmax_with_cross_entropy(stacked, labels)
+        ce = paddle.mean(paddle.reshape(ce, [self.model_num, -1]), axis=1)
+        return [ce[i] for i in range(self.model_num)]
+
+    def _fused_kl_loss(self, logits):
+        # KL(p_j || p_i) = sum(p_j * log(p_j)) - sum(p_j * log(p_i)), so the
+        # mean KL of peer i to the others is computed from the negative
+        # entropies of all peers and the sum of the other distributions.
+        log_probs = nn.functional.log_softmax(paddle.stack(logits), axis=-1)
+        probs = paddle.exp(log_probs).detach()
+        neg_entropy = paddle.sum(probs * log_probs.detach(), axis=[1, 2])
+        others = paddle.sum(probs, axis=0, keepdim=True) - probs
+        cross = paddle.sum(others * log_probs, axis=[1, 2])
+        batch_size = log_probs.shape[1]
+        kl = (paddle.sum(neg_entropy) - neg_entropy - cross) / (
+            batch_size * (self.model_num - 1))
+        return [kl[i] for i in range(self.model_num)]
+
     def loss(self, logits, labels):
         gt_losses = self.ce_loss(logits, labels)
         kl_losses = self.kl_loss(logits)
@@ -100,15 +140,19 @@ class DML(nn.Layer):
 
 
 class DMLOptimizers(object):
-    def __init__(self, model, optimizer, use_parallel):
+    def __init__(self, model, optimizer, use_parallel, fuse=False):
         self.model = model
         self.optimizer = optimizer
         self.use_parallel = use_parallel
+        self.fuse = fuse
 
     def minimize(self, losses):
         assert len(losses) == len(
             self.optimizer
         ), "The number of losses must match the number of optimizers"
+        if self.fuse:
+            self._fused_minimize(losses)
+            return
         for i in range(len(losses)):
             if self.use_parallel:
                 losses[i] = self.model[i].scale_loss(losses[i])
@@ -119,6 +163,21 @@ class DMLOptimizers(object):
             self.optimizer[i].minimize(losses[i])
             self.model[i].clear_gradients()
 
+    def _fused_minimize(self, losses):
+        # The gradients of each loss only reach its own model, so all the
+        # models are updated after one backward of the summed losses.
+        if self.use_parallel:
+            losses = [
+                self.model[i].scale_loss(losses[i])
+                for i in range(len(losses))
+            ]
+        paddle.add_n(losses).backward()
+        for i in range(len(losses)):
+            if self.use_parallel:
+                self.model[i].apply_collective_grads()
+            self.optimizer[i].step()
+            self.model[i].clear_gradients()
+
     def get_lr(self):
         current_step_lr = [opt.current_step_lr() for opt in self.optimizer]
         return current_step_lr
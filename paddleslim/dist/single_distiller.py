@@ -14,7 +14,6 @@
 
 import numpy as np
 import paddle
-from paddleslim.core import GraphWrapper
 
 
 def merge(teacher_program,
@@ -22,7 +21,8 @@ def merge(teacher_program,
           data_name_map,
           place,
           scope=None,
-          name_prefix='teacher_'):
+          name_prefix='teacher_',
+          share_params=False):
     """Merge teacher program into student program and add a uniform prefix to the
     names of all vars in teacher program
 
@@ -40,6 +40,12 @@ def merge(teacher_program,
                       will be used. Default: None
         name_prefix(str): Name prefix added for all vars of the teacher program.
                           Default: 'teacher_'
+        share_params(bool): Whether the renamed persistable vars share the
+                          tensors of the origin teacher vars in scope instead
+                          of copying them through host memory. The shared
+                          tensors are updated together, so don't set it to True
+                          if the teacher vars have the same names as student
+                          vars in the same scope. Default: False
 
     Returns:
         None
@@ -47,6 +53,7 @@ def merge(teacher_program,
     if scope == None:
         scope = paddle.static.global_scope()
     teacher_program = teacher_program.clone(for_test=True)
+    teacher_var_names = set()
     for teacher_var in teacher_program.list_vars():
         skip_rename = False
         if teacher_var.name != 'fetch' and teacher_var.name != 'feed':
@@ -56,54 +63,41 @@ def merge(teacher_program,
                     skip_rename = True
             else:
                 new_name = name_prefix + teacher_var.name
+                teacher_var_names.add(new_name)
             if not skip_rename:
                 # scope var rename
                 old_var = scope.var(teacher_var.name).get_tensor()
                 renamed_var = scope.var(new_name).get_tensor()
-                renamed_var.set(np.array(old_var), place)
+                if share_params:
+                    # non-persistable vars are computed in running, so only
+                    # initialized persistable vars need to be shared.
+                    if teacher_var.persistable and old_var._is_initialized():
+                        renamed_var._share_data_with(old_var)
+                else:
+                    renamed_var.set(np.array(old_var), place)
 
                 # program var rename
                 renamed_var = teacher_program.global_block()._rename_var(
                     teacher_var.name, new_name)
 
+    student_block = student_program.global_block()
     for teacher_var in teacher_program.list_vars():
         if teacher_var.name != 'fetch' and teacher_var.name != 'feed':
             # student program add var
-            new_var = student_program.global_block()._clone_variable(
+            new_var = student_block._clone_variable(
                 teacher_var, force_persistable=False)
             new_var.stop_gradient = True
 
+    # copy the op descs of teacher directly and create python ops once by
+    # syncing with desc, the ops reading teacher vars will skip quantization.
     for block in teacher_program.blocks:
         for op in block.ops:
             if op.type != 'feed' and op.type != 'fetch':
-                inputs = {}
-                outputs = {}
-                attrs = {}
-                for input_name in op.input_names:
-                    inputs[input_name] = [
-                        block.var(in_var_name)
-                        for in_var_name in op.input(input_name)
-                    ]
-
-                for output_name in op.output_names:
-                    outputs[output_name] = [
-                        block.var(out_var_name)
-                        for out_var_name in op.output(output_name)
-                    ]
-                for attr_name in op.attr_names:
-                    attrs[attr_name] = op.attr(attr_name)
-                student_program.global_block().append_op(
-                    type=op.type, inputs=inputs, outputs=outputs, attrs=attrs)
-
-    student_graph = GraphWrapper(student_program)
-    for op in student_graph.ops():
-        belongsto_teacher = False
-        for inp in op.all_inputs():
-            if 'teacher' in inp.name():
-                belongsto_teacher = True
-                break
-        if belongsto_teacher:
-            op._op._set_attr("skip_quant", True)
+                op_desc = student_block.desc.append_op()
+                op_desc.copy_from(op.desc)
+                if not teacher_var_names.isdisjoint(op.input_arg_names):
+                    op_desc._set_attr("skip_quant", True)
+    student_block._sync_with_cpp()
 
 
 def fsp_loss(teacher_var1_name,
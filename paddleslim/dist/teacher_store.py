@@ -0,0 +1,230 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+import logging
+import numpy as np
+import paddle
+from ..common import get_logger
+
+__all__ = ['save_teacher_outputs', 'TeacherOutputStore']
+
+_logger = get_logger(__name__, level=logging.INFO)
+
+_META_FILE = 'meta.json'
+
+
+def _topk(value, k):
+    """Select the top k values and their indices along the last axis."""
+    indices = np.argpartition(-value, k - 1, axis=-1)[..., :k]
+    values = np.take_along_axis(value, indices, axis=-1)
+    return values, indices
+
+
+def save_teacher_outputs(teacher_program,
+                         data_loader,
+                         fetch_names,
+                         place,
+                         save_dir,
+                         scope=None,
+                         dtype='float16',
+                         top_k=None,
+                         fill_value=-1e9):
+    """Run teacher program on the whole dataset once and save the outputs into a
+    memory-mapped store, which can be fed into student program as extra inputs
+    instead of merging teacher program into student program. The id of a sample
+    is its position in data_loader, so data_loader must not be shuffled.
+
+    Args:
+        teacher_program(Program): The input teacher model paddle program.
+        data_loader(Python Generator, Paddle.io.DataLoader): The data loader
+                   of teacher program, which yields the feed dict of a batch.
+        fetch_names(list<str>): The names of teacher variables to be saved,
+                   such as the logits for soft_label_loss or the feature maps
+                   for fsp_loss and l2_loss.
+        place(CPUPlace()|CUDAPlace(N)): This parameter represents
+                   paddle run on which device.
+        save_dir(str): The directory to save the store.
+        scope(Scope): This parameter indicates the variable scope used by
+                   the program. If not specified, the default global scope
+                   will be used. Default: None
+        dtype(str): The data type used to save the outputs. Default: 'float16'
+        top_k(dict|None): The mapping from variable name to k. Only the top k
+                   values along the last axis of the variable are saved, and
+                   the others are filled with fill_value when loading. It is
+                   used to sparsify the logits. Default: None
+        fill_value(float): The value of the elements dropped by top_k. The
+                   default value makes their softmax probabilities zero.
+                   Default: -1e9
+
+    Returns:
+        TeacherOutputStore: The saved store.
+    """
+    if scope == None:
+        scope = paddle.static.global_scope()
+    top_k = {} if top_k is None else top_k
+    if not os.path.exists(save_dir):
+        os.makedirs(save_dir)
+    program = teacher_program.clone(for_test=True)
+    exe = paddle.static.Executor(place)
+
+    outputs = {}
+    files = {}
+    for i, name in enumerate(fetch_names):
+        outputs[name] = {'file': 'output_{}.bin'.format(i), 'dtype': dtype}
+        files[name] = open(
+            os.path.join(save_dir, outputs[name]['file']), 'wb')
+        if name in top_k:
+            outputs[name]['top_k'] = top_k[name]
+            outputs[name]['fill_value'] = fill_value
+            outputs[name]['index_file'] = 'index_{}.bin'.format(i)
+            files[name + '@index'] = open(
+                os.path.join(save_dir, outputs[name]['index_file']), 'wb')
+
+    num_samples = 0
+    try:
+        for data in data_loader():
+            if isinstance(data, list) and len(data) == 1:
+                data = data[0]
+            values = exe.run(program,
+                             feed=data,
+                             fetch_list=fetch_names,
+                             scope=scope,
+                             return_numpy=True)
+            for name, value in zip(fetch_names, values):
+                if 'shape' not in outputs[name]:
+                    outputs[name]['shape'] = list(value.shape[1:])
+                if name in top_k:
+                    value, index = _topk(value, top_k[name])
+                    if 'index_dtype' not in outputs[name]:
+                        outputs[name]['index_dtype'] = 'uint16' if outputs[
+                            name]['shape'][-1] <= 65536 else 'int32'
+                    files[name + '@index'].write(
+                        index.astype(outputs[name]['index_dtype']).tobytes())
+                files[name].write(value.astype(dtype).tobytes())
+            num_samples += values[0].shape[0]
+    finally:
+        for f in files.values():
+            f.close()
+
+    meta = {'num_samples': num_samples, 'outputs': outputs}
+    with open(os.path.join(save_dir, _META_FILE), 'w') as f:
+        json.dump(meta, f)
+    _logger.info("Saved outputs of {} samples from teacher to {}".format(
+        num_samples, save_dir))
+    return TeacherOutputStore(save_dir)
+
+
+class TeacherOutputStore(object):
+    """The teacher outputs saved by ``save_teacher_outputs``. The outputs are
+    memory-mapped, so only the samples of the requested batch are read.
+
+    Args:
+        save_dir(str): The directory of the store.
+    """
+
+    def __init__(self, save_dir):
+        with open(os.path.join(save_dir, _META_FILE), 'r') as f:
+            meta = json.load(f)
+        self.num_samples = meta['num_samples']
+        self._outputs = meta['outputs']
+        self._arrays = {}
+        self._indices = {}
+        for name, info in self._outputs.items():
+            shape = info['shape']
+            if 'top_k' in info:
+                shape = shape[:-1] + [info['top_k']]
+                self._indices[name] = np.memmap(
+                    os.path.join(save_dir, info['index_file']),
+                    dtype=info['index_dtype'],
+                    mode='r',
+                    shape=tuple([self.num_samples] + shape))
+            self._arrays[name] = np.memmap(
+                os.path.join(save_dir, info['file']),
+                dtype=info['dtype'],
+                mode='r',
+                shape=tuple([self.num_samples] + shape))
+
+    @property
+    def names(self):
+        return list(self._outputs.keys())
+
+    def get(self, sample_ids):
+        """Load the outputs of samples.
+
+        Args:
+            sample_ids(list<int>|numpy.ndarray): The ids of samples.
+
+        Returns:
+            dict: The mapping from variable name to its float32 value.
+        """
+        ids = np.asarray(sample_ids).reshape([-1]).astype('int64')
+        results = {}
+        for name, info in self._outputs.items():
+            value = self._arrays[name][ids].astype('float32')
+            if 'top_k' in info:
+                dense = np.full(
+                    [len(ids)] + info['shape'],
+                    info['fill_value'],
+                    dtype='float32')
+                np.put_along_axis(
+                    dense,
+                    self._indices[name][ids].astype('int64'),
+                    value,
+                    axis=-1)
+                value = dense
+            results[name] = value
+        return results
+
+    def feed(self, sample_ids, name_prefix='teacher_'):
+        """Get the feed dict of the inputs created by ``create_inputs``.
+
+        Args:
+            sample_ids(list<int>|numpy.ndarray): The ids of samples in batch.
+            name_prefix(str): The name prefix of inputs. Default: 'teacher_'
+
+        Returns:
+            dict: The feed dict.
+        """
+        return {
+            name_prefix + name: value
+            for name, value in self.get(sample_ids).items()
+        }
+
+    def create_inputs(self, program=None, name_prefix='teacher_'):
+        """Add an input variable for each saved output into program, so the
+        distillation losses such as ``soft_label_loss`` can use the saved
+        outputs by name, just like the variables merged by ``merge``.
+
+        Args:
+            program(Program): The student program. If not specified, the default
+                              program will be used. Default: None
+            name_prefix(str): The name prefix of inputs. Default: 'teacher_'
+
+        Returns:
+            list<Variable>: The created input variables.
+        """
+        if program == None:
+            program = paddle.static.default_main_program()
+        inputs = []
+        with paddle.static.program_guard(program):
+            for name, info in self._outputs.items():
+                var = paddle.static.data(
+                    name=name_prefix + name,
+                    shape=[None] + info['shape'],
+                    dtype='float32')
+                var.stop_gradient = True
+                inputs.append(var)
+        return inputs
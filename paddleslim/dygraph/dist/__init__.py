@@ -15,8 +15,10 @@
 from . import distill
 from .distill import *
 from .distill_helpers import *
+from .teacher_cache import *
 
 __all__ = []
 
 __all__ += distill.__all__
 __all__ += distill_helpers.__all__
+__all__ += teacher_cache.__all__
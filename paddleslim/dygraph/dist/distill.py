@@ -18,6 +18,7 @@ import numpy as np
 import paddle
 import paddle.nn as nn
 from ...common.wrapper_function import init_index, functional2layer
+from ...common import tracer, traced
 from . import losses
 from .losses.basic_loss import BASIC_LOSS
 from .distill_helpers import yaml2config
@@ -86,11 +87,6 @@ def _add_hooks(model, outs, layers_name, hook_layers_name, io='o', idx="None"):
     return hooks
 
 
-def _remove_hooks(hooks):
-    for hook in hooks:
-        hook.remove()
-
-
 class Distill(nn.Layer):
     """
         Distill API.
@@ -100,6 +96,9 @@ class Distill(nn.Layer):
         convert_fn(bool): convert the functional in paddlepaddle to nn.Layer. The detail of this convert operation please 
                           reference to ```paddleslim.common.functional2layer```. Default: True.
         return_model_outputs(bool): whether to return the origin outputs of the model. If set to True, will return distill loss, the output of students and the output of teachers, the output of each part will be returned as a list. Default: True.
+        teacher_cache(TeacherCache|None): the cache of teacher outputs keyed by sample id. If it is set and ```sample_ids``` is passed to forward,
+                          the outputs of teachers in eval mode are loaded from cache instead of running the teachers when all samples
+                          in the batch are cached. The detail of the cache please reference to ```paddleslim.dygraph.dist.TeacherCache```. Default: None.
     """
 
     def __init__(self,
@@ -107,7 +106,8 @@ class Distill(nn.Layer):
                  students,
                  teachers,
                  convert_fn=True,
-                 return_model_outputs=True):
+                 return_model_outputs=True,
+                 teacher_cache=None):
         super(Distill, self).__init__()
         if convert_fn:
             functional2layer()
@@ -128,6 +128,7 @@ class Distill(nn.Layer):
         self._student_models = nn.LayerList(students)
         self._teacher_models = nn.LayerList(teachers)
         self._return_model_outputs = return_model_outputs
+        self._teacher_cache = teacher_cache
 
         self._loss_config_list = []
         for c in self._configs:
@@ -141,6 +142,7 @@ class Distill(nn.Layer):
         self.distill_loss = losses.CombinedLoss(self._loss_config_list)
 
         self._output_tensor_dict = self._prepare_outputs(hook_layers)
+        self.forward_hooks = []
         self._check_hook_output = False
 
     def parameters(self):
@@ -195,18 +197,24 @@ class Distill(nn.Layer):
 
     def _prepare_outputs(self, hook_layers, in_forward=False):
         """
-        Add hook to get the output tensor of target layer.
+        Add hook to get the output tensor of target layer. The hooks of
+        wrapped functional layers are added into the existing output dicts
+        when in_forward is True.
         """
         outputs_tensor = {}
         for idx, m in enumerate(self._student_models):
-            tmp_hook_layers = hook_layers['student_{}'.format(idx)]
-            stu_outs = collections.OrderedDict()
-            outputs_tensor['student_{}'.format(idx)] = self._prepare_hook(
+            model_name = 'student_{}'.format(idx)
+            tmp_hook_layers = hook_layers[model_name]
+            stu_outs = self._output_tensor_dict[
+                model_name] if in_forward else collections.OrderedDict()
+            outputs_tensor[model_name] = self._prepare_hook(
                 m, tmp_hook_layers, stu_outs, in_forward=in_forward)
         for idx, m in enumerate(self._teacher_models):
-            tmp_hook_layers = hook_layers['teacher_{}'.format(idx)]
-            tea_outs = collections.OrderedDict()
-            outputs_tensor['teacher_{}'.format(idx)] = self._prepare_hook(
+            model_name = 'teacher_{}'.format(idx)
+            tmp_hook_layers = hook_layers[model_name]
+            tea_outs = self._output_tensor_dict[
+                model_name] if in_forward else collections.OrderedDict()
+            outputs_tensor[model_name] = self._prepare_hook(
                 m, tmp_hook_layers, tea_outs, in_forward=in_forward)
         return outputs_tensor
 
@@ -214,7 +222,6 @@ class Distill(nn.Layer):
         """
         Add hook.
         """
-        self.forward_hooks = []
         for layer in hook_layers:
             tmp = layer.strip().split('#')
             layer_name, io, idx = tmp[0], tmp[1], tmp[2]
@@ -238,36 +245,91 @@ class Distill(nn.Layer):
         for idx, teacher_model in enumerate(self._teacher_models):
             ### initialize global index before each forward
             init_index()
-            teacher_model.forward(*inputs, **kwargs)
+            if teacher_model.training:
+                teacher_model.forward(*inputs, **kwargs)
+            else:
+                with paddle.no_grad():
+                    teacher_model.forward(*inputs, **kwargs)
+
+    def _teacher_forward(self, idx, teacher_model, sample_ids, *inputs,
+                         **kwargs):
+        """
+        Run teacher without gradient in eval mode, and load the outputs from
+        teacher cache if all samples are cached.
+        """
+        model_name = 'teacher_{}'.format(idx)
+        if teacher_model.training:
+            ### initialize global index before each forward
+            init_index()
+            return teacher_model.forward(*inputs, **kwargs)
+
+        use_cache = self._teacher_cache is not None and sample_ids is not None
+        if use_cache and self._check_hook_output and self._teacher_cache.contains(
+                sample_ids):
+            cached = self._teacher_cache.get(sample_ids)
+            hook_outs = self._output_tensor_dict[model_name]
+            for hook_name in hook_outs.keys():
+                hook_outs[hook_name] = cached['{}/{}'.format(model_name,
+                                                             hook_name)]
+            out_key = '{}/output'.format(model_name)
+            if out_key in cached:
+                return cached[out_key]
+            num_outs = len([
+                k for k in cached if k.startswith('{}/output#'.format(
+                    model_name))
+            ])
+            return [
+                cached['{}/output#{}'.format(model_name, i)]
+                for i in range(num_outs)
+            ]
+
+        ### initialize global index before each forward
+        init_index()
+        with paddle.no_grad():
+            tea_batch_outs = teacher_model.forward(*inputs, **kwargs)
+        if use_cache:
+            cache_outs = {}
+            for hook_name, hook_value in self._output_tensor_dict[
+                    model_name].items():
+                cache_outs['{}/{}'.format(model_name, hook_name)] = hook_value
+            if isinstance(tea_batch_outs, paddle.Tensor):
+                cache_outs['{}/output'.format(model_name)] = tea_batch_outs
+            else:
+                for i, out in enumerate(tea_batch_outs):
+                    cache_outs['{}/output#{}'.format(model_name, i)] = out
+            self._teacher_cache.put(sample_ids, cache_outs)
+        return tea_batch_outs
 
-    def forward(self, *inputs, **kwargs):
+    @traced('Distill.forward', phase='distill')
+    def forward(self, *inputs, sample_ids=None, **kwargs):
+        """
+        sample_ids(Tensor|numpy.ndarray|list|None): the ids of samples in the batch, used to
+                   look up the teacher cache. Default: None.
+        """
         if self._check_hook_output is False:
             ### the first useless forward is to convert function to class. 
             self._useless_forward(*inputs, **kwargs)
-
-        update_output_tensor_dict = self._prepare_outputs(
-            self._hook_layers, in_forward=True)
+            ### the wrapped functional layers are created by the useless forward,
+            ### so their hooks only need to be added once.
+            self._prepare_outputs(self._hook_layers, in_forward=True)
 
         students_batch_outs = []
         teachers_batch_outs = []
         for idx, student_model in enumerate(self._student_models):
             ### initialize global index before each forward
             init_index()
-            stu_batch_outs = student_model.forward(*inputs, **kwargs)
+            with tracer.span('student_forward', 'forward'):
+                stu_batch_outs = student_model.forward(*inputs, **kwargs)
             students_batch_outs.append(stu_batch_outs)
         for idx, teacher_model in enumerate(self._teacher_models):
-            ### initialize global index before each forward
-            init_index()
-            tea_batch_outs = teacher_model.forward(*inputs, **kwargs)
+            with tracer.span('teacher_forward', 'forward'):
+                tea_batch_outs = self._teacher_forward(idx, teacher_model,
+                                                       sample_ids, *inputs,
+                                                       **kwargs)
             if not teacher_model.training:
                 tea_batch_outs = [i.detach() for i in tea_batch_outs]
             teachers_batch_outs.extend(tea_batch_outs)
 
-        ### update hook information.
-        for model, _ in self._output_tensor_dict.items():
-            self._output_tensor_dict[model].update(update_output_tensor_dict[
-                model])
-
         if len(self._student_models) == 1:
             students_batch_outs = students_batch_outs[0]
         if len(self._teacher_models) == 1:
@@ -283,11 +345,11 @@ class Distill(nn.Layer):
                         "model: {} layer: {} has more than one output/input" \
                         ", please specific the idx of output/input.".format(mo, hook_name)
         ### batch is None just for now
-        distill_outputs = self.distill_loss(self._output_tensor_dict, None)
+        with tracer.span('distill_loss', 'loss'):
+            distill_outputs = self.distill_loss(self._output_tensor_dict,
+                                                None)
         distill_loss = distill_outputs['loss']
 
-        _remove_hooks(self.forward_hooks)
-
         if self._return_model_outputs:
             return distill_loss, students_batch_outs, teachers_batch_outs
         else:
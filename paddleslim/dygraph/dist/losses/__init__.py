@@ -13,13 +13,14 @@
 # limitations under the License.
 
 import copy
+import collections
 import paddle
 import paddle.nn as nn
 
 from . import basic_loss
 from . import distillation_loss
 
-from .distillation_loss import DistillationLoss
+from .distillation_loss import DistillationLoss, fused_align
 
 
 class CombinedLoss(nn.Layer):
@@ -35,13 +36,17 @@ class CombinedLoss(nn.Layer):
                                 model_name_pairs:["student_0", "teacher_0"]}
                            Another example is {loss_function: "MSELoss", 'weight': 1.0,
                            'layers_name': ['conv0', 'conv0'], 'model_name_pairs': [['student', 'teacher']]}
+        fuse(bool): whether to batch the align layers and the losses of the same type and shape
+                    into single stacked ops. The results are the same as computing them one by one. Default: True.
     """
 
-    def __init__(self, loss_config_list=None):
+    def __init__(self, loss_config_list=None, fuse=True):
         super(CombinedLoss, self).__init__()
         loss_config_list = copy.deepcopy(loss_config_list)
         self.loss_func = nn.LayerList()
         self.loss_weight = []
+        self._fuse = fuse
+        self._stacked_weights = {}
         assert isinstance(loss_config_list, list), (
             'operator config should be a list')
         for config in loss_config_list:
@@ -53,7 +58,89 @@ class CombinedLoss(nn.Layer):
             self.loss_weight.append(config.pop("weight"))
             self.loss_func.append(DistillationLoss(**config))
 
+    def _fused_forward(self, input):
+        ### items: [loss index, model name pair, out1, out2]
+        items = []
+        for idx, loss_func in enumerate(self.loss_func):
+            for pair in loss_func.model_name_pairs:
+                out1, out2 = loss_func.extract(input, pair)
+                items.append([idx, pair, out1, out2])
+
+        ### group the align layers by type and input shape.
+        align_groups = collections.OrderedDict()
+        for item_idx, item in enumerate(items):
+            loss_func = self.loss_func[item[0]]
+            if loss_func.align_params is None:
+                continue
+            pos = 2 if loss_func.transpose_model == 'student' else 3
+            feat = item[pos]
+            key = loss_func.align_func.fuse_key
+            if key is None or not isinstance(feat, paddle.Tensor):
+                item[pos] = loss_func.align_func(feat)
+                continue
+            align_groups.setdefault((key, tuple(feat.shape)),
+                                    []).append((item_idx, pos))
+        for group in align_groups.values():
+            aligns = [self.loss_func[items[i][0]].align_func for i, _ in group]
+            outs = fused_align(aligns, [items[i][pos] for i, pos in group])
+            for (i, pos), out in zip(group, outs):
+                items[i][pos] = out
+
+        ### group the losses by type, params and input shape.
+        weighted_losses = [None] * len(items)
+        ### the terms of total loss, a stacked group is added by its sum.
+        total_terms = []
+        loss_groups = collections.OrderedDict()
+        for item_idx, (idx, _, out1, out2) in enumerate(items):
+            loss_func = self.loss_func[idx]
+            if loss_func.fuse_key is not None and isinstance(
+                    out1, paddle.Tensor) and isinstance(
+                        out2, paddle.Tensor) and out1.shape == out2.shape:
+                loss_groups.setdefault((loss_func.fuse_key, tuple(out1.shape)),
+                                       []).append(item_idx)
+            else:
+                weighted_losses[item_idx] = loss_func.pair_loss(
+                    out1, out2) * self.loss_weight[idx]
+                total_terms.append(weighted_losses[item_idx])
+        for group in loss_groups.values():
+            if len(group) == 1:
+                idx, _, out1, out2 = items[group[0]]
+                weighted_losses[group[0]] = self.loss_func[idx].pair_loss(
+                    out1, out2) * self.loss_weight[idx]
+                total_terms.append(weighted_losses[group[0]])
+                continue
+            loss_func = self.loss_func[items[group[0]][0]]
+            out1 = paddle.stack([items[i][2] for i in group])
+            out2 = paddle.stack([items[i][3] for i in group])
+            if loss_func.temperature != 1.0:
+                out1 = out1 / loss_func.temperature
+                out2 = out2 / loss_func.temperature
+            losses = loss_func.loss_func.forward_stacked(out1, out2)
+            group_key = tuple(group)
+            if group_key not in self._stacked_weights:
+                self._stacked_weights[group_key] = paddle.to_tensor(
+                    [self.loss_weight[items[i][0]] for i in group],
+                    dtype=losses.dtype)
+            losses = losses * self._stacked_weights[group_key]
+            total_terms.append(losses.sum())
+            for i, loss in zip(group, paddle.unbind(losses)):
+                weighted_losses[i] = loss
+
+        loss_dict = {}
+        for item_idx, (idx, pair, _, _) in enumerate(items):
+            loss_dict["{}_{}".format(self.loss_func[idx].loss_name(pair),
+                                     idx)] = weighted_losses[item_idx]
+        return loss_dict, total_terms
+
     def forward(self, input, batch, **kargs):
+        if self._fuse:
+            loss_dict, total_terms = self._fused_forward(input)
+            if loss_dict == {}:
+                loss_dict["loss"] = paddle.to_tensor(0.)
+            else:
+                loss_dict["loss"] = paddle.add_n(total_terms)
+            return loss_dict
+
         loss_dict = {}
         for idx, loss_func in enumerate(self.loss_func):
             loss = loss_func(input, batch, **kargs)
@@ -15,6 +15,7 @@
 import paddle
 import paddle.nn as nn
 import paddle.nn.functional as F
+from paddle.distributed.fleet.utils import recompute
 
 from paddle.nn import L1Loss
 from paddle.nn import MSELoss as L2Loss
@@ -99,6 +100,8 @@ class DMLLoss(nn.Layer):
             self.act = nn.Sigmoid()
         else:
             self.act = None
+        ### the pairs stacked in the first dimension shift the positive axis.
+        self.stackable = axis < 0
 
     def forward(self, out1, out2):
         if self.act is not None:
@@ -112,6 +115,23 @@ class DMLLoss(nn.Layer):
                 log_out2, out1, reduction='batchmean')) / 2.0
         return loss
 
+    def forward_stacked(self, out1, out2):
+        """
+        Compute the losses of the pairs stacked in the first dimension at once.
+        Returns:
+            Tensor: the loss of every pair with shape [num_pairs].
+        """
+        if self.act is not None:
+            out1 = self.act(out1)
+            out2 = self.act(out2)
+
+        batch_size = out1.shape[1]
+        loss = F.kl_div(
+            paddle.log(out1), out2, reduction='none') + F.kl_div(
+                paddle.log(out2), out1, reduction='none')
+        loss = loss.reshape([loss.shape[0], -1]).sum(axis=1)
+        return loss / batch_size / 2.0
+
 
 @BASIC_LOSS.register
 class KLLoss(nn.Layer):
@@ -179,10 +199,35 @@ class DistanceLoss(nn.Layer):
             self.loss_func = nn.MSELoss(**kargs)
         elif mode == "smooth_l1":
             self.loss_func = nn.SmoothL1Loss(**kargs)
+        self.mode = mode
+        self.reduction = kargs.get('reduction', 'mean')
+        self.stackable = self.reduction in ['mean', 'sum']
+        self._stacked_kargs = {
+            k: v
+            for k, v in kargs.items() if k not in ['reduction', 'name']
+        }
 
     def forward(self, x, y):
         return self.loss_func(x, y)
 
+    def forward_stacked(self, x, y):
+        """
+        Compute the losses of the pairs stacked in the first dimension at once.
+        Returns:
+            Tensor: the loss of every pair with shape [num_pairs].
+        """
+        if self.mode == "l1":
+            loss = F.l1_loss(x, y, reduction='none', **self._stacked_kargs)
+        elif self.mode == "l2":
+            loss = F.mse_loss(x, y, reduction='none', **self._stacked_kargs)
+        elif self.mode == "smooth_l1":
+            loss = F.smooth_l1_loss(
+                x, y, reduction='none', **self._stacked_kargs)
+        loss = loss.reshape([loss.shape[0], -1])
+        if self.reduction == 'mean':
+            return loss.mean(axis=1)
+        return loss.sum(axis=1)
+
 
 def pdist(e, squared=False, eps=1e-12):
     e_square = e.pow(2).sum(axis=1)
@@ -196,32 +241,139 @@ def pdist(e, squared=False, eps=1e-12):
     return res
 
 
+def gram(e):
+    """
+    Compute the gram matrix and the squared norms of the centered embeddings.
+    Distances and angles are translation invariant, and centering reduces
+    the cancellation error of computing them from the gram matrix.
+    Args:
+        e(Tensor): embeddings with shape [N, D].
+    Returns:
+        tuple: the gram matrix with shape [N, N] and squared norms with shape [N].
+    """
+    e = e - e.mean(axis=0, keepdim=True)
+    return paddle.mm(e, e.t()), e.pow(2).sum(axis=1)
+
+
+def pdist_from_gram(prod, e_square, squared=False, eps=1e-12):
+    """
+    The same as pdist, but reuse the result of gram.
+    """
+    res = (e_square.unsqueeze(1) + e_square.unsqueeze(0) - 2 * prod).clip(
+        min=eps)
+
+    if not squared:
+        res = res.sqrt()
+
+    return res
+
+
+def inv_dist_from_gram(prod, e_square, eps=1e-12):
+    """
+    Compute the inverse of pairwise distances from the result of gram. The
+    inverse is 0 for the coincident pairs, just like normalizing a zero vector.
+    """
+    n = prod.shape[0]
+    sq_dist = pdist_from_gram(prod, e_square, squared=True, eps=0.)
+    ### the diagonal is zero in theory but not after rounding, so mask it explicitly.
+    mask = (sq_dist > eps).astype(prod.dtype) * (
+        1 - paddle.eye(n, dtype=prod.dtype))
+    return mask / sq_dist.clip(min=eps).sqrt()
+
+
+def angle_from_gram(prod, e_square, eps=1e-12, anchors=None, inv_dist=None):
+    """
+    Compute the cosine of angle between (e_j - e_i) and (e_k - e_i) for every
+    anchor i from the result of gram, which avoids the [N, N, D] difference
+    tensor. The angle is 0 when e_j or e_k coincides with e_i, just like
+    normalizing a zero vector.
+    Args:
+        anchors(Tensor|None): the indices of anchors i. None means all anchors. Default: None.
+        inv_dist(Tensor|None): the result of inv_dist_from_gram, it is computed if None. Default: None.
+    Returns:
+        Tensor: the angles with shape [A * N * N, 1], A is the number of anchors.
+    """
+    n = prod.shape[0]
+    if inv_dist is None:
+        inv_dist = inv_dist_from_gram(prod, e_square, eps=eps)
+    prod_a, e_square_a, inv_dist_a = prod, e_square, inv_dist
+    if anchors is not None:
+        prod_a = paddle.gather(prod, anchors)
+        e_square_a = paddle.gather(e_square, anchors)
+        inv_dist_a = paddle.gather(inv_dist, anchors)
+    ### <e_j - e_i, e_k - e_i> = G_jk - G_ij - G_ik + G_ii
+    inner = prod.unsqueeze(0) - prod_a.unsqueeze(2) - prod_a.unsqueeze(
+        1) + e_square_a.reshape([-1, 1, 1])
+    angle = inner * inv_dist_a.unsqueeze(2) * inv_dist_a.unsqueeze(1)
+    return angle.reshape([-1, 1])
+
+
+def _chunk_angle_loss(s_prod, s_square, s_inv_dist, t_prod, t_square,
+                      t_inv_dist, anchors):
+    t_angle = angle_from_gram(
+        t_prod, t_square, anchors=anchors, inv_dist=t_inv_dist)
+    s_angle = angle_from_gram(
+        s_prod, s_square, anchors=anchors, inv_dist=s_inv_dist)
+    return F.smooth_l1_loss(s_angle, t_angle, reduction='sum')
+
+
 @BASIC_LOSS.register
 class RKdAngle(nn.Layer):
     """
     RKdAngle loss, see https://arxiv.org/abs/1904.05068
+    Args:
+        num_anchors(int|None): the number of anchors sampled randomly in every forward. The loss is
+                               averaged over the angles of sampled anchors. None means using all
+                               anchors. Default: None.
+        max_elements(int|None): the max number of angle elements computed at once. The anchors are
+                                split into chunks to bound the memory, and the chunks are recomputed
+                                in backward. None means computing all anchors at once. Default: None.
     """
 
-    def __init__(self):
+    def __init__(self, num_anchors=None, max_elements=None):
         super().__init__()
+        self.num_anchors = num_anchors
+        self.max_elements = max_elements
 
     def forward(self, student, teacher):
         # reshape for feature map distillation
         bs = student.shape[0]
         student = student.reshape([bs, -1])
         teacher = teacher.reshape([bs, -1])
+        return self.loss_from_gram(gram(student), gram(teacher))
 
-        td = (teacher.unsqueeze(0) - teacher.unsqueeze(1))
-        norm_td = F.normalize(td, p=2, axis=2)
-        t_angle = paddle.bmm(norm_td, norm_td.transpose([0, 2, 1])).reshape(
-            [-1, 1])
-
-        sd = (student.unsqueeze(0) - student.unsqueeze(1))
-        norm_sd = F.normalize(sd, p=2, axis=2)
-        s_angle = paddle.bmm(norm_sd, norm_sd.transpose([0, 2, 1])).reshape(
-            [-1, 1])
-        loss = F.smooth_l1_loss(s_angle, t_angle, reduction='mean')
-        return loss
+    def loss_from_gram(self, student_gram, teacher_gram):
+        """
+        Compute the loss from the results of gram, which can be shared with RkdDistance.
+        """
+        n = student_gram[0].shape[0]
+        num_anchors = n if self.num_anchors is None else min(self.num_anchors,
+                                                             n)
+        chunk_size = num_anchors if self.max_elements is None else max(
+            1, self.max_elements // (n * n))
+        if num_anchors == n and chunk_size >= n:
+            t_angle = angle_from_gram(*teacher_gram)
+            s_angle = angle_from_gram(*student_gram)
+            loss = F.smooth_l1_loss(s_angle, t_angle, reduction='mean')
+            return loss
+
+        if num_anchors < n:
+            anchors = paddle.randperm(n)[:num_anchors]
+        else:
+            anchors = paddle.arange(n)
+        s_inv_dist = inv_dist_from_gram(*student_gram)
+        t_inv_dist = inv_dist_from_gram(*teacher_gram)
+        loss = 0.
+        for start in range(0, num_anchors, chunk_size):
+            args = list(student_gram) + [s_inv_dist] + list(teacher_gram) + [
+                t_inv_dist, anchors[start:start + chunk_size]
+            ]
+            if chunk_size < num_anchors and not s_inv_dist.stop_gradient:
+                ### only keep the inputs of chunk for backward.
+                loss = loss + recompute(_chunk_angle_loss, *args)
+            else:
+                loss = loss + _chunk_angle_loss(*args)
+        return loss / (num_anchors * n * n)
 
 
 @BASIC_LOSS.register
@@ -240,12 +392,17 @@ class RkdDistance(nn.Layer):
         bs = student.shape[0]
         student = student.reshape([bs, -1])
         teacher = teacher.reshape([bs, -1])
+        return self.loss_from_gram(gram(student), gram(teacher))
 
-        t_d = pdist(teacher, squared=False, eps=self.eps)
+    def loss_from_gram(self, student_gram, teacher_gram):
+        """
+        Compute the loss from the results of gram, which can be shared with RKdAngle.
+        """
+        t_d = pdist_from_gram(*teacher_gram, squared=False, eps=self.eps)
         mean_td = t_d.mean()
         t_d = t_d / (mean_td + self.eps)
 
-        d = pdist(student, squared=False, eps=self.eps)
+        d = pdist_from_gram(*student_gram, squared=False, eps=self.eps)
         mean_d = d.mean()
         d = d / (mean_d + self.eps)
 
@@ -287,14 +444,24 @@ class SmoothL1Loss(DistanceLoss):
 class RKDLoss(nn.Layer):
     """
        RKDLoss
+       Args:
+           eps(float): epsilon for the pdist function of RkdDistance.
+           num_anchors(int|None): the number of anchors sampled by RKdAngle. Default: None.
+           max_elements(int|None): the max number of angle elements computed at once by RKdAngle. Default: None.
     """
 
-    def __init__(self, eps=1e-12):
+    def __init__(self, eps=1e-12, num_anchors=None, max_elements=None):
         super().__init__()
-        self.rkd_angle_loss_func = RKdAngle()
+        self.rkd_angle_loss_func = RKdAngle(
+            num_anchors=num_anchors, max_elements=max_elements)
         self.rkd_dist_func = RkdDistance(eps=eps)
 
     def forward(self, student, teacher):
-        angle_loss = self.rkd_angle_loss_func(student, teacher)
-        dist_loss = self.rkd_dist_func(student, teacher)
+        bs = student.shape[0]
+        student_gram = gram(student.reshape([bs, -1]))
+        teacher_gram = gram(teacher.reshape([bs, -1]))
+        angle_loss = self.rkd_angle_loss_func.loss_from_gram(student_gram,
+                                                             teacher_gram)
+        dist_loss = self.rkd_dist_func.loss_from_gram(student_gram,
+                                                      teacher_gram)
         return angle_loss + dist_loss
@@ -15,10 +15,11 @@
 import numpy as np
 import paddle
 import paddle.nn as nn
+import paddle.nn.functional as F
 
 from .basic_loss import BASIC_LOSS
 
-__all__ = ["DistillationLoss", "ShapeAlign"]
+__all__ = ["DistillationLoss", "ShapeAlign", "fused_align"]
 
 
 class DistillationLoss(nn.Layer):
@@ -53,28 +54,49 @@ class DistillationLoss(nn.Layer):
             self.align_func = ShapeAlign(**self.align_params)
 
         self.loss_func = BASIC_LOSS.get(loss_function)(**params)
+        ### the losses with the same fuse_key can be computed in one stacked op.
+        self.fuse_key = None
+        if getattr(self.loss_func, 'stackable', False):
+            self.fuse_key = (loss_function, str(sorted(params.items())),
+                             self.temperature)
+
+    def extract(self, predicts, pair):
+        """
+        Extract the tensors of a model name pair from predicts.
+        """
+        out1 = predicts[pair[0]]
+        out2 = predicts[pair[1]]
+        if self.layers_name != None:
+            assert len(self.layers_name
+                       ) == 2, "length of layers_name must be equal to 2."
+            out1 = out1[self.layers_name[0]]
+            out2 = out2[self.layers_name[1]]
+        return out1, out2
+
+    def loss_name(self, pair):
+        return "{}_{}_{}_{}_{}".format(self.loss_function, pair[0], pair[
+                1], self.layers_name[0] if self.layers_name != None else "0", \
+                self.layers_name[1] if self.layers_name != None else "0")
+
+    def pair_loss(self, out1, out2):
+        """
+        Compute the loss of the aligned tensors.
+        """
+        if self.temperature != 1.0:
+            out1 = out1 / self.temperature
+            out2 = out2 / self.temperature
+        return self.loss_func(out1, out2)
 
     def forward(self, predicts, batch):
         loss_dict = dict()
         for idx, pair in enumerate(self.model_name_pairs):
-            out1 = predicts[pair[0]]
-            out2 = predicts[pair[1]]
-            if self.layers_name != None:
-                assert len(self.layers_name
-                           ) == 2, "length of layers_name must be equal to 2."
-                out1 = out1[self.layers_name[0]]
-                out2 = out2[self.layers_name[1]]
+            out1, out2 = self.extract(predicts, pair)
             if self.align_params is not None:
                 if self.transpose_model == 'student':
                     out1 = self.align_func(out1)
                 else:
                     out2 = self.align_func(out2)
-            if self.temperature != 1.0:
-                out1 = out1 / self.temperature
-                out2 = out2 / self.temperature
-            loss_dict["{}_{}_{}_{}_{}".format(self.loss_function, pair[0], pair[
-                1], self.layers_name[0] if self.layers_name != None else "0", \
-                self.layers_name[1] if self.layers_name != None else "0")] = self.loss_func(out1, out2)
+            loss_dict[self.loss_name(pair)] = self.pair_loss(out1, out2)
         return loss_dict
 
 
@@ -91,6 +113,7 @@ class ShapeAlign(nn.Layer):
         super(ShapeAlign, self).__init__()
         self._in_channel = in_channel
         self._out_channel = out_channel
+        self._align_type = align_type.lower()
         assert align_type.lower() in [
             '1x1conv', '3x3conv', '1x1conv+bn', '3x3conv+bn', 'linear'
         ], "only support 1x1conv, 3x3conv, 1x1conv+bn, 3x3conv+bn, linear for now"
@@ -170,6 +193,60 @@ class ShapeAlign(nn.Layer):
                 weight_attr=weight_attr,
                 bias_attr=bias_attr)
 
+    @property
+    def fuse_key(self):
+        """
+        The aligns with the same fuse_key can be computed in one op by fused_align.
+        The aligns with batch norm are not fused because of their running statistics.
+        """
+        if self._align_type not in ['1x1conv', '3x3conv', 'linear']:
+            return None
+        return (self._align_type, self._in_channel, self._out_channel)
+
     def forward(self, feat):
         out = self.align_op(feat)
         return out
+
+
+def fused_align(aligns, feats):
+    """
+    Apply a group of ShapeAlign with the same fuse_key to the features with the same shape
+    in one op. Convolutions are fused into a grouped convolution and linears are fused
+    into a batched matmul.
+    Args:
+        aligns(list(ShapeAlign)): the align layers.
+        feats(list(Tensor)): the input feature of each align layer.
+    Returns:
+        list(Tensor): the aligned features.
+    """
+    if len(aligns) == 1:
+        return [aligns[0](feats[0])]
+    align_ops = [align.align_op for align in aligns]
+    has_bias = all([op.bias is not None for op in align_ops])
+    align_type = aligns[0].fuse_key[0]
+    if align_type == 'linear':
+        in_shape = feats[0].shape
+        x = paddle.stack(feats).reshape([len(feats), -1, in_shape[-1]])
+        weight = paddle.stack([op.weight for op in align_ops])
+        out = paddle.bmm(x, weight)
+        if has_bias:
+            out = out + paddle.stack([op.bias for op in align_ops]).unsqueeze(1)
+        out_shape = list(in_shape[:-1]) + [out.shape[-1]]
+        return [o.reshape(out_shape) for o in paddle.unbind(out)]
+
+    x = paddle.concat(feats, axis=1)
+    weight = paddle.concat([op.weight for op in align_ops])
+    bias = paddle.concat([op.bias for op in align_ops]) if has_bias else None
+    out = F.conv2d(
+        x,
+        weight,
+        bias=bias,
+        padding=1 if align_type == '3x3conv' else 0,
+        groups=len(feats))
+    out = paddle.split(out, len(feats), axis=1)
+    if not has_bias:
+        out = [
+            o + op.bias.reshape([1, -1, 1, 1]) if op.bias is not None else o
+            for o, op in zip(out, align_ops)
+        ]
+    return out
@@ -0,0 +1,154 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import json
+import logging
+import numpy as np
+import paddle
+from ...common import get_logger
+
+__all__ = ['TeacherCache']
+
+_logger = get_logger(__name__, level=logging.INFO)
+
+_META_FILE = 'meta.json'
+_FILLED_FILE = 'filled.npy'
+
+
+class TeacherCache(object):
+    """
+        Disk-backed cache of teacher outputs keyed by sample id. Every cached tensor
+        is stored in a memory-mapped ``.npy`` file with shape ``[num_samples] + sample_shape``,
+        so reading a batch only touches the rows of the requested samples. The cache can be
+        reopened in a later run to skip the teacher from the first epoch.
+        cache_dir(str): the directory to save the cache files.
+        num_samples(int): the number of samples in the dataset, sample ids must be in range [0, num_samples).
+        dtype(str|None): the dtype used to store tensors on disk, such as 'float16'. Tensors are cast back
+                         to their origin dtype when loaded. None means keeping the origin dtype. Default: None.
+    """
+
+    def __init__(self, cache_dir, num_samples, dtype=None):
+        self._cache_dir = cache_dir
+        self._num_samples = int(num_samples)
+        self._dtype = dtype
+        self._entries = {}
+        self._arrays = {}
+        meta_path = os.path.join(cache_dir, _META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            assert meta['num_samples'] == self._num_samples, \
+                "num_samples of cache in {} is {}, but got {}.".format(
+                    cache_dir, meta['num_samples'], self._num_samples)
+            self._entries = meta['entries']
+            self._filled = np.load(
+                os.path.join(cache_dir, _FILLED_FILE), mmap_mode='r+')
+            _logger.info("Load teacher cache from {}: {}/{} samples cached.".
+                         format(cache_dir,
+                                int(self._filled.sum()), self._num_samples))
+        else:
+            if not os.path.exists(cache_dir):
+                os.makedirs(cache_dir)
+            self._filled = np.lib.format.open_memmap(
+                os.path.join(cache_dir, _FILLED_FILE),
+                mode='w+',
+                dtype='bool',
+                shape=(self._num_samples, ))
+            self._save_meta()
+
+    def _save_meta(self):
+        meta = {'num_samples': self._num_samples, 'entries': self._entries}
+        with open(os.path.join(self._cache_dir, _META_FILE), 'w') as f:
+            json.dump(meta, f)
+
+    def _array(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = np.load(
+                os.path.join(self._cache_dir, self._entries[name]['file']),
+                mmap_mode='r+')
+        return self._arrays[name]
+
+    def _create_entry(self, name, value, is_seq):
+        entry = {
+            'file': 'entry_{}.npy'.format(len(self._entries)),
+            'dtype': str(value.dtype),
+            'seq': is_seq
+        }
+        store_dtype = self._dtype if self._dtype is not None else value.dtype
+        self._arrays[name] = np.lib.format.open_memmap(
+            os.path.join(self._cache_dir, entry['file']),
+            mode='w+',
+            dtype=store_dtype,
+            shape=(self._num_samples, ) + tuple(value.shape[1:]))
+        self._entries[name] = entry
+        self._save_meta()
+
+    def _to_ids(self, sample_ids):
+        if isinstance(sample_ids, paddle.Tensor):
+            sample_ids = sample_ids.numpy()
+        return np.asarray(sample_ids).reshape([-1]).astype('int64')
+
+    def contains(self, sample_ids):
+        """
+            Whether the outputs of all samples in sample_ids are cached.
+        """
+        ids = self._to_ids(sample_ids)
+        return len(self._entries) > 0 and bool(np.all(self._filled[ids]))
+
+    def get(self, sample_ids):
+        """
+            Get cached outputs of sample_ids.
+            Returns:
+                dict: the name of output and the tensor loaded from cache. The tensor is wrapped in a tuple
+                      if it was put as a sequence.
+        """
+        ids = self._to_ids(sample_ids)
+        outputs = {}
+        for name, entry in self._entries.items():
+            value = paddle.to_tensor(self._array(name)[ids].astype(entry[
+                'dtype']))
+            outputs[name] = (value, ) if entry['seq'] else value
+        return outputs
+
+    def put(self, sample_ids, outputs):
+        """
+            Save outputs of sample_ids to cache.
+            outputs(dict): the name of output and its value. The value can be a tensor or a tuple/list
+                           with only one tensor, the first dimension of tensor must be batch size.
+        """
+        ids = self._to_ids(sample_ids)
+        for name, value in outputs.items():
+            is_seq = isinstance(value, (list, tuple))
+            if is_seq:
+                assert len(value) == 1, \
+                    "only support to cache one tensor, but {} has {}.".format(
+                        name, len(value))
+                value = value[0]
+            if isinstance(value, paddle.Tensor):
+                value = value.numpy()
+            assert value.shape[0] == len(ids), \
+                "the batch size of {} is {}, but got {} sample ids.".format(
+                    name, value.shape[0], len(ids))
+            if name not in self._entries:
+                self._create_entry(name, value, is_seq)
+            self._array(name)[ids] = value
+        self._filled[ids] = True
+
+    def flush(self):
+        """
+            Write the cached tensors to disk.
+        """
+        for array in self._arrays.values():
+            array.flush()
+        self._filled.flush()
@@ -8,7 +8,7 @@ from paddleslim.common import get_logger
 from .var_group import *
 from .pruning_plan import *
 from .pruner import Pruner
-from paddleslim.analysis import dygraph_flops as flops
+from paddleslim.analysis.flops import _graph_flops
 from .var_group import DygraphPruningCollections
 
 __all__ = ['Status', 'FilterPruner']
@@ -82,7 +82,8 @@ class FilterPruner(Pruner):
                   eval_func=None,
                   sen_file=None,
                   target_vars=None,
-                  skip_vars=[]):
+                  skip_vars=[],
+                  lazy=False):
         """
         Compute or get sensitivities of model in current pruner. It will return a cached sensitivities when all the arguments are "None".
 
@@ -107,6 +108,9 @@ class FilterPruner(Pruner):
           sen_file(str, optional): The absolute path of file to save sensitivities into local filesystem. Default: None.
           target_vars(list, optional): The names of tensors whose sensitivity will be computed. "None" means all weights in convolution layer will be computed. Default: None.
           skip_vars(list, optional): The names of tensors whose sensitivity won't be computed. Default: [].
+          lazy(bool, optional): Whether to evaluate each trial by setting the pruned channels to zero instead of
+                                removing them. The shapes of parameters are not changed and no optimizer accumulator
+                                is touched. Default: False.
     
         Returns:
            dict: A dict storing sensitivities.       
@@ -126,7 +130,8 @@ class FilterPruner(Pruner):
             eval_func,
             status_file=sen_file,
             target_vars=target_vars,
-            skip_vars=skip_vars)
+            skip_vars=skip_vars,
+            lazy=lazy)
 
         self._status.is_ckp = False
         return self._status.sensitivies
@@ -189,13 +194,68 @@ class FilterPruner(Pruner):
             ret[name] = ratio
         return ret
 
+    def _dry_run_plan(self, ratios, axis):
+        """
+        Get the pruning plan of ratios without applying it to the model.
+        """
+        plan = PruningPlan(self.model.full_name)
+        for var, ratio in ratios.items():
+            if not plan.contains(var, axis):
+                _plan = self.prune_var(var, axis, ratio, apply=None)
+                if _plan is not None:
+                    plan.extend(_plan)
+        return plan
+
+    def _check_unpruned(self):
+        for param in self.model.parameters():
+            shape = self._var_shapes.get(param.name)
+            assert shape is None or list(shape) == list(
+                param.shape
+            ), f"The shape of {param.name} is changed from {shape} to {param.shape} after the graph was traced. Please call 'dry_run_flops' before pruning the model or after restoring it."
+
+    def dry_run_flops(self, ratios, axis=0):
+        """
+        Compute the FLOPs of the model pruned by ratios analytically from the shapes of pruned
+        parameters. The model is neither pruned nor traced again. The shapes are those traced
+        when the pruner is created, so it should be called before the model is pruned
+        by 'prune_var' or 'prune_vars', or after the pruning is restored.
+
+        Args:
+            ratios(dict<str, float>): The key is the name of variable to be pruned and the
+                                      value is the pruned ratio.
+            axis(int, optional): The dimension to be pruned on. Default: 0.
+
+        Returns:
+            float: The FLOPs of the pruned model.
+        """
+        self._check_unpruned()
+        graph = self.collections.graph
+        pruned_shapes = {}
+        plan = self._dry_run_plan(ratios, axis)
+        for var_name, masks in plan.masks.items():
+            var = graph.var(var_name)
+            if var is None:
+                continue
+            shape = list(var.shape())
+            for _mask in masks:
+                groups = _mask._op.attr('groups')
+                # The groups of convolution is changed instead of its filter.
+                if _mask.dims == 1 and groups is not None and groups > 1 and len(
+                        shape) == 4:
+                    continue
+                shape[_mask.dims] = int(np.sum(np.array(_mask.mask) != 0))
+            pruned_shapes[var_name] = shape
+        return _graph_flops(
+            graph, only_conv=False, pruned_shapes=pruned_shapes)
+
     def get_ratios_by_sensitivity(self,
                                   pruned_flops,
                                   align=None,
                                   dims=0,
                                   skip_vars=[]):
         """
-         Get a group of ratios by sensitivities.
+         Get a group of ratios by sensitivities. The FLOPs of each group of ratios is computed by
+         'dry_run_flops', so the model is not pruned when searching.
          Args:
              pruned_flops(float): The excepted rate of FLOPs to be pruned. It should be in range (0, 1).
              align(int, optional): Round the size of each pruned dimension to multiple of 'align' if 'align' is not None. Default: None.
@@ -205,7 +265,7 @@ class FilterPruner(Pruner):
         Returns:
             tuple: A tuple with format ``(ratios, pruned_flops)`` . "ratios" is a dict whose key is name of tensor and value is ratio to be pruned. "pruned_flops" is the ratio of total pruned FLOPs in the model.
         """
-        base_flops = flops(self.model, self.inputs)
+        base_flops = _graph_flops(self.collections.graph, only_conv=False)
 
         _logger.info("Base FLOPs: {}".format(base_flops))
         low = 0.
@@ -218,10 +278,8 @@ class FilterPruner(Pruner):
             _logger.debug("pruning ratios: {}".format(ratios))
             if align is not None:
                 ratios = self._round_to(ratios, dims=dims, factor=align)
-            plan = self.prune_vars(ratios, axis=dims)
-            c_flops = flops(self.model, self.inputs)
+            c_flops = self.dry_run_flops(ratios, axis=dims)
             c_pruned_flops = (base_flops - c_flops) / base_flops
-            plan.restore(self.model, opt=self.opt)
             _logger.debug("Seaching ratios, pruned FLOPs: {}".format(
                 c_pruned_flops))
             key = str(round(c_pruned_flops, 4))
@@ -241,7 +299,8 @@ class FilterPruner(Pruner):
                        eval_func,
                        status_file=None,
                        target_vars=None,
-                       skip_vars=None):
+                       skip_vars=None,
+                       lazy=False):
         sensitivities = self._status.sensitivies
         baseline = None
         ratios = np.arange(0.1, 1, step=0.1)
@@ -263,7 +322,11 @@ class FilterPruner(Pruner):
                     continue
                 if baseline is None:
                     baseline = eval_func()
-                plan = self.prune_var(var_name, dims, ratio)
+                plan = self.prune_var(
+                    var_name,
+                    dims,
+                    ratio,
+                    apply="lazy" if lazy else "impretive")
                 pruned_metric = eval_func()
                 loss = (baseline - pruned_metric) / (baseline + 1e-3)
                 _logger.info("pruned param: {}; {}; loss={}".format(
@@ -2,6 +2,7 @@ import logging
 import numpy as np
 import paddle
 from paddleslim.common import get_logger
+from paddleslim.prune.criterion import distance_sums
 from .var_group import *
 from .pruning_plan import *
 from .filter_pruner import FilterPruner
@@ -30,11 +31,7 @@ class FPGMFilterPruner(FilterPruner):
                     groups = _groups
                     break
 
-        dist_sum_list = []
-        for out_i in range(value.shape[0]):
-            dist_sum = self.get_distance_sum(value, out_i)
-            dist_sum_list.append(dist_sum)
-        scores = np.array(dist_sum_list)
+        scores = distance_sums(value)
 
         if groups > 1:
             scores = scores.reshape([groups, -1])
@@ -49,11 +46,3 @@ class FPGMFilterPruner(FilterPruner):
             mask = mask.reshape([groups, -1])
         mask[pruned_idx] = 0
         return mask.reshape(mask_shape)
-
-    def get_distance_sum(self, value, out_idx):
-        w = value.view()
-        w.shape = value.shape[0], np.product(value.shape[1:])
-        selected_filter = np.tile(w[out_idx], (w.shape[0], 1))
-        x = w - selected_filter
-        x = np.sqrt(np.sum(x * x, -1))
-        return x.sum()
@@ -46,6 +46,10 @@ class PruningPlan():
         self._pruned_flops = None
         self._pruned_size = None
         self._model_size = None
+        # {var_name: [(dims, kept_index, removed_index, removed_value, lazy)]}
+        self._removed = {}
+        # {var_name: groups of the layer before pruning}
+        self._removed_groups = {}
 
     @property
     def pruned_flops(self):
@@ -95,6 +99,52 @@ class PruningPlan():
             for name, mask in self._masks.items()
         ]) + details
 
+    def _place(self, t_value):
+        p = t_value._place()
+        if p.is_cpu_place():
+            return paddle.CPUPlace()
+        elif p.is_cuda_pinned_place():
+            return paddle.CUDAPinnedPlace()
+        p = core.Place()
+        p.set_place(t_value._place())
+        return paddle.CUDAPlace(p.gpu_device_id())
+
+    def _save_removed(self, name, dims, value, bool_mask, lazy):
+        """Remove the values masked out on dimension 'dims' and record the
+        removed slice, so that only the pruned part of variable is kept for
+        restoring."""
+        kept = np.flatnonzero(bool_mask)
+        removed = np.flatnonzero(~bool_mask)
+        removed_value = np.take(value, removed, axis=dims)
+        if name not in self._removed:
+            self._removed[name] = []
+        self._removed[name].append((dims, kept, removed, removed_value, lazy))
+        if lazy:
+            index = [slice(None)] * value.ndim
+            index[dims] = removed
+            value[tuple(index)] = 0
+            return value
+        return np.take(value, kept, axis=dims)
+
+    def _restore_removed(self, name, value):
+        """Scatter the removed slices back in the reverse order of pruning."""
+        for dims, kept, removed, removed_value, lazy in reversed(
+                self._removed.pop(name)):
+            index = [slice(None)] * value.ndim
+            if lazy:
+                index[dims] = removed
+                value[tuple(index)] = removed_value
+                continue
+            shape = list(value.shape)
+            shape[dims] = len(kept) + len(removed)
+            full = np.empty(shape, dtype=value.dtype)
+            index[dims] = kept
+            full[tuple(index)] = value
+            index[dims] = removed
+            full[tuple(index)] = removed_value
+            value = full
+        return value
+
     def _prune_opt(self, param_name, dims, bool_mask, opt):
         if opt is None:
             return
@@ -105,62 +155,22 @@ class PruningPlan():
                 if var_tmp is not None: print(var_tmp.name, var_tmp.shape)
                 continue
             t_value = var_tmp.value().get_tensor()
-            value = np.array(t_value).astype("float32")
-
-            pruned_value = np.apply_along_axis(lambda data: data[bool_mask],
-                                               dims, value)
+            value = np.array(t_value)
+            pruned_value = self._save_removed(var_tmp.name, dims, value,
+                                              bool_mask, False)
+            t_value.set(pruned_value, self._place(t_value))
 
-            p = t_value._place()
-            if p.is_cpu_place():
-                place = paddle.CPUPlace()
-            elif p.is_cuda_pinned_place():
-                place = paddle.CUDAPinnedPlace()
-            else:
-                p = core.Place()
-                p.set_place(t_value._place())
-                place = paddle.CUDAPlace(p.gpu_device_id())
-
-            t_value.set(pruned_value, place)
-
-    def _buffer_opt(self, param_name, sub_layer, opt):
+    def _restore_opt(self, param_name, opt):
         if opt is None:
             return
         for k, v in opt._accumulators.items():
             var_tmp = v.get(param_name)
-            if var_tmp is None: continue
-            backup_name = var_tmp.name.replace(".", "_") + "_backup"
-            if backup_name not in sub_layer._buffers:
-                sub_layer.register_buffer(
-                    backup_name,
-                    paddle.to_tensor(np.array(var_tmp.value().get_tensor())))
-                _logger.debug("Backup values of {} into buffers.".format(
-                    var_tmp.name))
-
-    def _restore_opt(self, param_name, sub_layer, opt):
-        if opt is None:
-            return
-        for k, v in opt._accumulators.items():
-            var_tmp = v.get(param_name)
-            if var_tmp is None: continue
-            backup_name = var_tmp.name.replace(".", "_") + "_backup"
-            if backup_name in sub_layer._buffers:
-                _logger.debug("Restore values of variable: {}".format(
-                    var_tmp.name))
-                t_value = var_tmp.value().get_tensor()
-                t_backup = sub_layer._buffers[backup_name].value().get_tensor()
-
-                p = t_value._place()
-                if p.is_cpu_place():
-                    place = paddle.CPUPlace()
-                elif p.is_cuda_pinned_place():
-                    place = paddle.CUDAPinnedPlace()
-                else:
-                    p = core.Place()
-                    p.set_place(t_value._place())
-                    place = paddle.CUDAPlace(p.gpu_device_id())
-
-                t_value.set(np.array(t_backup).astype("float32"), place)
-                del sub_layer._buffers[backup_name]
+            if var_tmp is None or var_tmp.name not in self._removed: continue
+            _logger.debug("Restore values of variable: {}".format(
+                var_tmp.name))
+            t_value = var_tmp.value().get_tensor()
+            value = self._restore_removed(var_tmp.name, np.array(t_value))
+            t_value.set(value, self._place(t_value))
 
     def apply(self, model, lazy=False, opt=None):
         if lazy:
@@ -169,44 +179,33 @@ class PruningPlan():
             self.imperative_apply(model, opt)
 
     def lazy_apply(self, model):
+        """
+        Set the pruned values of variables to zero without changing their
+        shapes. Only the zeroed values are saved for restoring.
+        """
         for name, sub_layer in model.named_sublayers():
             for param in sub_layer.parameters(include_sublayers=False):
                 if param.name in self._masks:
                     for _mask in self._masks[param.name]:
                         dims = _mask.dims
-                        mask = _mask.mask
+                        groups = _mask._op.attr('groups')
+                        # Depthwise filters are zeroed by the mask on
+                        # dimension 0.
+                        if dims == 1 and groups is not None and groups > 1 and len(
+                                param.shape) == 4:
+                            continue
+                        bool_mask = np.array(_mask.mask).astype(bool)
                         t_value = param.value().get_tensor()
-                        value = np.array(t_value).astype("float32")
-                        # The name of buffer can not contains "."
-                        backup_name = param.name.replace(".", "_") + "_backup"
-                        if backup_name not in sub_layer._buffers:
-                            sub_layer.register_buffer(backup_name,
-                                                      paddle.to_tensor(value))
-                            _logger.debug("Backup values of {} into buffers.".
-                                          format(param.name))
-                        expand_mask_shape = [1] * len(value.shape)
-                        expand_mask_shape[dims] = value.shape[dims]
-                        _logger.debug("Expanded mask shape: {}".format(
-                            expand_mask_shape))
-                        expand_mask = mask.reshape(expand_mask_shape).astype(
-                            "float32")
-
-                        p = t_value._place()
-                        if p.is_cpu_place():
-                            place = paddle.CPUPlace()
-                        elif p.is_cuda_pinned_place():
-                            place = paddle.CUDAPinnedPlace()
-                        else:
-                            p = core.Place()
-                            p.set_place(t_value._place())
-                            place = paddle.CUDAPlace(p.gpu_device_id())
-
-                        t_value.set(value * expand_mask, place)
+                        value = self._save_removed(param.name, dims,
+                                                   np.array(t_value),
+                                                   bool_mask, True)
+                        t_value.set(value, self._place(t_value))
 
     def imperative_apply(self, model, opt=None):
         """
         Pruning values of variable imperatively. It is valid when pruning
-        on one dimension.
+        on one dimension. Only the pruned slices of variables and optimizer
+        accumulators are saved for restoring.
         """
 
         for name, sub_layer in model.named_sublayers(include_self=True):
@@ -218,44 +217,25 @@ class PruningPlan():
                         mask = _mask.mask
                         bool_mask = np.array(mask).astype(bool)
                         t_value = param.value().get_tensor()
-                        value = np.array(t_value).astype("float32")
                         groups = _mask._op.attr('groups')
                         if dims == 1 and groups is not None and groups > 1 and len(
-                                value.shape) == 4:
-                            filter_size = value.shape[1]
+                                param.shape) == 4:
+                            filter_size = param.shape[1]
                             except_num = np.sum(bool_mask)
                             assert (except_num % filter_size == 0)
                             new_groups = int(except_num / filter_size)
-                            sub_layer._origin_groups = sub_layer._groups
+                            self._removed_groups.setdefault(param.name,
+                                                            sub_layer._groups)
                             sub_layer._groups = new_groups
                             _logger.info("change groups from {} to {} for {}.".
                                          format(groups, new_groups, param.name))
                             continue
 
-                        # The name of buffer can not contains "."
-                        backup_name = param.name.replace(".", "_") + "_backup"
-                        if backup_name not in sub_layer._buffers:
-                            sub_layer.register_buffer(backup_name,
-                                                      paddle.to_tensor(value))
-                            _logger.debug("Backup values of {} into buffers.".
-                                          format(param.name))
-                        # save optimizer accumulators into layer buffer
-                        self._buffer_opt(param.name, sub_layer, opt)
-
-                        pruned_value = np.apply_along_axis(
-                            lambda data: data[bool_mask], dims, value)
+                        pruned_value = self._save_removed(
+                            param.name, dims, np.array(t_value), bool_mask,
+                            False)
                         self._prune_opt(param.name, dims, bool_mask, opt)
-
-                        p = t_value._place()
-                        if p.is_cpu_place():
-                            place = paddle.CPUPlace()
-                        elif p.is_cuda_pinned_place():
-                            place = paddle.CUDAPinnedPlace()
-                        else:
-                            p = core.Place()
-                            p.set_place(t_value._place())
-                            place = paddle.CUDAPlace(p.gpu_device_id())
-                        t_value.set(pruned_value, place)
+                        t_value.set(pruned_value, self._place(t_value))
 
                     # for training
                     if param.trainable:
@@ -264,27 +244,14 @@ class PruningPlan():
     def restore(self, model, opt=None):
         for name, sub_layer in model.named_sublayers(include_self=True):
             for param in sub_layer.parameters(include_sublayers=False):
-                # restore optimizer accumulators from layer buffer
-                self._restore_opt(param.name, sub_layer, opt)
-                backup_name = "_".join([param.name.replace(".", "_"), "backup"])
-                if backup_name in sub_layer._buffers:
+                # restore optimizer accumulators
+                self._restore_opt(param.name, opt)
+                if param.name in self._removed:
                     _logger.debug("Restore values of variable: {}".format(
                         param.name))
                     t_value = param.value().get_tensor()
-                    t_backup = sub_layer._buffers[backup_name].value(
-                    ).get_tensor()
-
-                    p = t_value._place()
-                    if p.is_cpu_place():
-                        place = paddle.CPUPlace()
-                    elif p.is_cuda_pinned_place():
-                        place = paddle.CUDAPinnedPlace()
-                    else:
-                        p = core.Place()
-                        p.set_place(t_value._place())
-                        place = paddle.CUDAPlace(p.gpu_device_id())
-
-                    t_value.set(np.array(t_backup).astype("float32"), place)
-                    if "_origin_groups" in sub_layer.__dict__:
-                        sub_layer._groups = sub_layer._origin_groups
-                    del sub_layer._buffers[backup_name]
+                    value = self._restore_removed(param.name,
+                                                  np.array(t_value))
+                    t_value.set(value, self._place(t_value))
+                if param.name in self._removed_groups:
+                    sub_layer._groups = self._removed_groups.pop(param.name)
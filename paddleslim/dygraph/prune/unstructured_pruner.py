@@ -2,6 +2,8 @@ import numpy as np
 import paddle
 import logging
 from paddleslim.common import get_logger
+from paddleslim.prune.sparse_checkpoint import save_sparse_checkpoint
+from paddleslim.prune.sparse_pattern import parse_sparse_pattern, pattern_scores
 
 __all__ = ["UnstructuredPruner", "GMPUnstructuredPruner"]
 
@@ -25,6 +27,8 @@ class UnstructuredPruner():
       - prune_params_type(str): The argument to control which type of ops will be pruned. Currently we only support None (all but norms) or conv1x1_only as input. It acts as a straightforward call to conv1x1 pruning.  Default: None
       - skip_params_func(function): The function used to select the parameters which should be skipped when performing pruning. Default: normalization-related params. 
       - local_sparsity(bool): Whether to enable local sparsity. Local sparsity means all the weight matrices have the same sparsity. And the global sparsity only ensures the whole model's sparsity is equal to the passed-in 'ratio'. Default: False
+      - update_interval(int): The threshold is updated every 'update_interval' calls of step() in ratio mode, and the masks are updated by the latest threshold in the other steps. Default: 1
+      - sparse_pattern(str|None): The pattern of sparsity. None means element-wise sparsity. 'N:M', such as '2:4', means at most N weights are kept in every M consecutive weights along the input channel, and the weights are exactly N:M sparse once the ratio reaches 1-N/M. 'KxK', such as '4x4', means the weights are pruned in KxK blocks by the mean absolute values of blocks. Default: None
     """
 
     def __init__(self,
@@ -34,7 +38,9 @@ class UnstructuredPruner():
                  ratio=0.55,
                  prune_params_type=None,
                  skip_params_func=None,
-                 local_sparsity=False):
+                 local_sparsity=False,
+                 update_interval=1,
+                 sparse_pattern=None):
         assert mode in ('ratio', 'threshold'
                         ), "mode must be selected from 'ratio' and 'threshold'"
         assert prune_params_type is None or prune_params_type == 'conv1x1_only', "prune_params_type only supports None or conv1x1_only for now."
@@ -46,6 +52,11 @@ class UnstructuredPruner():
         self.ratio = ratio
         self.local_sparsity = local_sparsity
         self.thresholds = {}
+        self.update_interval = update_interval
+        self._step_count = 0
+        # The buffer of absolute values reused by update_threshold.
+        self._abs_buffer = None
+        self._pattern = parse_sparse_pattern(sparse_pattern)
 
         # Prority: passed-in skip_params_func > prune_params_type (conv1x1_only) > built-in _get_skip_params
         if skip_params_func is not None:
@@ -66,15 +77,20 @@ class UnstructuredPruner():
           - parameters(list<Tensor>): The parameters to be pruned.
           - masks(list<Tensor>): The masks used to keep zero values in parameters.
         """
-        param_tmp = param * mask
+        param_tmp = param * mask.astype(param.dtype)
         param_tmp.stop_gradient = True
         paddle.assign(param_tmp, output=param)
 
     def _apply_masks(self):
         self.masks = {}
         for name, sub_layer in self.model.named_sublayers():
+            if not self._should_prune_layer(sub_layer):
+                continue
             for param in sub_layer.parameters(include_sublayers=False):
-                tmp_array = np.ones(param.shape, dtype=np.float32)
+                # Only the prunable params need masks, which are stored in bool.
+                if param.name in self.skip_params:
+                    continue
+                tmp_array = np.ones(param.shape, dtype='bool')
                 mask_name = "_".join([param.name.replace(".", "_"), "mask"])
                 if mask_name not in sub_layer._buffers:
                     sub_layer.register_buffer(mask_name,
@@ -88,7 +104,7 @@ class UnstructuredPruner():
         Update the threshold after each optimization step.
         User should overwrite this method togther with self.mask_parameters()
         '''
-        params_flatten = []
+        values = []
         for name, sub_layer in self.model.named_sublayers():
             if not self._should_prune_layer(sub_layer):
                 continue
@@ -96,20 +112,44 @@ class UnstructuredPruner():
                 if param.name in self.skip_params:
                     continue
                 t_param = param.value().get_tensor()
-                v_param = np.array(t_param)
-                if self.local_sparsity:
-                    flatten_v_param = v_param.flatten()
-                    cur_length = flatten_v_param.size
-                    cur_threshold = np.sort(np.abs(flatten_v_param))[max(
-                        0, round(self.ratio * cur_length) - 1)].item()
-                    self.thresholds[param.name] = cur_threshold
-                else:
-                    params_flatten.append(v_param.flatten())
+                values.append((param.name, np.array(t_param)))
+        if len(values) == 0:
+            return
+
+        total_length = sum([v_param.size for _, v_param in values])
+        dtype = values[0][1].dtype
+        if self._abs_buffer is None or self._abs_buffer.size != total_length or \
+                self._abs_buffer.dtype != dtype:
+            self._abs_buffer = np.empty(total_length, dtype=dtype)
+        offset = 0
+        for param_name, v_param in values:
+            abs_param = self._abs_buffer[offset:offset + v_param.size]
+            if self._pattern[0] == 'element':
+                np.abs(v_param.ravel(), out=abs_param)
+            else:
+                abs_param[:] = pattern_scores(v_param, self._pattern).ravel()
+            offset += v_param.size
+            if self.local_sparsity:
+                self.thresholds[param_name] = self._select_pattern_threshold(
+                    abs_param)
         if not self.local_sparsity:
-            params_flatten = np.concatenate(params_flatten, axis=0)
-            total_length = params_flatten.size
-            self.threshold = np.sort(np.abs(params_flatten))[max(
-                0, round(self.ratio * total_length) - 1)].item()
+            self.threshold = self._select_pattern_threshold(self._abs_buffer)
+
+    def _select_pattern_threshold(self, scores):
+        if self._pattern[0] == 'nm':
+            n, m = self._pattern[1]
+            # Prune all the candidates to get exact N:M sparsity.
+            if self.ratio >= 1 - float(n) / m: return float('inf')
+        return self._select_threshold(scores)
+
+    def _select_threshold(self, abs_params):
+        """
+        Select the threshold from absolute values by np.partition in O(N)
+        instead of sorting all of them. Note that abs_params is partitioned in place.
+        """
+        index = max(0, round(self.ratio * abs_params.size) - 1)
+        abs_params.partition(index)
+        return abs_params[index].item()
 
     def _update_masks(self):
         for name, sub_layer in self.model.named_sublayers():
@@ -119,11 +159,13 @@ class UnstructuredPruner():
                 if param.name in self.skip_params:
                     continue
                 mask = self.masks.get(param.name)
-                if self.local_sparsity:
-                    bool_tmp = (
-                        paddle.abs(param) >= self.thresholds[param.name])
+                threshold = self.thresholds[
+                    param.name] if self.local_sparsity else self.threshold
+                if self._pattern[0] == 'element':
+                    bool_tmp = (paddle.abs(param) >= threshold)
                 else:
-                    bool_tmp = (paddle.abs(param) >= self.threshold)
+                    scores = pattern_scores(param.numpy(), self._pattern)
+                    bool_tmp = paddle.to_tensor(scores >= threshold)
                 paddle.assign(bool_tmp, output=mask)
 
     def set_static_masks(self):
@@ -131,6 +173,7 @@ class UnstructuredPruner():
             if not self._should_prune_layer(sub_layer): continue
             for param in sub_layer.parameters(include_sublayers=False):
                 mask = self.masks.get(param.name)
+                if mask is None: continue
                 bool_tmp = (paddle.abs(param) != 0.0)
                 paddle.assign(bool_tmp, output=mask)
 
@@ -153,7 +196,10 @@ class UnstructuredPruner():
             for param in sub_layer.parameters(include_sublayers=False):
                 data.append(np.array(param.value().get_tensor()).flatten())
         data = np.concatenate(data, axis=0)
-        threshold = np.sort(np.abs(data))[max(0, int(ratio * len(data) - 1))]
+        data = np.abs(data)
+        index = max(0, int(ratio * len(data) - 1))
+        data.partition(index)
+        threshold = data[index]
         return threshold
 
     def step(self):
@@ -161,16 +207,19 @@ class UnstructuredPruner():
         Update the threshold after each optimization step.
         """
         if self.mode == 'ratio':
-            self.update_threshold()
+            if self._step_count % self.update_interval == 0:
+                self.update_threshold()
             self._update_masks()
         elif self.mode == 'threshold':
             self._update_masks()
+        self._step_count += 1
 
     def _forward_pre_hook(self, layer, input):
         if not self._should_prune_layer(layer):
             return input
         for param in layer.parameters(include_sublayers=False):
             mask = self.masks.get(param.name)
+            if mask is None: continue
             self.mask_parameters(param, mask)
         return input
 
@@ -182,10 +231,36 @@ class UnstructuredPruner():
         for name, sub_layer in self.model.named_sublayers():
             for param in sub_layer.parameters(include_sublayers=False):
                 mask = self.masks.get(param.name)
-                param_tmp = param * mask
+                if mask is None: continue
+                param_tmp = param * mask.astype(param.dtype)
                 param_tmp.stop_gradient = True
                 paddle.assign(param_tmp, output=param)
 
+    def export_sparse(self, path, format='bitmap', min_sparsity=0.5):
+        """
+        Save the masked parameters of the model into a compressed sparse checkpoint.
+        The masks are not saved. It can be loaded back to dense values lazily by
+        paddleslim.prune.load_sparse_checkpoint, and then set into the model by model.set_state_dict.
+
+        Args:
+          - path(str): The path of the checkpoint.
+          - format(str): The sparse format, must be selected from 'bitmap' and 'csr'. Default: 'bitmap'.
+          - min_sparsity(float): The parameters whose sparsity is lower than it are stored densely. Default: 0.5.
+        Returns:
+          - path(str): The path of the saved checkpoint.
+        """
+        mask_ids = set([id(mask) for mask in self.masks.values()])
+        params = {}
+        for name, value in self.model.state_dict().items():
+            if id(value) in mask_ids:
+                continue
+            v_param = value.numpy()
+            mask = self.masks.get(value.name)
+            if mask is not None:
+                v_param = v_param * mask.numpy()
+            params[name] = v_param
+        return save_sparse_checkpoint(params, path, format, min_sparsity)
+
     @staticmethod
     def total_sparse(model):
         """
@@ -287,6 +362,7 @@ class GMPUnstructuredPruner(UnstructuredPruner):
                {'initial_ratio': float} # the initial ratio value
         
         ..
+      - sparse_pattern(str|None): The pattern of sparsity, the same as that of UnstructuredPruner. Default: None
 
     """
 
@@ -296,12 +372,19 @@ class GMPUnstructuredPruner(UnstructuredPruner):
                  prune_params_type=None,
                  skip_params_func=None,
                  local_sparsity=False,
-                 configs=None):
+                 configs=None,
+                 sparse_pattern=None):
 
         assert configs is not None, "Configs must be passed in for GMP pruner."
         super(GMPUnstructuredPruner, self).__init__(
-            model, 'ratio', 0.0, ratio, prune_params_type, skip_params_func,
-            local_sparsity)
+            model,
+            'ratio',
+            0.0,
+            ratio,
+            prune_params_type,
+            skip_params_func,
+            local_sparsity,
+            sparse_pattern=sparse_pattern)
         self.stable_iterations = configs.get('stable_iterations')
         self.pruning_iterations = configs.get('pruning_iterations')
         self.tunning_iterations = configs.get('tunning_iterations')
@@ -25,6 +25,8 @@ class DygraphPruningCollections(PruningCollections):
         # model can be in training mode, because some model contains auxiliary parameters for training.
         program = dygraph2program(model, inputs=inputs)
         graph = GraphWrapper(program)
+        # The traced graph is kept to estimate FLOPs without tracing again.
+        self.graph = graph
         params = [
             _param.name for _param in model.parameters()
             if len(_param.shape) == 4
@@ -14,6 +14,7 @@
 
 import copy
 import logging
+import collections
 
 import paddle
 import paddle.nn as nn
@@ -23,6 +24,7 @@ from paddle.fluid.contrib.slim.quantization import HistQuantizer
 from paddle.fluid.contrib.slim.quantization import KLQuantizer
 from paddle.fluid.contrib.slim.quantization import PerChannelAbsmaxQuantizer
 from ...common import get_logger
+from ...core import GraphWrapper, dygraph2program
 
 _logger = get_logger(__name__, level=logging.INFO)
 
@@ -34,6 +36,95 @@ __all__ = [
     'PerChannelAbsmaxQuantizer',
 ]
 
+# The layers can be fused by ImperativePTQ, matched by exact types.
+_FUSE_TYPES = [(nn.Conv2D, nn.BatchNorm2D), (nn.Linear, nn.BatchNorm1D)]
+_CONV_OP_TYPES = ['conv2d', 'depthwise_conv2d']
+_LINEAR_OP_TYPES = ['matmul_v2', 'matmul', 'mul']
+_ACT_OP_TYPES = [
+    'relu', 'relu6', 'leaky_relu', 'hard_swish', 'swish', 'sigmoid',
+    'hard_sigmoid', 'tanh', 'prelu'
+]
+
+
+def _find_fuse_pairs(model, inputs):
+    """
+    Trace the model and find the conv2d or linear layers whose outputs, after
+    their own bias, go only to a bn layer. The layers called more than once
+    are not fused.
+    """
+    training = model.training
+    # Trace in eval mode, so the running statistics of bn are not updated.
+    model.eval()
+    try:
+        program = dygraph2program(model, inputs)
+    finally:
+        if training:
+            model.train()
+    graph = GraphWrapper(program)
+
+    owners = {}
+    for name, layer in model.named_sublayers():
+        for param in layer.parameters(include_sublayers=False):
+            owners[param.name] = (name, layer)
+
+    def _owner(op, slot):
+        if slot not in op._op.input_names:
+            return None, None
+        for var in op.inputs(slot):
+            return owners.get(var.name(), (None, None))
+        return None, None
+
+    consumers = collections.defaultdict(list)
+    calls = collections.Counter()
+    for op in graph.ops():
+        for var in op.all_inputs():
+            consumers[var.name()].append(op)
+        for slot in ['Filter', 'Y', 'Scale']:
+            name, _ = _owner(op, slot)
+            if name is not None and op.type() != 'elementwise_add':
+                calls[name] += 1
+
+    fuse_list = []
+    for op in graph.ops():
+        if op.type() in _CONV_OP_TYPES:
+            name, layer = _owner(op, 'Filter')
+            out = op.outputs('Output')[0]
+        elif op.type() in _LINEAR_OP_TYPES:
+            name, layer = _owner(op, 'Y')
+            out = op.outputs('Out')[0]
+        else:
+            continue
+        if layer is None or calls[name] != 1:
+            continue
+        next_ops = consumers[out.name()]
+        # skip the bias of the same layer
+        if len(next_ops) == 1 and next_ops[0].type(
+        ) == 'elementwise_add' and _owner(next_ops[0], 'Y')[0] == name:
+            out = next_ops[0].outputs('Out')[0]
+            next_ops = consumers[out.name()]
+        if len(next_ops) != 1 or next_ops[0].type() != 'batch_norm':
+            continue
+        bn_op = next_ops[0]
+        bn_name, bn_layer = _owner(bn_op, 'Scale')
+        if bn_layer is None or calls[bn_name] != 1:
+            continue
+        if (type(layer), type(bn_layer)) not in _FUSE_TYPES:
+            continue
+        if isinstance(layer, nn.Conv2D) and (
+                layer._data_format != 'NCHW' or
+                bn_layer._data_format != 'NCHW'):
+            continue
+        # bn normalizes the features of linear only for 2-D inputs
+        if isinstance(layer, nn.Linear) and len(out.shape()) != 2:
+            continue
+        act_ops = consumers[bn_op.outputs('Y')[0].name()]
+        act = act_ops[0].type() if len(act_ops) == 1 and act_ops[0].type(
+        ) in _ACT_OP_TYPES else None
+        _logger.debug("Found {} + {}{}".format(name, bn_name, " + {}".format(
+            act) if act else ""))
+        fuse_list.append([name, bn_name])
+    return fuse_list
+
 
 class PTQ(object):
     """
@@ -65,7 +156,12 @@ class PTQ(object):
 
         self.ptq = Q.ImperativePTQ(quant_config=quant_config)
 
-    def quantize(self, model, inplace=False, fuse=False, fuse_list=None):
+    def quantize(self,
+                 model,
+                 inplace=False,
+                 fuse=False,
+                 fuse_list=None,
+                 inputs=None):
         """
         Quantize the input model.
 
@@ -80,6 +176,9 @@ class PTQ(object):
                 The conv2d and bn layers will be fused automatically
                 if "fuse" was set as True but "fuse_list" was None.
                 Default: None.
+            inputs(list|tuple, optional): The input shapes or tensors used
+                to trace the model when finding the layers to be fused.
+                See 'find_conv_bn_names'. Default: None.
         Returns:
             quantized_model(paddle.nn.Layer): The quantized model.
         """
@@ -88,7 +187,7 @@ class PTQ(object):
 
         if fuse == True:
             if fuse_list is None:
-                fuse_list = self.find_conv_bn_names(model)
+                fuse_list = self.find_conv_bn_names(model, inputs)
             _logger.info('The layers to be fused:')
             for i in fuse_list:
                 _logger.info(i)
@@ -96,16 +195,25 @@ class PTQ(object):
         return self.ptq.quantize(
             model=model, inplace=inplace, fuse=fuse, fuse_list=fuse_list)
 
-    def find_conv_bn_names(self, model):
+    def find_conv_bn_names(self, model, inputs=None):
         """
         Find the connected conv2d and bn layers of model.
+
+        If inputs is given, the model is traced, and a conv2d or linear
+        layer is paired with a bn layer only if its output goes to the bn
+        layer and nothing else. Otherwise, a conv2d layer is paired with the
+        bn layer next to it in the order of sublayers.
        
         Args:
             model(paddle.nn.Layer): The model to be fuseed.
+            inputs(list|tuple, optional): The input shapes or tensors used
+                to trace the model, such as [1, 3, 224, 224]. Default: None.
        
         Returns:
             fuse_list(list): The conv and bn layers to be fused.
         """
+        if inputs is not None:
+            return _find_fuse_pairs(model, inputs)
 
         last_layer = None
         fuse_list = []
@@ -0,0 +1,220 @@
+#   Copyright (c) 2021 PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Pre-tokenized dataset cache, length-bucketed batching and prefetching."""
+
+import os
+import queue
+import threading
+import numpy as np
+
+__all__ = [
+    'build_dataset_cache', 'TokenizedDataset', 'bucket_batches', 'prefetch'
+]
+
+_FIELDS = ['tokens', 'segments', 'labels', 'offsets']
+
+
+def _field_path(cache_prefix, field):
+    return "{}.{}.npy".format(cache_prefix, field)
+
+
+def build_dataset_cache(features, cache_prefix):
+    """
+    Write features into the binary cache. The token ids and segment ids of all
+    examples are concatenated into two flat arrays, and the offsets of each
+    example in them are saved as index.
+
+    Args:
+        features: An iterable of InputFeatures.
+        cache_prefix(str): The path prefix of cache files.
+    """
+    tokens, segments, labels, offsets = [], [], [], [0]
+    for feature in features:
+        tokens.append(np.asarray(feature.input_ids, dtype="int32"))
+        segments.append(np.asarray(feature.segment_ids, dtype="int8"))
+        labels.append(feature.label_id)
+        offsets.append(offsets[-1] + len(feature.input_ids))
+    arrays = {
+        'tokens': np.concatenate(tokens) if tokens else np.zeros(
+            [0], dtype="int32"),
+        'segments': np.concatenate(segments) if segments else np.zeros(
+            [0], dtype="int8"),
+        'labels': np.array(
+            labels, dtype="int64"),
+        'offsets': np.array(
+            offsets, dtype="int64")
+    }
+    cache_dir = os.path.dirname(cache_prefix)
+    if cache_dir and not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    # The offsets are written last, so a cache is complete once they exist.
+    for field in _FIELDS:
+        tmp_path = "{}.{}.tmp.npy".format(cache_prefix, field)
+        np.save(tmp_path, arrays[field])
+        os.replace(tmp_path, _field_path(cache_prefix, field))
+
+
+class TokenizedDataset(object):
+    """
+    The dataset in the cache written by 'build_dataset_cache'. The token ids
+    and segment ids are memory-mapped, so only the accessed examples are read.
+
+    Args:
+        cache_prefix(str): The path prefix of cache files.
+    """
+
+    def __init__(self, cache_prefix):
+        self._tokens = np.load(
+            _field_path(cache_prefix, 'tokens'), mmap_mode='r')
+        self._segments = np.load(
+            _field_path(cache_prefix, 'segments'), mmap_mode='r')
+        self._labels = np.load(_field_path(cache_prefix, 'labels'))
+        self._offsets = np.load(_field_path(cache_prefix, 'offsets'))
+        self.lengths = np.diff(self._offsets)
+
+    @staticmethod
+    def exists(cache_prefix):
+        return all(
+            os.path.isfile(_field_path(cache_prefix, field))
+            for field in _FIELDS)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __getitem__(self, index):
+        """
+        Returns:
+            tuple: The token ids, segment ids and label of the example.
+        """
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return (self._tokens[start:end].tolist(),
+                self._segments[start:end].tolist(), int(self._labels[index]))
+
+
+def _cut_batches(indices, lengths, batch_size, in_tokens):
+    # The same rules as the batch reader of DataProcessor.
+    batches, batch, max_len = [], [], 0
+    for index in indices:
+        max_len = max(max_len, lengths[index])
+        if in_tokens:
+            to_append = (len(batch) + 1) * max_len <= batch_size
+        else:
+            to_append = len(batch) < batch_size
+        if to_append:
+            batch.append(index)
+        else:
+            batches.append(batch)
+            batch, max_len = [index], lengths[index]
+    if len(batch) > 0:
+        batches.append(batch)
+    return batches
+
+
+def bucket_batches(lengths,
+                   batch_size,
+                   in_tokens,
+                   shuffle=True,
+                   pool_size=None,
+                   rng=None):
+    """
+    Group examples into batches. When shuffle is True, the shuffled examples
+    are split into pools and sorted by length in each pool, so the examples
+    in a batch have similar lengths and less padding is needed. The order of
+    batches is shuffled then. When shuffle is False, examples are batched in
+    the original order.
+
+    Args:
+        lengths(np.ndarray): The lengths of examples.
+        batch_size(int): The number of examples, or the number of tokens
+                         including padding if in_tokens is True, in a batch.
+        in_tokens(bool): Whether batch_size is a token budget.
+        shuffle(bool): Whether to shuffle and bucket examples. Default: True.
+        pool_size(int): The number of examples sorted together. None means
+                        the examples of about 100 batches. Default: None.
+        rng(np.random.RandomState): The random generator. Default: None.
+
+    Returns:
+        list: The lists of example indices in each batch.
+    """
+    rng = np.random if rng is None else rng
+    indices = np.arange(len(lengths))
+    if not shuffle:
+        return _cut_batches(indices, lengths, batch_size, in_tokens)
+    rng.shuffle(indices)
+    if pool_size is None:
+        examples_per_batch = batch_size
+        if in_tokens:
+            examples_per_batch = batch_size // max(
+                int(np.mean(lengths)) if len(lengths) > 0 else 1, 1)
+        pool_size = max(examples_per_batch, 1) * 100
+    batches = []
+    for start in range(0, len(indices), pool_size):
+        pool = indices[start:start + pool_size]
+        pool = pool[np.argsort(lengths[pool], kind='stable')]
+        batches.extend(_cut_batches(pool, lengths, batch_size, in_tokens))
+    rng.shuffle(batches)
+    return batches
+
+
+def prefetch(reader, buffer_size=8):
+    """
+    Run the reader in a background thread, which keeps up to buffer_size
+    items ready for the consumer.
+
+    Args:
+        reader: A function returning an iterable.
+        buffer_size(int): The max number of prefetched items. Default: 8.
+
+    Returns:
+        function: The reader yielding the same items.
+    """
+    end = object()
+
+    def prefetched_reader():
+        items = queue.Queue(maxsize=buffer_size)
+        stopped = threading.Event()
+
+        def _put(item):
+            while not stopped.is_set():
+                try:
+                    items.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def _worker():
+            try:
+                for item in reader():
+                    if not _put(item):
+                        return
+                _put(end)
+            except Exception as e:
+                _put(e)
+
+        thread = threading.Thread(target=_worker)
+        thread.daemon = True
+        thread.start()
+        try:
+            while True:
+                item = items.get()
+                if item is end:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+
+    return prefetched_reader
@@ -19,6 +19,7 @@ from __future__ import division
 from __future__ import print_function
 
 import collections
+import functools
 import unicodedata
 import six
 import io
@@ -124,6 +125,10 @@ class FullTokenizer(object):
 
         return split_tokens
 
+    def tokenize_many(self, texts):
+        """Tokenizes a list of texts."""
+        return [self.tokenize(text) for text in texts]
+
     def convert_tokens_to_ids(self, tokens):
         return convert_by_vocab(self.vocab, tokens)
 
@@ -272,16 +277,61 @@ class BasicTokenizer(object):
 class WordpieceTokenizer(object):
     """Runs WordPiece tokenziation."""
 
-    def __init__(self, vocab, unk_token="[UNK]", max_input_chars_per_word=100):
+    def __init__(self,
+                 vocab,
+                 unk_token="[UNK]",
+                 max_input_chars_per_word=100,
+                 cache_size=100000):
         self.vocab = vocab
         self.unk_token = unk_token
         self.max_input_chars_per_word = max_input_chars_per_word
+        # The prefix tries of the pieces at the beginning of words and the
+        # pieces following "##". The piece ending at a node is stored under
+        # the key None.
+        self._start_trie = {}
+        self._suffix_trie = {}
+        for piece in vocab:
+            if len(piece) > 0:
+                self._add_piece(self._start_trie, piece, piece)
+            if piece.startswith("##") and len(piece) > 2:
+                self._add_piece(self._suffix_trie, piece[2:], piece)
+        self._tokenize_word = functools.lru_cache(maxsize=cache_size)(
+            self._match_word)
+
+    def _add_piece(self, trie, chars, piece):
+        node = trie
+        for char in chars:
+            node = node.setdefault(char, {})
+        node[None] = piece
+
+    def _match_word(self, token):
+        """Splits a word into the longest matched pieces greedily. Returns
+        None if some part of the word can not be matched."""
+        sub_tokens = []
+        start = 0
+        while start < len(token):
+            node = self._start_trie if start == 0 else self._suffix_trie
+            cur_substr = None
+            end = start
+            for i in range(start, len(token)):
+                node = node.get(token[i])
+                if node is None:
+                    break
+                if None in node:
+                    cur_substr = node[None]
+                    end = i + 1
+            if cur_substr is None:
+                return None
+            sub_tokens.append(cur_substr)
+            start = end
+        return tuple(sub_tokens)
 
     def tokenize(self, text):
         """Tokenizes a piece of text into its word pieces.
 
         This uses a greedy longest-match-first algorithm to perform tokenization
-        using the given vocabulary.
+        using the given vocabulary. The longest pieces are found by walking the
+        prefix tries of vocabulary, and the pieces of recent words are cached.
 
         For example:
             input = "unaffable"
@@ -299,37 +349,28 @@ class WordpieceTokenizer(object):
 
         output_tokens = []
         for token in whitespace_tokenize(text):
-            chars = list(token)
-            if len(chars) > self.max_input_chars_per_word:
+            if len(token) > self.max_input_chars_per_word:
                 output_tokens.append(self.unk_token)
                 continue
 
-            is_bad = False
-            start = 0
-            sub_tokens = []
-            while start < len(chars):
-                end = len(chars)
-                cur_substr = None
-                while start < end:
-                    substr = "".join(chars[start:end])
-                    if start > 0:
-                        substr = "##" + substr
-                    if substr in self.vocab:
-                        cur_substr = substr
-                        break
-                    end -= 1
-                if cur_substr is None:
-                    is_bad = True
-                    break
-                sub_tokens.append(cur_substr)
-                start = end
-
-            if is_bad:
+            sub_tokens = self._tokenize_word(token)
+            if sub_tokens is None:
                 output_tokens.append(self.unk_token)
             else:
                 output_tokens.extend(sub_tokens)
         return output_tokens
 
+    def tokenize_many(self, texts):
+        """Tokenizes a list of texts.
+
+        Args:
+            texts: A list of texts.
+
+        Returns:
+            A list of the lists of wordpiece tokens.
+        """
+        return [self.tokenize(text) for text in texts]
+
 
 def _is_whitespace(char):
     """Checks whether `chars` is a whitespace character."""
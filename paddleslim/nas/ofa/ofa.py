@@ -29,7 +29,7 @@ else:
     DataParallel = paddle.DataParallel
 from .layers_base import BaseBlock, Block
 from .utils.utils import search_idx
-from ...common import get_logger
+from ...common import get_logger, traced
 from ...core import GraphWrapper, dygraph2program
 from .get_sub_model import check_search_space, broadcast_search_space
 from paddle.fluid import core
@@ -515,6 +515,7 @@ class OFA(OFABase):
 
         return pruned_param
 
+    @traced('OFA.export', phase='export')
     def export(self,
                config,
                input_shapes,
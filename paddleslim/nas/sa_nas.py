@@ -21,7 +21,7 @@ import hashlib
 import time
 import paddle.fluid as fluid
 from ..common import SAController
-from ..common import get_logger
+from ..common import get_logger, tracer, traced
 
 from ..common import ControllerServer
 from ..common import ControllerClient
@@ -213,13 +213,15 @@ class SANAS(object):
         current_dict = self._controller_client.request_current_info()
         return current_dict
 
+    @traced('SANAS.next_archs', phase='nas')
     def next_archs(self):
         """
         Get next model architectures.
         Returns:
             list<function>: A list of instance of model architecture.
         """
-        self._current_tokens = self._controller_client.next_tokens()
+        with tracer.span('controller_next_tokens', 'io'):
+            self._current_tokens = self._controller_client.next_tokens()
         _logger.info("current tokens: {}".format(self._current_tokens))
         archs = self._search_space.token2arch(self._current_tokens)
         return archs
@@ -31,6 +31,10 @@ from .unstructured_pruner import *
 from ..prune import unstructured_pruner
 from .idx_selector import *
 from ..prune import idx_selector
+from .sparse_checkpoint import *
+from ..prune import sparse_checkpoint
+from .sparse_pattern import *
+from ..prune import sparse_pattern
 __all__ = []
 
 __all__ += pruner.__all__
@@ -42,3 +46,5 @@ __all__ += criterion.__all__
 __all__ += unstructured_pruner.__all__
 __all__ += idx_selector.__all__
 __all__ += collections.__all__
+__all__ += sparse_checkpoint.__all__
+__all__ += sparse_pattern.__all__
@@ -12,11 +12,10 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import copy
 import logging
 from ..core import GraphWrapper, VarWrapper
 from ..common import get_logger
-from .prune_worker import PRUNE_WORKER, UnsupportOpError
+from .prune_worker import PRUNE_WORKER, UnsupportOpError, VisitedRecord
 
 __all__ = [
     'PruningDetails', 'PruningCollection', 'PruningCollections',
@@ -131,9 +130,12 @@ class PruningCollections(object):
         return iter(self._collections)
 
     def _find_leaves(self, graph):
+        consumed = set()
+        for op in graph.ops():
+            consumed.update(op._op.input_arg_names)
         ret = []
         for _var in graph.vars():
-            if len(_var.outputs()) == 0:
+            if _var.name() not in consumed:
                 ret.append(_var.name())
         return ret
 
@@ -177,13 +179,13 @@ class PruningCollections(object):
         if not isinstance(graph, GraphWrapper):
             graph = GraphWrapper(graph)
 
-        skip_vars = [] if skip_vars is None else skip_vars
+        skip_vars = set() if skip_vars is None else set(skip_vars)
         if skip_leaves:
             leaves = self._find_leaves(graph)
-            skip_vars.extend(leaves)
+            skip_vars.update(leaves)
             _logger.warning(
                 "Leaves {} will be skipped when parsing graph.".format(leaves))
-        visited = {}
+        visited = VisitedRecord(graph)
         collections = []
         unsupported_warnings = set()
         for _param in params:
@@ -194,9 +196,10 @@ class PruningCollections(object):
                     f"Couldn't find relative variables of {_param} because {_param} is not in target program or model. Please make sure {_param} is in your program if you are using static API of PaddlePaddle. And make sure your model in correct mode and contains {_param} if you are using dynamic API of PaddlePaddle."
                 )
                 continue
-            target_op = param.outputs()[0]
+            next_ops = visited.adjacent_ops(param)[1]
+            target_op = next_ops[0]
             if target_op.type() == 'conditional_block':
-                for op in param.outputs():
+                for op in next_ops:
                     if op.type() in PRUNE_WORKER._module_dict.keys():
                         cls = PRUNE_WORKER.get(op.type())
                         worker = cls(op,
@@ -215,11 +218,10 @@ class PruningCollections(object):
                              skip_stranger=skip_stranger)
                 worker.skip_vars = skip_vars
             try:
-                visited_backup = copy.deepcopy(worker.visited)
+                checkpoint = visited.checkpoint()
                 worker.prune(param, pruned_axis=0, pruned_idx=[])
             except UnsupportOpError as e:
-                visited.clear()
-                visited.update(visited_backup)
+                visited.rollback(checkpoint)
                 unsupported_warnings.add(e.args)
             else:
                 if len(pruned_params) != 0:
@@ -19,7 +19,7 @@ import numpy as np
 from ..common import get_logger
 from ..core import Registry, GraphWrapper
 
-__all__ = ["l1_norm", "CRITERION"]
+__all__ = ["l1_norm", "CRITERION", "distance_sums"]
 
 _logger = get_logger(__name__, level=logging.INFO)
 
@@ -63,6 +63,37 @@ def l1_norm(group, values, graph):
     return scores
 
 
+def distance_sums(value, chunk_size=512):
+    """Compute the sum of euclidean distances from each filter to all filters.
+
+    The pairwise distances are computed by the Gram matrix of the filters,
+    `||w_i - w_j||^2 = ||w_i||^2 + ||w_j||^2 - 2 * <w_i, w_j>`, in chunks
+    of `chunk_size` filters so that the temporary is at most
+    `chunk_size` x `value.shape[0]`.
+
+    Args:
+       value(np.ndarray): The weight whose filters are on axis 0.
+       chunk_size(int): The number of filters computed at once. Default: 512.
+
+    Returns:
+       np.ndarray: The distance sums with shape [value.shape[0]].
+    """
+    w = value.reshape([value.shape[0], -1]).astype("float64")
+    square = np.sum(w * w, axis=1)
+    sums = np.zeros([w.shape[0]], dtype="float64")
+    for start in range(0, w.shape[0], chunk_size):
+        end = min(start + chunk_size, w.shape[0])
+        dist = np.dot(w[start:end], w.T)
+        dist *= -2
+        dist += square[start:end, None]
+        dist += square[None, :]
+        # Rounding errors may make distances of the same filters negative.
+        np.maximum(dist, 0, out=dist)
+        dist[np.arange(end - start), np.arange(start, end)] = 0
+        sums[start:end] = np.sqrt(dist, out=dist).sum(axis=1)
+    return sums
+
+
 @CRITERION.register
 def geometry_median(group, values, graph):
     name = group.master["name"]
@@ -74,20 +105,7 @@ def geometry_median(group, values, graph):
     assert len(
         value.shape) == 4, "geometry_median only support for weight of conv2d."
 
-    def get_distance_sum(value, out_idx):
-        w = value.view()
-        w.shape = value.shape[0], np.product(value.shape[1:])
-        selected_filter = np.tile(w[out_idx], (w.shape[0], 1))
-        x = w - selected_filter
-        x = np.sqrt(np.sum(x * x, -1))
-        return x.sum()
-
-    dist_sum_list = []
-    for out_i in range(value.shape[0]):
-        dist_sum = get_distance_sum(value, out_i)
-        dist_sum_list.append(dist_sum)
-
-    tmp = np.array(dist_sum_list)
+    tmp = distance_sums(value)
 
     scores = {}
     for pruning_details in group.all_pruning_details():
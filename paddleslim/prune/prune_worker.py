@@ -18,7 +18,7 @@ import numpy as np
 from ..core import Registry
 from ..common import get_logger
 
-__all__ = ["PRUNE_WORKER", "conv2d", "UnsupportOpError"]
+__all__ = ["PRUNE_WORKER", "conv2d", "UnsupportOpError", "VisitedRecord"]
 
 _logger = get_logger(__name__, level=logging.INFO)
 
@@ -49,6 +49,90 @@ class UnsupportOpError(Exception):
     pass
 
 
+class VisitedRecord(dict):
+    """
+    The record of visited operators and variables shared by the workers of searching. It maps the
+    pruned axis to the visited keys like a dict, and additionally:
+
+    - encodes the visited keys as tuples of integers instead of strings.
+    - logs the visits, so that a failed search can be rolled back without copying the record.
+    - indexes the producers and consumers of variables in one pass over the graph.
+    - reuses one worker for each operator.
+
+    Args:
+        graph(GraphWrapper): The graph to be searched. None means finding the producers and
+                             consumers by the variables. Default: None.
+    """
+
+    def __init__(self, graph=None):
+        super(VisitedRecord, self).__init__()
+        self._graph = graph
+        self._undo_log = []
+        self._name_ids = {}
+        self._first_inputs = {}
+        self._producers = None
+        self._consumers = None
+        self._workers = {}
+
+    def _name_id(self, name):
+        if name not in self._name_ids:
+            self._name_ids[name] = len(self._name_ids)
+        return self._name_ids[name]
+
+    def visit(self, op, var, pruned_axis):
+        """Mark the variable of operator as visited on the axis. Returns False if it has been visited."""
+        if op.idx() not in self._first_inputs:
+            self._first_inputs[op.idx()] = self._name_id(op._op.input_arg_names[
+                0])
+        key = (op.idx(), self._name_id(var.name()),
+               self._first_inputs[op.idx()])
+        if pruned_axis not in self:
+            self[pruned_axis] = {}
+        if key in self[pruned_axis]:
+            return False
+        self[pruned_axis][key] = True
+        self._undo_log.append((pruned_axis, key))
+        return True
+
+    def checkpoint(self):
+        return len(self._undo_log)
+
+    def rollback(self, checkpoint):
+        """Remove the visits after the checkpoint."""
+        while len(self._undo_log) > checkpoint:
+            pruned_axis, key = self._undo_log.pop()
+            del self[pruned_axis][key]
+
+    def _build_index(self):
+        self._producers, self._consumers = {}, {}
+        for op in self._graph.ops():
+            for name in set(op._op.output_arg_names):
+                self._producers.setdefault(name, []).append(op)
+            for name in set(op._op.input_arg_names):
+                self._consumers.setdefault(name, []).append(op)
+
+    def adjacent_ops(self, var):
+        """Get the operators producing and consuming the variable."""
+        if self._graph is None:
+            return var.inputs(), var.outputs()
+        if self._producers is None:
+            self._build_index()
+        return (self._producers.get(var.name(), []),
+                self._consumers.get(var.name(), []))
+
+    def worker(self, cls, op, pruned_params, skip_stranger, skip_vars):
+        """Get the worker of operator, which is created on first call."""
+        key = (cls, id(op._op))
+        worker = self._workers.get(key)
+        if worker is None:
+            worker = cls(op, pruned_params, self, skip_stranger)
+            self._workers[key] = worker
+        worker.pruned_params = pruned_params
+        worker.skip_stranger = skip_stranger
+        worker.skip_vars = skip_vars
+        return worker
+
+
 class PruneWorker(object):
     def __init__(self,
                  op,
@@ -93,6 +177,8 @@ class PruneWorker(object):
             self._prune(var, pruned_axis, pruned_idx)
 
     def _visit(self, var, pruned_axis):
+        if isinstance(self.visited, VisitedRecord):
+            return self.visited.visit(self.op, var, pruned_axis)
         key = "_".join([str(self.op.idx()), var.name()])
         key = "_".join([key, self.op.all_inputs()[0].name()])
         if pruned_axis not in self.visited:
@@ -108,10 +194,12 @@ class PruneWorker(object):
         if var.name() in self.skip_vars:
             raise UnsupportOpError("Variable {} was skipped.".format(var.name(
             )))
-        pre_ops = var.inputs()
+        if isinstance(self.visited, VisitedRecord):
+            pre_ops, next_ops = self.visited.adjacent_ops(var)
+        else:
+            pre_ops, next_ops = var.inputs(), var.outputs()
         for op in pre_ops:
             self._prune_op(op, var, axis, transforms)
-        next_ops = var.outputs()
         for op in next_ops:
             self._prune_op(op, var, axis, transforms)
 
@@ -141,8 +229,13 @@ class PruneWorker(object):
         _logger.debug(
             f"visit {op.type()} by var [{var.name()}] on axis [{pruned_axis}];\t visited={self.visited}\n"
         )
-        worker = cls(op, self.pruned_params, self.visited, self.skip_stranger)
-        worker.skip_vars = self.skip_vars
+        if isinstance(self.visited, VisitedRecord):
+            worker = self.visited.worker(cls, op, self.pruned_params,
+                                         self.skip_stranger, self.skip_vars)
+        else:
+            worker = cls(op, self.pruned_params, self.visited,
+                         self.skip_stranger)
+            worker.skip_vars = self.skip_vars
         worker.prune(var, pruned_axis, pruned_idx)
 
     def append_pruned_vars(self, var, axis, transforms):
@@ -15,30 +15,118 @@
 import logging
 import sys
 import copy
+import zlib
+import hashlib
 import numpy as np
 from functools import reduce
 from ..core import VarWrapper, OpWrapper, GraphWrapper
+from .collections import PruningDetails, PruningCollection, PruningCollections
 from .collections import StaticPruningCollections
 from .criterion import CRITERION
 from .idx_selector import IDX_SELECTOR
-from ..common import get_logger
+from ..common import get_logger, tracer, traced
 
 __all__ = ["Pruner"]
 
 _logger = get_logger(__name__, level=logging.INFO)
 
 
+class _ScopeValues(object):
+    """The values of variables in scope, which are copied to host on first
+    access and shared by all the collections in one pruning."""
+
+    def __init__(self, scope):
+        self._scope = scope
+        self._values = {}
+        self.accessed = set()
+
+    def __contains__(self, name):
+        return name in self._values or self._scope.find_var(name) is not None
+
+    def __getitem__(self, name):
+        if name not in self._values:
+            var = self._scope.find_var(name)
+            if var is None:
+                raise KeyError(name)
+            self._values[name] = np.array(var.get_tensor())
+        self.accessed.add(name)
+        return self._values[name]
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+
+def _fingerprint(value):
+    return (value.shape, str(value.dtype),
+            zlib.crc32(np.ascontiguousarray(value)))
+
+
+def _graph_signature(graph):
+    """The signature of the structure and variable shapes of graph."""
+    ops = [(op.type(), [v.name() for v in op.all_inputs()],
+            [v.name() for v in op.all_outputs()], op.attr("groups"))
+           for op in graph.ops()]
+    shapes = [(v.name(), v.shape()) for v in graph.vars()]
+    return hashlib.md5(str((ops, shapes)).encode("utf8")).hexdigest()
+
+
+def _unbind_collections(collections, graph):
+    """Get the graph-independent description of collections, in which the
+    operators are recorded by their positions in the blocks of graph."""
+    positions = {}
+    for block in graph.program.blocks:
+        for i, op in enumerate(block.ops):
+            positions[id(op)] = (block.idx, i)
+    ret = []
+    for _collection in collections:
+        details = [(_detail.name, _detail.axis, _detail.transform,
+                    None if _detail.op is None else
+                    positions[id(_detail.op._op)], _detail.is_parameter)
+                   for _detail in _collection.all_pruning_details()]
+        ret.append((dict(_collection.master), details))
+    return ret
+
+
+def _bind_collections(unbound, graph):
+    """Create the collections of graph from the description returned by
+    ``_unbind_collections``, so that the variables and operators are those
+    of the current graph."""
+    collections = PruningCollections()
+    collections._collections = []
+    for master, details in unbound:
+        _collection = PruningCollection(master=master)
+        for name, axis, transform, position, is_parameter in details:
+            op = None
+            if position is not None:
+                block_idx, op_idx = position
+                op = OpWrapper(graph.program.blocks[block_idx].ops[op_idx],
+                               graph)
+            _collection.add(
+                PruningDetails(
+                    graph.var(name), axis, transform, op,
+                    is_parameter=is_parameter))
+        collections._collections.append(_collection)
+    return collections
+
+
 class Pruner():
     """The pruner used to prune channels of convolution.
 
     Args:
         criterion(str|function): the criterion used to sort channels for pruning.
         idx_selector(str|function): 
+        cache(bool): Whether to cache the pruning collections of graphs and the scores of collections
+                     across calls of ``prune``. The scores of a collection are computed again only when
+                     the values used by the criterion are changed. Default: True.
 
     """
 
-    def __init__(self, criterion="l1_norm",
-                 idx_selector="default_idx_selector"):
+    _MAX_CACHED_GRAPHS = 16
+
+    def __init__(self,
+                 criterion="l1_norm",
+                 idx_selector="default_idx_selector",
+                 cache=True):
         if isinstance(criterion, str):
             self.criterion = CRITERION.get(criterion)
         else:
@@ -49,7 +137,44 @@ class Pruner():
             self.idx_selector = idx_selector
 
         self.pruned_weights = False
+        self.cache = cache
+        # {(graph signature, params): collections unbound from graph}
+        self._collections_cache = {}
+        # {(master name, master axis, variables): (fingerprints, scores)}
+        self._scores_cache = {}
 
+    def _get_collections(self, params, graph):
+        if not self.cache:
+            return StaticPruningCollections(params, graph)
+        key = (_graph_signature(graph), tuple(params))
+        if key in self._collections_cache:
+            # The graph of cached collections may be changed by pruning, so
+            # the collections are bound to the current graph.
+            return _bind_collections(self._collections_cache[key], graph)
+        if len(self._collections_cache) >= self._MAX_CACHED_GRAPHS:
+            self._collections_cache.pop(next(iter(self._collections_cache)))
+        collections = StaticPruningCollections(params, graph)
+        self._collections_cache[key] = _unbind_collections(collections, graph)
+        return collections
+
+    def _score(self, collection, values, graph):
+        if not self.cache:
+            return self.criterion(collection, values, graph)
+        key = (collection.master["name"], collection.master["axis"],
+               tuple(sorted(collection.variables())))
+        if key in self._scores_cache:
+            fingerprints, scores = self._scores_cache[key]
+            if all(name in values and _fingerprint(values[name]) == fp
+                   for name, fp in fingerprints.items()):
+                return scores
+        values.accessed = set()
+        scores = self.criterion(collection, values, graph)
+        fingerprints = dict((name, _fingerprint(values[name]))
+                            for name in values.accessed)
+        self._scores_cache[key] = (fingerprints, scores)
+        return scores
+
+    @traced('Pruner.prune', phase='prune')
     def prune(self,
               program,
               scope,
@@ -85,18 +210,13 @@ class Pruner():
         param_shape_backup = {} if param_shape_backup else None
 
         pruned_params = []
-        collections = StaticPruningCollections(params, graph)
+        with tracer.span('create_pruning_collections', 'graph_walk'):
+            collections = self._get_collections(params, graph)
         ratios = dict(zip(params, ratios))
-        values = {}
-        for _collection in collections:
-            for _var_name in _collection.variables():
-                var = scope.find_var(_var_name)
-                if var is not None:
-                    value = np.array(var.get_tensor())
-                    values[_var_name] = value
+        values = _ScopeValues(scope)
 
         for _collection in collections:
-            scores = self.criterion(_collection, values, graph)
+            scores = self._score(_collection, values, graph)
             idx = self.idx_selector(_collection, scores,
                                     ratios)  # name, axis, idx, transform
             idx = self._transform(idx)
@@ -150,19 +270,29 @@ class Pruner():
                         param_backup[param.name()] = copy.deepcopy(
                             np.array(param_t))
                     try:
-                        pruned_param = self._prune_tensor(
-                            np.array(param_t),
-                            pruned_idx,
-                            pruned_axis=pruned_axis,
-                            lazy=lazy)
-                        param_t.set(pruned_param, place)
+                        with tracer.span(
+                                'prune_tensor',
+                                'tensor_copy',
+                                param=param.name()):
+                            pruned_param = self._prune_tensor(
+                                np.array(param_t),
+                                pruned_idx,
+                                pruned_axis=pruned_axis,
+                                lazy=lazy)
+                            param_t.set(pruned_param, place)
+                        tracer.counter('pruned_tensor_bytes',
+                                       pruned_param.nbytes)
                     except IndexError as e:
                         _logger.error(
                             "Pruning {} with shape {} on axis {}, but get [{}]; ".
                             format(param.name(),
                                    param_t.shape(), pruned_axis, e))
 
-        graph.infer_shape()
+        with tracer.span('infer_shape', 'graph_walk'):
+            graph.infer_shape()
+        if tracer.enabled and param_backup is not None:
+            tracer.gauge('param_backup_bytes',
+                         sum(value.nbytes for value in param_backup.values()))
         self.pruned_weights = (not only_graph)
         return graph.program, param_backup, param_shape_backup
 
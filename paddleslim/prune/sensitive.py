@@ -19,7 +19,7 @@ import pickle
 import numpy as np
 import paddle
 from ..core import GraphWrapper
-from ..common import get_logger
+from ..common import get_logger, tracer, traced
 from ..analysis import flops
 from ..prune import Pruner
 
@@ -30,6 +30,7 @@ __all__ = [
 ]
 
 
+@traced('sensitivity', phase='sensitivity')
 def sensitivity(program,
                 place,
                 param_names,
@@ -78,18 +79,19 @@ def sensitivity(program,
         if name not in sensitivities:
             sensitivities[name] = {}
     baseline = None
+    pruner = Pruner(criterion=criterion)
     for name in sensitivities:
         for ratio in pruned_ratios:
             if ratio in sensitivities[name]:
                 _logger.debug('{}, {} has computed.'.format(name, ratio))
                 continue
             if baseline is None:
-                if eval_args is None:
-                    baseline = eval_func(graph.program)
-                else:
-                    baseline = eval_func(eval_args)
+                with tracer.span('eval_baseline', 'eval'):
+                    if eval_args is None:
+                        baseline = eval_func(graph.program)
+                    else:
+                        baseline = eval_func(eval_args)
 
-            pruner = Pruner(criterion=criterion)
             _logger.info("sensitive - param: {}; ratios: {}".format(name,
                                                                     ratio))
             pruned_program, param_backup, _ = pruner.prune(
@@ -101,21 +103,28 @@ def sensitivity(program,
                 lazy=False,
                 only_graph=False,
                 param_backup=True)
-            if eval_args is None:
-                pruned_metric = eval_func(pruned_program)
-            else:
-                pruned_metric = eval_func(eval_args)
+            with tracer.span(
+                    'eval_pruned', 'eval', param=name, ratio=ratio):
+                if eval_args is None:
+                    pruned_metric = eval_func(pruned_program)
+                else:
+                    pruned_metric = eval_func(eval_args)
             loss = (baseline - pruned_metric) / baseline
             _logger.info("pruned param: {}; {}; loss={}".format(name, ratio,
                                                                 loss))
             sensitivities[name][ratio] = loss
 
-            _save_sensitivities(sensitivities, sensitivities_file)
+            with tracer.span('save_sensitivities', 'io'):
+                _save_sensitivities(sensitivities, sensitivities_file)
+            if tracer.enabled:
+                tracer.gauge('sensitivities_file_bytes',
+                             os.path.getsize(sensitivities_file))
 
             # restore pruned parameters
-            for param_name in param_backup.keys():
-                param_t = scope.find_var(param_name).get_tensor()
-                param_t.set(param_backup[param_name], place)
+            with tracer.span('restore_params', 'tensor_copy'):
+                for param_name in param_backup.keys():
+                    param_t = scope.find_var(param_name).get_tensor()
+                    param_t.set(param_backup[param_name], place)
     return sensitivities
 
 
@@ -0,0 +1,187 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import numpy as np
+from ..common import get_logger
+
+__all__ = [
+    'save_sparse_checkpoint', 'load_sparse_checkpoint', 'SparseCheckpoint'
+]
+
+_logger = get_logger(__name__, level=logging.INFO)
+
+_META_KEY = '__meta__'
+SPARSE_FORMATS = ['bitmap', 'csr']
+
+
+def _encode(value, fmt):
+    """Encode a dense array to the arrays of the given sparse format."""
+    if fmt == 'bitmap':
+        flat = value.ravel()
+        nonzero = flat != 0
+        return {'bitmap': np.packbits(nonzero), 'values': flat[nonzero]}
+    # CSR of the 2-D view [shape[0], -1], the column indices are stored
+    # in the narrowest unsigned type.
+    matrix = value.reshape([value.shape[0], -1]) if value.ndim > 0 else \
+        value.reshape([1, 1])
+    rows, cols = np.nonzero(matrix)
+    indptr_dtype = 'int32' if len(rows) < 2**31 else 'int64'
+    indptr = np.zeros(matrix.shape[0] + 1, dtype=indptr_dtype)
+    np.cumsum(np.bincount(rows, minlength=matrix.shape[0]), out=indptr[1:])
+    index_dtype = 'uint16' if matrix.shape[1] <= 65536 else 'uint32'
+    return {
+        'indptr': indptr,
+        'indices': cols.astype(index_dtype),
+        'values': matrix[rows, cols]
+    }
+
+
+def _decode(arrays, info):
+    """Decode the arrays of a sparse format to a dense array."""
+    shape = tuple(info['shape'])
+    size = int(np.prod(shape))
+    dense = np.zeros(size, dtype=info['dtype'])
+    if info['format'] == 'bitmap':
+        nonzero = np.unpackbits(arrays['bitmap'], count=size).astype('bool')
+        dense[nonzero] = arrays['values']
+        return dense.reshape(shape)
+    indptr = arrays['indptr'].astype('int64')
+    num_rows = len(indptr) - 1
+    num_cols = size // num_rows if num_rows > 0 else 0
+    rows = np.repeat(np.arange(num_rows), np.diff(indptr))
+    dense[rows * num_cols + arrays['indices'].astype('int64')] = arrays[
+        'values']
+    return dense.reshape(shape)
+
+
+def save_sparse_checkpoint(params, path, format='bitmap', min_sparsity=0.5):
+    """Save parameters into a compressed sparse checkpoint. The pruned weights
+    are stored in a sparse format, so a 90%-sparse float32 checkpoint is about
+    13% (bitmap) to 15% (csr) as large as the dense one.
+
+    Args:
+        params(dict): The mapping from parameter name to its numpy value.
+        path(str): The path of the checkpoint. The suffix '.npz' is added if
+                   it is missing.
+        format(str): The sparse format, must be 'bitmap' or 'csr'. 'bitmap'
+                   stores one bit for each element and the non-zero values.
+                   'csr' stores the non-zero values and their column indices
+                   of each row, where the parameter is viewed as a matrix
+                   with shape [shape[0], -1]. Default: 'bitmap'.
+        min_sparsity(float): The parameters whose sparsity is lower than it
+                   are stored densely. Default: 0.5.
+
+    Returns:
+        str: The path of the saved checkpoint.
+    """
+    assert format in SPARSE_FORMATS, "format must be selected from {}, but got {}".format(
+        SPARSE_FORMATS, format)
+    if not path.endswith('.npz'):
+        path = path + '.npz'
+    arrays = {}
+    meta = {}
+    dense_bytes = 0
+    for i, (name, value) in enumerate(params.items()):
+        value = np.asarray(value)
+        dense_bytes += value.nbytes
+        sparsity = 1 - float(np.count_nonzero(value)) / max(value.size, 1)
+        info = {
+            'shape': list(value.shape),
+            'dtype': str(value.dtype),
+            'format': format if sparsity >= min_sparsity else 'dense',
+            'key': 'param_{}'.format(i)
+        }
+        if info['format'] == 'dense':
+            encoded = {'values': value}
+        else:
+            encoded = _encode(value, format)
+        for key, array in encoded.items():
+            arrays['{}/{}'.format(info['key'], key)] = array
+        meta[name] = info
+    arrays[_META_KEY] = np.array(json.dumps(meta))
+    # Not compressed, so that np.load can read each array lazily.
+    np.savez(path, **arrays)
+    sparse_bytes = sum(
+        [array.nbytes for key, array in arrays.items() if key != _META_KEY])
+    _logger.info("Saved sparse checkpoint to {}: {} bytes -> {} bytes.".format(
+        path, dense_bytes, sparse_bytes))
+    return path
+
+
+class SparseCheckpoint(object):
+    """A checkpoint saved by ``save_sparse_checkpoint``. Parameters are
+    decoded to dense numpy arrays lazily when they are accessed by name, and
+    the arrays of other parameters are not read from disk.
+
+    Args:
+        path(str): The path of the checkpoint.
+    """
+
+    def __init__(self, path):
+        if not path.endswith('.npz'):
+            path = path + '.npz'
+        self._file = np.load(path)
+        self._meta = json.loads(str(self._file[_META_KEY]))
+
+    def keys(self):
+        return list(self._meta.keys())
+
+    def __contains__(self, name):
+        return name in self._meta
+
+    def __len__(self):
+        return len(self._meta)
+
+    def __iter__(self):
+        return iter(self._meta)
+
+    def __getitem__(self, name):
+        info = self._meta[name]
+        if info['format'] == 'dense':
+            return self._file['{}/values'.format(info['key'])]
+        prefix = info['key'] + '/'
+        arrays = {
+            key[len(prefix):]: self._file[key]
+            for key in self._file.files if key.startswith(prefix)
+        }
+        return _decode(arrays, info)
+
+    def items(self):
+        for name in self._meta:
+            yield name, self[name]
+
+    def to_dict(self):
+        """Decode all parameters.
+
+        Returns:
+            dict: The mapping from parameter name to its dense numpy value.
+        """
+        return dict(self.items())
+
+    def close(self):
+        self._file.close()
+
+
+def load_sparse_checkpoint(path):
+    """Load a checkpoint saved by ``save_sparse_checkpoint``.
+
+    Args:
+        path(str): The path of the checkpoint.
+
+    Returns:
+        SparseCheckpoint: The checkpoint which decodes parameters lazily.
+    """
+    return SparseCheckpoint(path)
@@ -0,0 +1,110 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+import numpy as np
+
+__all__ = ['parse_sparse_pattern', 'pattern_scores']
+
+
+def parse_sparse_pattern(sparse_pattern):
+    """
+    Parse the sparse pattern of unstructured pruning.
+
+    Args:
+      - sparse_pattern(str|None): None or 'element' means element-wise sparsity. 'N:M', such as '2:4', means
+        at most N weights are kept in every M consecutive weights along the input channel. 'KxK', such as '4x4',
+        means the weights are pruned in KxK blocks of the weight matrix.
+    Returns:
+      - pattern(tuple): ('element', None), ('nm', (n, m)) or ('block', (kh, kw)).
+    """
+    if sparse_pattern is None or sparse_pattern == 'element':
+        return ('element', None)
+    match = re.match(r'^(\d+):(\d+)$', sparse_pattern)
+    if match:
+        n, m = int(match.group(1)), int(match.group(2))
+        assert 0 < n < m, "N must be in range (0, M) in N:M pattern, but got {}".format(
+            sparse_pattern)
+        return ('nm', (n, m))
+    match = re.match(r'^(\d+)x(\d+)$', sparse_pattern)
+    if match:
+        kh, kw = int(match.group(1)), int(match.group(2))
+        assert kh > 0 and kw > 0, "The block size must be positive, but got {}".format(
+            sparse_pattern)
+        return ('block', (kh, kw))
+    raise ValueError(
+        "sparse_pattern must be None, 'element', 'N:M' or 'KxK', but got {}".
+        format(sparse_pattern))
+
+
+def _input_axis(value):
+    # The weights of conv are in [out, in, kh, kw] while the weights of fc
+    # are in [in, out].
+    return 1 if value.ndim == 4 else 0
+
+
+def _nm_scores(value, n, m):
+    axis = _input_axis(value)
+    if value.ndim == 0 or value.shape[axis] % m != 0:
+        # Keep the params that can not be divided into groups.
+        return np.full(value.shape, np.inf, dtype=value.dtype)
+    # Move the input channel to the last axis, and split it into groups of m.
+    moved = np.moveaxis(np.abs(value), axis, -1)
+    groups = moved.reshape([-1, m])
+    scores = groups.copy()
+    # The n largest weights of each group are never pruned.
+    keep = np.argpartition(groups, m - n, axis=1)[:, m - n:]
+    np.put_along_axis(scores, keep, np.inf, axis=1)
+    return np.moveaxis(scores.reshape(moved.shape), -1, axis)
+
+
+def _block_scores(value, kh, kw):
+    if value.ndim == 0:
+        return np.abs(value)
+    # Conv1x1 weights [out, in, 1, 1] and fc weights [in, out] are viewed as
+    # matrices, other weights are flattened into [shape[0], -1].
+    matrix = np.abs(value).reshape([value.shape[0], -1])
+    rows, cols = matrix.shape
+    pad_rows, pad_cols = -rows % kh, -cols % kw
+    if pad_rows or pad_cols:
+        matrix = np.pad(matrix, ((0, pad_rows), (0, pad_cols)))
+    blocks = matrix.reshape([matrix.shape[0] // kh, kh, -1, kw])
+    block_scores = blocks.mean(axis=(1, 3), keepdims=True)
+    scores = np.broadcast_to(block_scores, blocks.shape).reshape(matrix.shape)
+    return scores[:rows, :cols].reshape(value.shape).astype(value.dtype)
+
+
+def pattern_scores(value, pattern):
+    """
+    Get the importance scores of weights under the sparse pattern. The weights whose scores are
+    smaller than the threshold are pruned, so the masks follow the pattern whatever the threshold is.
+
+    - element: the absolute values of weights.
+    - nm: the absolute values of weights, except that the N largest weights of every M consecutive weights
+      along the input channel get inf. So at most M-N weights of each group are pruned, and the
+      weights are exactly N:M sparse when the ratio reaches 1-N/M.
+    - block: the mean absolute value of the KxK block each weight belongs to.
+
+    Args:
+      - value(numpy.ndarray): The weights.
+      - pattern(tuple): The pattern returned by parse_sparse_pattern.
+    Returns:
+      - scores(numpy.ndarray): The scores with the same shape as value.
+    """
+    kind, config = pattern
+    if kind == 'element':
+        return np.abs(value)
+    elif kind == 'nm':
+        return _nm_scores(value, *config)
+    return _block_scores(value, *config)
@@ -1,6 +1,8 @@
 import numpy as np
 from ..common import get_logger
 from ..core import GraphWrapper
+from .sparse_checkpoint import save_sparse_checkpoint
+from .sparse_pattern import parse_sparse_pattern, pattern_scores
 import paddle
 import copy
 
@@ -21,6 +23,8 @@ class UnstructuredPruner():
       - prune_params_type(str): The argument to control which type of ops will be pruned. Currently we only support None (all but norms) or conv1x1_only as input. It acts as a straightforward call to conv1x1 pruning.  Default: None
       - skip_params_func(function): The function used to select the parameters which should be skipped when performing pruning. Default: normalization-related params. Default: None
       - local_sparsity(bool): Whether to enable local sparsity. Local sparsity means all the weight matrices have the same sparsity. And the global sparsity only ensures the whole model's sparsity is equal to the passed-in 'ratio'. Default: False
+      - update_interval(int): The threshold is updated every 'update_interval' calls of step() in ratio mode, and the masks are updated by the latest threshold in the other steps. Default: 1
+      - sparse_pattern(str|None): The pattern of sparsity. None means element-wise sparsity. 'N:M', such as '2:4', means at most N weights are kept in every M consecutive weights along the input channel, and the weights are exactly N:M sparse once the ratio reaches 1-N/M. 'KxK', such as '4x4', means the weights are pruned in KxK blocks by the mean absolute values of blocks. Default: None
     """
 
     def __init__(self,
@@ -32,12 +36,19 @@ class UnstructuredPruner():
                  place=None,
                  prune_params_type=None,
                  skip_params_func=None,
-                 local_sparsity=False):
+                 local_sparsity=False,
+                 update_interval=1,
+                 sparse_pattern=None):
         self.mode = mode
         self.ratio = ratio
         self.threshold = threshold
         self.local_sparsity = local_sparsity
         self.thresholds = {}
+        self.update_interval = update_interval
+        self._step_count = 0
+        # The buffer of absolute values reused by update_threshold.
+        self._abs_buffer = None
+        self._pattern = parse_sparse_pattern(sparse_pattern)
         assert self.mode in [
             'ratio', 'threshold'
         ], "mode must be selected from 'ratio' and 'threshold'"
@@ -69,13 +80,27 @@ class UnstructuredPruner():
         """
         block = program.global_block()
         for param, mask in zip(parameters, masks):
+            # The masks are stored in bool, and casted to the dtype of params
+            # into a temporary variable before multiplying.
+            mask_cast = block.create_var(
+                name=mask.name + "_cast",
+                shape=param.shape,
+                dtype=param.dtype,
+                persistable=False,
+                stop_gradient=True)
             block._prepend_op(
                 type='elementwise_mul',
                 inputs={'X': param,
-                        'Y': mask},
+                        'Y': mask_cast},
                 outputs={'Out': param},
                 attrs={'axis': -1,
                        'use_mkldnn': False})
+            block._prepend_op(
+                type='cast',
+                inputs={'X': mask},
+                outputs={'Out': mask_cast},
+                attrs={'in_dtype': mask.dtype,
+                       'out_dtype': param.dtype})
 
     def _apply_masks(self, program, mask_func):
         params = []
@@ -83,16 +108,19 @@ class UnstructuredPruner():
         self.no_grad_set = set()
 
         for param in program.all_parameters():
+            # Only the prunable params need masks.
+            if not self._should_prune_param(param.name):
+                continue
             mask = program.global_block().create_var(
                 name=param.name + "_mask",
                 shape=param.shape,
-                dtype=param.dtype,
+                dtype='bool',
                 type=param.type,
                 persistable=param.persistable,
                 stop_gradient=True)
 
             self.scope.var(param.name + "_mask").get_tensor().set(
-                np.ones(mask.shape).astype("float32"), self.place)
+                np.ones(mask.shape).astype("bool"), self.place)
             params.append(param)
             masks.append(mask)
             self.no_grad_set.add(param.name + "_mask")
@@ -127,7 +155,10 @@ class UnstructuredPruner():
                 np.array(paddle.static.global_scope().find_var(param.name)
                          .get_tensor()).flatten())
         data = np.concatenate(data, axis=0)
-        threshold = np.sort(np.abs(data))[max(0, int(ratio * len(data) - 1))]
+        data = np.abs(data)
+        index = max(0, int(ratio * len(data) - 1))
+        data.partition(index)
+        threshold = data[index]
         return threshold
 
     def sparse_by_layer(self, program):
@@ -155,30 +186,61 @@ class UnstructuredPruner():
         Update the threshold after each optimization step in RATIO mode.
         User should overwrite this method to define their own weight importance (Default is based on their absolute values).
         '''
-        params_flatten = []
+        values = []
         for param in self.masks:
             if not self._should_prune_param(param):
                 continue
             t_param = self.scope.find_var(param).get_tensor()
-            v_param = np.array(t_param)
-            if self.local_sparsity:
-                cur_threshold = self._partition_sort(v_param.flatten())
-                self.thresholds[param] = cur_threshold
+            values.append((param, np.array(t_param)))
+        if len(values) == 0:
+            return
+
+        total_len = sum([v_param.size for _, v_param in values])
+        dtype = values[0][1].dtype
+        if self._abs_buffer is None or self._abs_buffer.size != total_len or \
+                self._abs_buffer.dtype != dtype:
+            self._abs_buffer = np.empty(total_len, dtype=dtype)
+        offset = 0
+        for param, v_param in values:
+            abs_param = self._abs_buffer[offset:offset + v_param.size]
+            if self._pattern[0] == 'element':
+                np.abs(v_param.ravel(), out=abs_param)
             else:
-                params_flatten.append(v_param.flatten())
+                abs_param[:] = pattern_scores(v_param, self._pattern).ravel()
+            offset += v_param.size
+            if self.local_sparsity:
+                self.thresholds[param] = self._select_pattern_threshold(
+                    abs_param)
         if not self.local_sparsity:
-            params_flatten = np.concatenate(params_flatten, axis=0)
-            self.threshold = self._partition_sort(params_flatten)
+            self.threshold = self._select_pattern_threshold(self._abs_buffer)
+
+    def _select_pattern_threshold(self, scores):
+        if self._pattern[0] == 'nm':
+            n, m = self._pattern[1]
+            # Prune all the candidates to get exact N:M sparsity.
+            if self.ratio >= 1 - float(n) / m: return np.inf
+        return self._select_threshold(scores)
 
     def _partition_sort(self, params):
-        total_len = len(params)
-        params_zeros = params[params == 0]
-        params_nonzeros = params[params != 0]
-        if len(params_nonzeros) == 0: return 0
-        new_ratio = max((self.ratio * total_len - len(params_zeros)),
-                        0) / len(params_nonzeros)
-        return np.sort(np.abs(params_nonzeros))[max(
-            0, int(new_ratio * len(params_nonzeros)) - 1)]
+        return self._select_threshold(np.abs(params))
+
+    def _select_threshold(self, abs_params):
+        """
+        Select the threshold from absolute values by np.partition in O(N)
+        instead of sorting all of them. The zeros are excluded when
+        computing the ratio of non-zero values. Note that abs_params
+        is partitioned in place.
+        """
+        total_len = len(abs_params)
+        len_nonzeros = np.count_nonzero(abs_params)
+        if len_nonzeros == 0: return 0
+        len_zeros = total_len - len_nonzeros
+        new_ratio = max((self.ratio * total_len - len_zeros),
+                        0) / len_nonzeros
+        # The zeros are the smallest, so the index in non-zeros is shifted by len_zeros.
+        index = len_zeros + max(0, int(new_ratio * len_nonzeros) - 1)
+        abs_params.partition(index)
+        return abs_params[index]
 
     def _update_masks(self):
         for param in self.masks:
@@ -188,11 +250,12 @@ class UnstructuredPruner():
             t_param = self.scope.find_var(param).get_tensor()
             t_mask = self.scope.find_var(mask_name).get_tensor()
             v_param = np.array(t_param)
+            scores = pattern_scores(v_param, self._pattern)
             if self.local_sparsity:
-                v_param[np.abs(v_param) < self.thresholds[param]] = 0
+                v_param[scores < self.thresholds[param]] = 0
             else:
-                v_param[np.abs(v_param) < self.threshold] = 0
-            v_mask = (v_param != 0).astype(v_param.dtype)
+                v_param[scores < self.threshold] = 0
+            v_mask = v_param != 0
             t_mask.set(v_mask, self.place)
 
     def set_static_masks(self):
@@ -203,7 +266,7 @@ class UnstructuredPruner():
             t_param = self.scope.find_var(param).get_tensor()
             t_mask = self.scope.find_var(mask_name).get_tensor()
             v_param = np.array(t_param)
-            v_mask = (v_param != 0).astype(v_param.dtype)
+            v_mask = v_param != 0
             t_mask.set(v_mask, self.place)
 
     def step(self):
@@ -213,8 +276,10 @@ class UnstructuredPruner():
         if self.mode == 'threshold':
             pass
         elif self.mode == 'ratio':
-            self.update_threshold()
+            if self._step_count % self.update_interval == 0:
+                self.update_threshold()
         self._update_masks()
+        self._step_count += 1
 
     def update_params(self):
         """
@@ -227,6 +292,28 @@ class UnstructuredPruner():
             v_param = np.array(t_param) * np.array(t_mask)
             t_param.set(v_param, self.place)
 
+    def export_sparse(self, program, path, format='bitmap', min_sparsity=0.5):
+        """
+        Save the masked parameters of the program into a compressed sparse checkpoint.
+        It can be loaded back to dense values lazily by paddleslim.prune.load_sparse_checkpoint.
+
+        Args:
+          - program(paddle.static.Program): The model which have all the parameters.
+          - path(str): The path of the checkpoint.
+          - format(str): The sparse format, must be selected from 'bitmap' and 'csr'. Default: 'bitmap'.
+          - min_sparsity(float): The parameters whose sparsity is lower than it are stored densely. Default: 0.5.
+        Returns:
+          - path(str): The path of the saved checkpoint.
+        """
+        params = {}
+        for param in program.all_parameters():
+            v_param = np.array(self.scope.find_var(param.name).get_tensor())
+            if param.name in self.masks:
+                t_mask = self.scope.find_var(self.masks[param.name]).get_tensor()
+                v_param = v_param * np.array(t_mask)
+            params[param.name] = v_param
+        return save_sparse_checkpoint(params, path, format, min_sparsity)
+
     @staticmethod
     def total_sparse(program):
         """
@@ -334,6 +421,7 @@ class GMPUnstructuredPruner(UnstructuredPruner):
                {'initial_ratio': float} # the initial ratio value
         
         ..
+      - sparse_pattern(str|None): The pattern of sparsity, the same as that of UnstructuredPruner. Default: None
     """
 
     def __init__(self,
@@ -344,12 +432,21 @@ class GMPUnstructuredPruner(UnstructuredPruner):
                  prune_params_type=None,
                  skip_params_func=None,
                  local_sparsity=False,
-                 configs=None):
+                 configs=None,
+                 sparse_pattern=None):
         assert configs is not None, "Please pass in a valid config dictionary."
 
         super(GMPUnstructuredPruner, self).__init__(
-            program, 'ratio', ratio, 0.0, scope, place, prune_params_type,
-            skip_params_func, local_sparsity)
+            program,
+            'ratio',
+            ratio,
+            0.0,
+            scope,
+            place,
+            prune_params_type,
+            skip_params_func,
+            local_sparsity,
+            sparse_pattern=sparse_pattern)
         self.stable_iterations = configs.get('stable_iterations')
         self.pruning_iterations = configs.get('pruning_iterations')
         self.tunning_iterations = configs.get('tunning_iterations')
@@ -32,6 +32,9 @@ try:
     from .quanter import quant_aware, convert, quant_post_static, quant_post_dynamic
     from .quanter import quant_post, quant_post_only_weight
     from .quant_aware_with_infermodel import quant_aware_with_infermodel, export_quant_infermodel
+    from .mixed_precision import quant_bits_sensitivity, weight_size_costs, latency_costs, search_quant_bits
+    from .quant_evaluator import QuantEvaluator
+    from .sensitive import quant_sensitivity, get_skip_weights
     from .quant_post_hpo import quant_post_hpo
 except Exception as e:
     _logger.warning(e)
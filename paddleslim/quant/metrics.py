@@ -0,0 +1,68 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The metrics of the differences between float and quantized model outputs."""
+
+import math
+import numpy as np
+from scipy.stats import wasserstein_distance
+
+__all__ = [
+    'standardization', 'cal_emd_lose', 'have_invalid_num',
+    'convert_model_out_2_nparr'
+]
+
+
+def standardization(data):
+    """standardization numpy array"""
+    mu = np.mean(data, axis=0)
+    sigma = np.std(data, axis=0)
+    return (data - mu) / sigma
+
+
+def cal_emd_lose(out_float_list, out_quant_list, out_len):
+    """caculate earch move distance"""
+    emd_sum = 0
+    if out_len >= 3:
+        for index in range(len(out_float_list)):
+            emd_sum += wasserstein_distance(out_float_list[index],
+                                            out_quant_list[index])
+    else:
+        out_float = np.concatenate(out_float_list)
+        out_quant = np.concatenate(out_quant_list)
+        emd_sum += wasserstein_distance(out_float, out_quant)
+    emd_sum /= float(len(out_float_list))
+    return emd_sum
+
+
+def have_invalid_num(np_arr):
+    """check have invalid number in numpy array"""
+    have_invalid_num = False
+    for val in np_arr:
+        if math.isnan(val) or math.isinf(val):
+            have_invalid_num = True
+            break
+    return have_invalid_num
+
+
+def convert_model_out_2_nparr(model_out):
+    """convert model output to numpy array"""
+    if not isinstance(model_out, list):
+        model_out = [model_out]
+    out_list = []
+    for out in model_out:
+        out_list.append(np.array(out))
+
+    out_nparr = np.concatenate(out_list)
+    out_nparr = np.squeeze(out_nparr.flatten())
+    return out_nparr
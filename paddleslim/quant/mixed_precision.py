@@ -0,0 +1,320 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Search the quantization bits of each weight under a budget."""
+
+import logging
+import numpy as np
+import paddle
+import paddle.fluid as fluid
+from ..core import GraphWrapper
+from ..common import get_logger
+
+_logger = get_logger(__name__, level=logging.INFO)
+
+__all__ = [
+    'quant_bits_sensitivity', 'weight_size_costs', 'latency_costs',
+    'search_quant_bits'
+]
+
+# The weights of these ops are quantized on dimension 1.
+_CHANNEL_AXIS1_OPS = ['mul', 'matmul', 'matmul_v2', 'conv2d_transpose']
+
+
+def _weight_ops(graph, quantizable_op_type):
+    """Returns the quantizable ops and their weights."""
+    op_weights = []
+    for op in graph.ops():
+        if op.type() not in quantizable_op_type:
+            continue
+        for var in op.all_inputs():
+            if graph.is_persistable(var):
+                op_weights.append((op, var))
+                break
+    return op_weights
+
+
+def _quant_dequant(weight, bits, quant_axis=None):
+    """Simulate abs_max quantization of weight, per channel on quant_axis
+    if it is not None."""
+    bnt = (1 << (bits - 1)) - 1
+    if quant_axis is None:
+        scale = np.abs(weight).max()
+    else:
+        axes = tuple(i for i in range(weight.ndim) if i != quant_axis)
+        scale = np.abs(weight).max(axis=axes, keepdims=True)
+    scale = np.maximum(scale, 1e-8)
+    return (np.round(weight / scale * bnt) * scale / bnt).astype(weight.dtype)
+
+
+def _calibration_batches(program, feed_names, place, batch_generator,
+                         sample_generator, data_loader, batch_size,
+                         batch_nums):
+    """Read the calibration batches in the same way as quant_post_static."""
+    if data_loader is None:
+        feed_vars = [program.global_block().var(name) for name in feed_names]
+        data_loader = paddle.io.DataLoader.from_generator(
+            feed_list=feed_vars, capacity=3 * batch_size, iterable=True)
+        if sample_generator is not None:
+            data_loader.set_sample_generator(
+                sample_generator,
+                batch_size=batch_size,
+                drop_last=True,
+                places=place)
+        elif batch_generator is not None:
+            data_loader.set_batch_generator(batch_generator, places=place)
+    batches = []
+    for data in data_loader():
+        batches.append(data)
+        if batch_nums is not None and len(batches) >= batch_nums:
+            break
+    return batches
+
+
+def _output_loss(out_float, out_quant):
+    """The squared error of outputs relative to the squared norm of
+    the float outputs."""
+    loss = 0.
+    for f, q in zip(out_float, out_quant):
+        f = np.array(f, dtype='float64')
+        q = np.array(q, dtype='float64')
+        loss += np.sum((f - q)**2) / max(np.sum(f**2), 1e-12)
+    return loss / len(out_float)
+
+
+def quant_bits_sensitivity(
+        executor,
+        model_dir,
+        batch_generator=None,
+        sample_generator=None,
+        data_loader=None,
+        model_filename=None,
+        params_filename=None,
+        batch_size=16,
+        batch_nums=10,
+        scope=None,
+        quantizable_op_type=["conv2d", "depthwise_conv2d", "mul"],
+        weight_quantize_type='channel_wise_abs_max',
+        candidate_bits=[4, 8]):
+    """
+    Get the sensitivity of model outputs to the quantization bits of each
+    weight. The weight of one op is quantized and dequantized with each of
+    the candidate bits while the others keep float, and the loss is the
+    squared error of model outputs relative to the squared norm of float
+    outputs, averaged over the calibration batches.
+
+    Args:
+        executor(paddle.static.Executor): The executor to load and run the model.
+        model_dir(str): The path of fp32 inference model.
+        batch_generator(Python Generator): The batch generator provides calibrate data. Default: None.
+        sample_generator(Python Generator): The sample generator provides calibrate data. Default: None.
+        data_loader(Python Generator, Paddle.io.DataLoader, optional): The
+            Generator or Dataloader provides calibrate data. Default: None.
+        model_filename(str, optional): The name of model file. Default: None.
+        params_filename(str, optional): The name of params file. Default: None.
+        batch_size(int, optional): The batch size of DataLoader. Default: 16.
+        batch_nums(int, optional): The number of calibrate batches. None means
+            all the batches. Default: 10.
+        scope(paddle.static.Scope, optional): The scope to load the model in.
+            None means paddle.static.global_scope(). Default: None.
+        quantizable_op_type(list[str], optional): The types of ops whose weights
+            are quantized. Default: ["conv2d", "depthwise_conv2d", "mul"].
+        weight_quantize_type(str): 'abs_max' or 'channel_wise_abs_max'.
+            Default: 'channel_wise_abs_max'.
+        candidate_bits(list[int]): The candidate bits. Default: [4, 8].
+
+    Returns:
+        dict: The losses of weights in format ``{weight_name: {bits: loss}}``.
+    """
+    scope = paddle.static.global_scope() if scope is None else scope
+    place = executor.place
+    with paddle.static.scope_guard(scope):
+        [program, feed_names, fetch_targets] = fluid.io.load_inference_model(
+            dirname=model_dir,
+            executor=executor,
+            model_filename=model_filename,
+            params_filename=params_filename)
+    batches = _calibration_batches(program, feed_names, place,
+                                   batch_generator, sample_generator,
+                                   data_loader, batch_size, batch_nums)
+
+    def _run():
+        outputs = []
+        for data in batches:
+            outputs.append(
+                executor.run(program,
+                             feed=data,
+                             fetch_list=fetch_targets,
+                             scope=scope))
+        return outputs
+
+    out_float = _run()
+    graph = GraphWrapper(program)
+    sensitivity = {}
+    for op, var in _weight_ops(graph, quantizable_op_type):
+        name = var.name()
+        if name in sensitivity:
+            continue
+        quant_axis = None
+        if weight_quantize_type == 'channel_wise_abs_max':
+            quant_axis = 1 if op.type() in _CHANNEL_AXIS1_OPS else 0
+        tensor = scope.find_var(name).get_tensor()
+        weight = np.array(tensor)
+        sensitivity[name] = {}
+        try:
+            for bits in candidate_bits:
+                tensor.set(_quant_dequant(weight, bits, quant_axis), place)
+                out_quant = _run()
+                sensitivity[name][bits] = float(
+                    np.mean([
+                        _output_loss(f, q)
+                        for f, q in zip(out_float, out_quant)
+                    ]))
+        finally:
+            tensor.set(weight, place)
+        _logger.info("quant bits sensitivity of {}: {}".format(
+            name, sensitivity[name]))
+    return sensitivity
+
+
+def weight_size_costs(program, weight_names, candidate_bits=[4, 8]):
+    """
+    Get the storage size in bytes of weights with each of the candidate bits.
+    None means the weight is not quantized and stored in float32. ``convert``
+    saves the quantized weights in int8, so the weights with fewer than 8
+    bits cost as much as the 8-bit ones, and the 4-bit choices only change
+    the numerics of training.
+
+    Args:
+        program(paddle.static.Program): The program containing the weights.
+        weight_names(list[str]): The names of weights.
+        candidate_bits(list[int]): The candidate bits. Default: [4, 8].
+
+    Returns:
+        dict: The costs in format ``{weight_name: {bits: bytes}}``.
+    """
+    graph = GraphWrapper(program)
+    costs = {}
+    for name in weight_names:
+        numel = int(np.prod(graph.var(name).shape()))
+        costs[name] = {None: numel * 4.}
+        for bits in candidate_bits:
+            costs[name][bits] = numel * max(bits, 8) / 8.
+    return costs
+
+
+def _table_shape(var):
+    return [1 if dim < 0 else dim for dim in var.shape()]
+
+
+def _latency_key(op, data_type):
+    """The key of op in the latency table of TableLatencyPredictor."""
+    quant, bit_length = ('None', 'None') if data_type == 'fp32' else ('True',
+                                                                       8)
+    if 'conv2d' in op.type():
+        in_shape = _table_shape(op.inputs('Input')[0])
+        weight_shape = _table_shape(op.inputs('Filter')[0])
+        out_shape = _table_shape(op.outputs('Output')[0])
+        return f"{op.type()} in={in_shape} weight={weight_shape} out={out_shape} pad={op.attr('paddings')[1]} stride={op.attr('strides')[1]} group={op.attr('groups')} dilation={op.attr('dilations')[1]} quant={quant} bit_length={bit_length}"
+    X = _table_shape(op.inputs('X')[0])
+    Y = _table_shape(op.inputs('Y')[0])
+    out_shape = _table_shape(op.outputs('Out')[0])
+    return f"matmul X={X} Y={Y} out={out_shape} quant={quant} bit_length={bit_length}"
+
+
+def latency_costs(program,
+                  predictor,
+                  weight_names,
+                  candidate_bits=[4, 8]):
+    """
+    Get the latencies of the ops of weights with each of the candidate bits
+    from the tables of ``TableLatencyPredictor``. The ops with 8 or fewer
+    bits use the int8 latencies and the others use the fp32 latencies.
+
+    Args:
+        program(paddle.static.Program): The program containing the weights.
+        predictor(paddleslim.analysis.TableLatencyPredictor): The latency predictor.
+        weight_names(list[str]): The names of weights.
+        candidate_bits(list[int]): The candidate bits. Default: [4, 8].
+
+    Returns:
+        dict: The costs in format ``{weight_name: {bits: latency}}``.
+    """
+    graph = GraphWrapper(program)
+    weight_names = set(weight_names)
+    costs = {}
+    for op, var in _weight_ops(graph, [
+            'conv2d', 'depthwise_conv2d', 'mul', 'matmul', 'matmul_v2'
+    ]):
+        if var.name() not in weight_names or var.name() in costs:
+            continue
+        latency = {}
+        for data_type in ['fp32', 'int8']:
+            key = _latency_key(op, data_type)
+            if key in predictor.table_dict:
+                latency[data_type] = predictor.table_dict[key]
+            else:
+                op_type = 'matmul' if 'conv2d' not in op.type() else op.type()
+                latency[data_type] = predictor.op_predictor(op_type, key,
+                                                            data_type)
+        costs[var.name()] = {None: latency['fp32']}
+        for bits in candidate_bits:
+            costs[var.name()][bits] = latency['int8' if bits <= 8 else 'fp32']
+    return costs
+
+
+def search_quant_bits(sensitivity, costs, budget):
+    """
+    Assign quantization bits to weights so that the total cost is within
+    the budget. All weights start unquantized, and the weight whose
+    cheaper bits trade the least loss for each unit of cost saved is
+    changed until the budget is met.
+
+    Args:
+        sensitivity(dict): The losses returned by ``quant_bits_sensitivity``.
+        costs(dict): The costs returned by ``weight_size_costs`` or ``latency_costs``.
+            The weights not in costs are not quantized.
+        budget(float): The max total cost.
+
+    Returns:
+        dict: The bits of weights, None means not quantized. It can be used
+              as ``weight_bits_map`` in the config of ``quant_aware``.
+    """
+    choices = {}
+    for name in costs:
+        choices[name] = None
+    loss = lambda name, bits: 0. if bits is None else sensitivity[name][bits]
+    total_cost = sum(costs[name][None] for name in costs)
+    while total_cost > budget:
+        best = None
+        for name, bits in choices.items():
+            for new_bits, cost in costs[name].items():
+                saved = costs[name][bits] - cost
+                if new_bits is not None and new_bits not in sensitivity.get(
+                        name, {}):
+                    continue
+                if saved <= 0:
+                    continue
+                ratio = (loss(name, new_bits) - loss(name, bits)) / saved
+                if best is None or ratio < best[0]:
+                    best = (ratio, name, new_bits, saved)
+        if best is None:
+            _logger.warning(
+                "The budget {} can not be met, the min cost is {}.".format(
+                    budget, total_cost))
+            break
+        _, name, new_bits, saved = best
+        choices[name] = new_bits
+        total_cost -= saved
+    _logger.info("quant bits: {}, total cost: {}".format(choices, total_cost))
+    return choices
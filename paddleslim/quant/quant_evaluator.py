@@ -0,0 +1,143 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Evaluate the quantization aware training program without freezing it."""
+
+import logging
+import numpy as np
+import paddle
+from ..common import get_logger
+from .mixed_precision import _quant_dequant
+
+_logger = get_logger(__name__, level=logging.INFO)
+
+__all__ = ['QuantEvaluator']
+
+_WEIGHT_QUANT_OPS = [
+    'fake_quantize_abs_max', 'fake_channel_wise_quantize_abs_max'
+]
+_WEIGHT_DEQUANT_OPS = [
+    'fake_dequantize_max_abs', 'fake_channel_wise_dequantize_max_abs'
+]
+_WEIGHT_QUANT_DEQUANT_OPS = [
+    'fake_quantize_dequantize_abs_max',
+    'fake_channel_wise_quantize_dequantize_abs_max'
+]
+# The ops only collecting the scales of outputs, which are identities in test.
+_OUT_SCALE_OPS = ['moving_average_abs_max_scale']
+
+
+def _consumers(block, name):
+    return [op for op in block.ops if name in op.input_arg_names]
+
+
+class QuantEvaluator(object):
+    """
+    Evaluate the test program returned by ``quant_aware`` without running
+    ``convert``. The fake quantize and dequantize ops of weights are removed
+    from a copy of the program, and the ops read the quantized and
+    dequantized weights cached in scope instead. The cache is computed by
+    ``update`` once for each checkpoint, rather than in each batch. The fake
+    quantize ops of activations are kept, so the outputs are the same as the
+    test program.
+
+    Args:
+        program(paddle.static.Program): The test program returned by ``quant_aware``
+            with ``for_test=True``.
+        place(paddle.CPUPlace or paddle.CUDAPlace): The device place of weights.
+        scope(paddle.static.Scope, optional): The scope of weights. None means
+            ``paddle.static.global_scope()``. Default: None.
+
+    Examples:
+        .. code-block:: python
+
+            evaluator = QuantEvaluator(quant_eval_program, place)
+            for step in range(steps):
+                exe.run(quant_train_program, feed=feed, fetch_list=[loss])
+                if step % eval_steps == 0:
+                    evaluator.update()
+                    exe.run(evaluator.program, feed=eval_feed, fetch_list=[acc])
+    """
+
+    def __init__(self, program, place, scope=None):
+        self._place = place
+        self._scope = paddle.static.global_scope() if scope is None else scope
+        self.program = program.clone(for_test=True)
+        # [(weight name, cache name, bits, quant_axis)]
+        self._weights = []
+        self._strip_fake_ops()
+        self.update()
+
+    def _weight_quant(self, block, op):
+        """Returns the weight, bits, quant axis and the ops to be removed of
+        the fake quantize op of weight, or None if it is not one."""
+        if op.type not in _WEIGHT_QUANT_OPS + _WEIGHT_QUANT_DEQUANT_OPS:
+            return None
+        weight = op.input('X')[0]
+        var = self._scope.find_var(weight)
+        if var is None or not block.var(weight).persistable:
+            return None
+        bits = op.attr('bit_length')
+        quant_axis = None
+        if 'channel_wise' in op.type:
+            quant_axis = op.attr('quant_axis') if op.has_attr(
+                'quant_axis') else 0
+        if op.type in _WEIGHT_QUANT_DEQUANT_OPS:
+            return weight, bits, quant_axis, [op], op.output('Out')[0]
+        dequant_ops = _consumers(block, op.output('Out')[0])
+        if len(dequant_ops) != 1 or dequant_ops[
+                0].type not in _WEIGHT_DEQUANT_OPS:
+            return None
+        return weight, bits, quant_axis, [op, dequant_ops[0]
+                                          ], dequant_ops[0].output('Out')[0]
+
+    def _strip_fake_ops(self):
+        block = self.program.global_block()
+        removed = []
+        for op in list(block.ops):
+            if op.type in _OUT_SCALE_OPS:
+                if 'Out' in op.output_names and len(op.output('Out')) > 0:
+                    for consumer in _consumers(block, op.output('Out')[0]):
+                        consumer._rename_input(
+                            op.output('Out')[0], op.input('X')[0])
+                removed.append(op)
+                continue
+            quant = self._weight_quant(block, op)
+            if quant is None:
+                continue
+            weight, bits, quant_axis, ops, out = quant
+            cache = block.create_var(
+                name="{}.quant_eval".format(weight),
+                shape=block.var(weight).shape,
+                dtype=block.var(weight).dtype,
+                persistable=True)
+            for consumer in _consumers(block, out):
+                consumer._rename_input(out, cache.name)
+            removed.extend(ops)
+            self._weights.append((weight, cache.name, bits, quant_axis))
+        for op in removed:
+            block._remove_op(block.ops.index(op))
+        self.program._sync_with_cpp()
+        _logger.info("Removed {} fake ops, and cached {} weights.".format(
+            len(removed), len(self._weights)))
+
+    def update(self):
+        """
+        Quantize and dequantize the current weights in scope into the cache.
+        It should be called after the weights are changed, such as after
+        training or loading a checkpoint.
+        """
+        for weight, cache, bits, quant_axis in self._weights:
+            value = np.array(self._scope.find_var(weight).get_tensor())
+            self._scope.var(cache).get_tensor().set(
+                _quant_dequant(value, bits, quant_axis), self._place)
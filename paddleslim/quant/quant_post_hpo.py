@@ -16,7 +16,6 @@
 import os
 import cv2
 import sys
-import math
 import time
 import numpy as np
 import shutil
@@ -25,7 +24,6 @@ import paddle.fluid as fluid
 import logging
 import argparse
 import functools
-from scipy.stats import wasserstein_distance
 
 # smac
 from ConfigSpace.hyperparameters import CategoricalHyperparameter, \
@@ -36,6 +34,7 @@ from smac.scenario.scenario import Scenario
 
 from paddleslim.common import get_logger
 from paddleslim.quant import quant_post
+from paddleslim.quant.metrics import standardization, cal_emd_lose, have_invalid_num, convert_model_out_2_nparr
 
 
 class QuantConfig:
@@ -99,51 +98,6 @@ def make_feed_dict(feed_target_names, data):
     return feed_dict
 
 
-def standardization(data):
-    """standardization numpy array"""
-    mu = np.mean(data, axis=0)
-    sigma = np.std(data, axis=0)
-    return (data - mu) / sigma
-
-
-def cal_emd_lose(out_float_list, out_quant_list, out_len):
-    """caculate earch move distance"""
-    emd_sum = 0
-    if out_len >= 3:
-        for index in range(len(out_float_list)):
-            emd_sum += wasserstein_distance(out_float_list[index],
-                                            out_quant_list[index])
-    else:
-        out_float = np.concatenate(out_float_list)
-        out_quant = np.concatenate(out_quant_list)
-        emd_sum += wasserstein_distance(out_float, out_quant)
-    emd_sum /= float(len(out_float_list))
-    return emd_sum
-
-
-def have_invalid_num(np_arr):
-    """check have invalid number in numpy array"""
-    have_invalid_num = False
-    for val in np_arr:
-        if math.isnan(val) or math.isinf(val):
-            have_invalid_num = True
-            break
-    return have_invalid_num
-
-
-def convert_model_out_2_nparr(model_out):
-    """convert model output to numpy array"""
-    if not isinstance(model_out, list):
-        model_out = [model_out]
-    out_list = []
-    for out in model_out:
-        out_list.append(np.array(out))
-
-    out_nparr = np.concatenate(out_list)
-    out_nparr = np.squeeze(out_nparr.flatten())
-    return out_nparr
-
-
 def eval_quant_model():
     """Eval quant model accuracy.
        Post quantization does not change the parameter value. Therefore, the closer the output distribution of the quantization model and the float model, the better the accuracy is maintained, 
@@ -31,7 +31,7 @@ from paddle.fluid import core
 from paddle.fluid.contrib.slim.quantization import WeightQuantization
 from paddle.fluid.layer_helper import LayerHelper
 
-from ..common import get_logger
+from ..common import get_logger, tracer, traced
 _logger = get_logger(__name__, level=logging.INFO)
 
 WEIGHT_QUANTIZATION_TYPES = [
@@ -67,6 +67,9 @@ _quant_config_default = {
     'weight_bits': 8,
     # activation quantize bit num, default is 8
     'activation_bits': 8,
+    # weight quantize bit num of some weights, such as {'fc_0.w_0': 4}.
+    # The ops of weights mapped to None will not be quantized.
+    'weight_bits_map': {},
     # ops of name_scope in not_quant_pattern list, will not be quantized
     'not_quant_pattern': ['skip_quant'],
     # ops of type in quantize_op_types, will be quantized
@@ -135,6 +138,14 @@ def _parse_configs(user_config):
     assert (configs['weight_bits'] >= 1 and configs['weight_bits'] <= 16), \
         "weight_bits should be between 1 and 16."
 
+    assert isinstance(configs['weight_bits_map'], dict), \
+        "weight_bits_map must be a dict."
+
+    for name, bits in configs['weight_bits_map'].items():
+        # The weights are saved in int8 by convert.
+        assert bits is None or (isinstance(bits, int) and 1 <= bits <= 8), \
+            "weight bits of {} should be None or between 1 and 8.".format(name)
+
     assert isinstance(configs['activation_bits'], int), \
         "activation_bits must be int value."
 
@@ -175,6 +186,46 @@ def _parse_configs(user_config):
     return configs
 
 
+def _weight_names(op_node, weight_bits_map):
+    return [
+        var_node.name() for var_node in op_node.inputs
+        if var_node.name() in weight_bits_map
+    ]
+
+
+def _skip_unquantized_weights(graph, weight_bits_map, op_types):
+    """Mark the ops of weights mapped to None to be skipped by the
+    QuantizationTransformPass."""
+    for op_node in graph.all_op_nodes():
+        if op_node.name() not in op_types:
+            continue
+        for name in _weight_names(op_node, weight_bits_map):
+            if weight_bits_map[name] is None:
+                op_node.set_attr("skip_quant", True)
+
+
+def _set_weight_bits(graph, weight_bits_map):
+    """Change the bit length of the fake quantize ops of weights, and the
+    ranges of the following dequantize ops, according to weight_bits_map."""
+    for op_node in graph.all_op_nodes():
+        if not op_node.op().has_attr("bit_length"):
+            continue
+        names = _weight_names(op_node, weight_bits_map)
+        if len(names) == 0 or weight_bits_map[names[0]] is None:
+            continue
+        bits = weight_bits_map[names[0]]
+        op_node.set_attr("bit_length", bits)
+        for out_node in op_node.outputs:
+            for dequant_node in out_node.outputs:
+                if dequant_node.op().has_attr("quant_bits"):
+                    quant_bits = list(dequant_node.op().attr("quant_bits"))
+                    quant_bits[0] = bits
+                    dequant_node.set_attr("quant_bits", quant_bits)
+                elif dequant_node.op().has_attr("max_range"):
+                    dequant_node.set_attr("max_range",
+                                          float((1 << (bits - 1)) - 1))
+
+
 def quant_aware(program,
                 place,
                 config=None,
@@ -250,7 +301,10 @@ def quant_aware(program,
             transform_pass_ops.append(op_type)
         elif op_type in QUANT_DEQUANT_PASS_OP_TYPES:
             quant_dequant_ops.append(op_type)
+    weight_bits_map = config.get('weight_bits_map', {})
     if len(transform_pass_ops) > 0:
+        _skip_unquantized_weights(main_graph, weight_bits_map,
+                                  transform_pass_ops)
         transform_pass = QuantizationTransformPass(
             scope=scope,
             place=place,
@@ -270,6 +324,7 @@ def quant_aware(program,
             executor=executor)
 
         transform_pass.apply(main_graph)
+        _set_weight_bits(main_graph, weight_bits_map)
 
     if len(quant_dequant_ops) > 0:
         quant_dequant_pass = AddQuantDequantPass(
@@ -301,6 +356,7 @@ def quant_aware(program,
     return quant_program
 
 
+@traced('quant_post_static', phase='quant')
 def quant_post_static(
         executor,
         model_dir,
@@ -420,11 +476,13 @@ def quant_post_static(
         activation_quantize_type=activation_quantize_type,
         weight_quantize_type=weight_quantize_type,
         optimize_model=optimize_model)
-    post_training_quantization.quantize()
-    post_training_quantization.save_quantized_model(
-        quantize_model_path,
-        model_filename=save_model_filename,
-        params_filename=save_params_filename)
+    with tracer.span('calibrate', 'eval'):
+        post_training_quantization.quantize()
+    with tracer.span('save_quantized_model', 'io'):
+        post_training_quantization.save_quantized_model(
+            quantize_model_path,
+            model_filename=save_model_filename,
+            params_filename=save_params_filename)
 
 
 # We have changed the quant_post to quant_post_static.
@@ -475,12 +533,20 @@ def convert(program, place, config=None, scope=None, save_int8=False):
     out_scale_infer_pass = OutScaleForInferencePass(scope=scope)
     out_scale_infer_pass.apply(test_graph)
 
+    # The weights are frozen with one bit length, so the weights trained
+    # with fewer bits in 'weight_bits_map' are stored with the largest one,
+    # which is at most 8 as checked by _parse_configs.
+    weight_bits = max([config['weight_bits']] + [
+        bits for bits in config.get('weight_bits_map', {}).values()
+        if bits is not None
+    ])
+
     # Freeze the graph after training by adjusting the quantize
     # operators' order for the inference.
     freeze_pass = QuantizationFreezePass(
         scope=scope,
         place=place,
-        weight_bits=config['weight_bits'],
+        weight_bits=weight_bits,
         activation_bits=config['activation_bits'],
         weight_quantize_type=config['weight_quantize_type'])
 
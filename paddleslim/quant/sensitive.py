@@ -0,0 +1,353 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compute the sensitivities of model outputs to the quantization of each op."""
+
+import os
+import logging
+import pickle
+import multiprocessing
+import numpy as np
+import paddle
+import paddle.fluid as fluid
+from ..core import GraphWrapper, OpWrapper
+from ..common import get_logger
+from ..prune import load_sensitivities
+from .mixed_precision import _quant_dequant, _calibration_batches, _CHANNEL_AXIS1_OPS
+from .metrics import standardization, cal_emd_lose, have_invalid_num, convert_model_out_2_nparr
+
+_logger = get_logger(__name__, level=logging.INFO)
+
+__all__ = ['quant_sensitivity', 'get_skip_weights']
+
+# The slots of the activations quantized by QuantizationTransformPass.
+_ACT_SLOTS = ['Input', 'X']
+
+
+def _quant_ops(program, quantizable_op_type):
+    """Returns the indices, weights and input activations of the quantizable
+    ops in the global block."""
+    graph = GraphWrapper(program)
+    quant_ops = []
+    for idx, op in enumerate(program.global_block().ops):
+        op = OpWrapper(op, graph)
+        if op.type() not in quantizable_op_type:
+            continue
+        weight, acts = None, []
+        for slot in op._op.input_names:
+            for var in op.inputs(slot):
+                if graph.is_persistable(var):
+                    weight = weight or var.name()
+                elif slot in _ACT_SLOTS:
+                    acts.append(var.name())
+        if weight is not None:
+            quant_ops.append((idx, op.type(), weight, acts))
+    return quant_ops
+
+
+def _feed_dicts(batches):
+    """Copy the calibration batches into numpy arrays, so they can be shared
+    with the worker processes."""
+    feeds = []
+    for data in batches:
+        if isinstance(data, list):
+            data = data[0]
+        feeds.append({name: np.array(value) for name, value in data.items()})
+    return feeds
+
+
+def _emd_loss(out_float, out_quant):
+    """The earth mover distance between standardized outputs, in the same
+    way as quant_post_hpo."""
+    float_list, quant_list = [], []
+    out_len_sum = 0
+    for f, q in zip(out_float, out_quant):
+        f = convert_model_out_2_nparr(f)
+        q = convert_model_out_2_nparr(q)
+        if len(f.shape) <= 0 or len(q.shape) <= 0:
+            continue
+        min_len = min(f.shape[0], q.shape[0])
+        f, q = f[:min_len], q[:min_len]
+        if have_invalid_num(f) or have_invalid_num(q):
+            continue
+        f, q = standardization(f), standardization(q)
+        if have_invalid_num(f) or have_invalid_num(q):
+            continue
+        out_len_sum += min_len
+        float_list.append(f)
+        quant_list.append(q)
+    if len(float_list) == 0:
+        return float('inf')
+    return float(
+        cal_emd_lose(float_list, quant_list, out_len_sum / len(float_list)))
+
+
+def _run(executor, program, feeds, fetch_targets, scope):
+    return [
+        executor.run(program, feed=feed, fetch_list=fetch_targets, scope=scope)
+        for feed in feeds
+    ]
+
+
+def _op_loss(executor, program, scope, quant_op, feeds, fetch_targets,
+             out_float, act_scales, weight_bits, activation_bits,
+             weight_quantize_type):
+    """Quantize the weight and input activations of one op, and get the
+    distance between the outputs and the float outputs."""
+    idx, op_type, weight, acts = quant_op
+    place = executor.place
+    program = program.clone()
+    block = program.global_block()
+    op = block.ops[idx]
+    for name in acts:
+        var = block.var(name)
+        # The scale is a constant of the program, so that the variables in
+        # scope are not changed.
+        scale = block.create_var(
+            name="{}.sensitivity.scale".format(name),
+            shape=[1],
+            dtype=var.dtype)
+        block._insert_op(
+            block.ops.index(op),
+            type='fill_constant',
+            outputs={'Out': scale},
+            attrs={
+                'shape': [1],
+                'dtype': scale.dtype,
+                'value': float(act_scales[name])
+            })
+        out = block.create_var(
+            name="{}.sensitivity.quant_dequant".format(name),
+            shape=var.shape,
+            dtype=var.dtype)
+        block._insert_op(
+            block.ops.index(op),
+            type='fake_quantize_dequantize_moving_average_abs_max',
+            inputs={'X': var,
+                    'InScale': scale},
+            outputs={'Out': out,
+                     'OutScale': scale},
+            attrs={
+                'bit_length': activation_bits,
+                'moving_rate': 0.9,
+                'is_test': True
+            })
+        op._rename_input(name, out.name)
+
+    quant_axis = None
+    if weight_quantize_type == 'channel_wise_abs_max':
+        quant_axis = 1 if op_type in _CHANNEL_AXIS1_OPS else 0
+    tensor = scope.find_var(weight).get_tensor()
+    backup = np.array(tensor)
+    try:
+        tensor.set(_quant_dequant(backup, weight_bits, quant_axis), place)
+        out_quant = _run(executor, program, feeds, fetch_targets, scope)
+    finally:
+        tensor.set(backup, place)
+    return _emd_loss(out_float, out_quant)
+
+
+_worker_state = {}
+
+
+def _init_worker(model_dir, model_filename, params_filename, feeds,
+                 out_float, act_scales, weight_bits, activation_bits,
+                 weight_quantize_type):
+    """Load the model once in each worker process."""
+    executor = paddle.static.Executor(paddle.CPUPlace())
+    scope = paddle.static.Scope()
+    with paddle.static.scope_guard(scope):
+        [program, _, fetch_targets] = fluid.io.load_inference_model(
+            dirname=model_dir,
+            executor=executor,
+            model_filename=model_filename,
+            params_filename=params_filename)
+    _worker_state.update(
+        executor=executor,
+        program=program,
+        scope=scope,
+        fetch_targets=fetch_targets,
+        feeds=feeds,
+        out_float=out_float,
+        act_scales=act_scales,
+        weight_bits=weight_bits,
+        activation_bits=activation_bits,
+        weight_quantize_type=weight_quantize_type)
+
+
+def _worker_loss(quant_op):
+    state = _worker_state
+    loss = _op_loss(state['executor'], state['program'], state['scope'],
+                    quant_op, state['feeds'], state['fetch_targets'],
+                    state['out_float'], state['act_scales'],
+                    state['weight_bits'], state['activation_bits'],
+                    state['weight_quantize_type'])
+    return quant_op[2], loss
+
+
+def _save_sensitivities(sensitivities, sensitivities_file):
+    tmp_file = sensitivities_file + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        pickle.dump(sensitivities, f)
+    os.replace(tmp_file, sensitivities_file)
+
+
+def quant_sensitivity(
+        executor,
+        model_dir,
+        batch_generator=None,
+        sample_generator=None,
+        data_loader=None,
+        model_filename=None,
+        params_filename=None,
+        batch_size=16,
+        batch_nums=10,
+        scope=None,
+        quantizable_op_type=["conv2d", "depthwise_conv2d", "mul"],
+        weight_bits=8,
+        activation_bits=8,
+        weight_quantize_type='channel_wise_abs_max',
+        sensitivities_file=None,
+        num_workers=1):
+    """Compute the sensitivities of model outputs to the quantization of each op.
+    Only the weight and input activations of one op are quantized at a time,
+    and the sensitivity is the earth mover distance between the standardized
+    outputs of quantized model and float model, the same metric as ``quant_post_hpo``.
+    This function returns a dict storing sensitivities as below:
+
+    .. code-block:: python
+
+           {"conv1_weights":
+               {8: 0.012},
+            "fc_0.w_0":
+               {8: 0.003}
+           }
+
+    The calibration batches are read once, and the float outputs and the abs_max
+    scales of activations are computed in one pass over them and shared by all ops.
+
+    Args:
+        executor(paddle.static.Executor): The executor to load and run the model.
+        model_dir(str): The path of fp32 inference model.
+        batch_generator(Python Generator): The batch generator provides calibrate data. Default: None.
+        sample_generator(Python Generator): The sample generator provides calibrate data. Default: None.
+        data_loader(Python Generator, Paddle.io.DataLoader, optional): The
+            Generator or Dataloader provides calibrate data. Default: None.
+        model_filename(str, optional): The name of model file. Default: None.
+        params_filename(str, optional): The name of params file. Default: None.
+        batch_size(int, optional): The batch size of DataLoader. Default: 16.
+        batch_nums(int, optional): The number of calibrate batches. None means
+            all the batches. Default: 10.
+        scope(paddle.static.Scope, optional): The scope to load the model in.
+            None means paddle.static.global_scope(). Default: None.
+        quantizable_op_type(list[str], optional): The types of ops to be analysised.
+            Default: ["conv2d", "depthwise_conv2d", "mul"].
+        weight_bits(int): The quantization bits of weights. Default: 8.
+        activation_bits(int): The quantization bits of activations. Default: 8.
+        weight_quantize_type(str): 'abs_max' or 'channel_wise_abs_max'.
+            Default: 'channel_wise_abs_max'.
+        sensitivities_file(str): The file to save the sensitivities. It will append
+            the latest computed sensitivities into the file. And the sensitivities
+            in the file would not be computed again. It can be loaded by
+            ``paddleslim.prune.load_sensitivities``. Default: None.
+        num_workers(int): The number of processes to compute the sensitivities.
+            The workers load the model again and run on CPU. 1 means computing
+            in the current process with executor. Default: 1.
+
+    Returns:
+        dict: The sensitivities in format ``{weight_name: {weight_bits: loss}}``.
+    """
+    scope = paddle.static.global_scope() if scope is None else scope
+    with paddle.static.scope_guard(scope):
+        [program, feed_names, fetch_targets] = fluid.io.load_inference_model(
+            dirname=model_dir,
+            executor=executor,
+            model_filename=model_filename,
+            params_filename=params_filename)
+    sensitivities = load_sensitivities(sensitivities_file)
+    quant_ops = []
+    for quant_op in _quant_ops(program, quantizable_op_type):
+        weight = quant_op[2]
+        if weight_bits in sensitivities.get(weight, {}):
+            _logger.debug('{} has computed.'.format(weight))
+        elif weight not in [op[2] for op in quant_ops]:
+            quant_ops.append(quant_op)
+    if len(quant_ops) == 0:
+        return sensitivities
+
+    batches = _calibration_batches(program, feed_names, executor.place,
+                                   batch_generator, sample_generator,
+                                   data_loader, batch_size, batch_nums)
+    feeds = _feed_dicts(batches)
+    act_names = sorted(set(name for op in quant_ops for name in op[3]))
+    act_scales = dict((name, 0.) for name in act_names)
+    out_float = []
+    for feed in feeds:
+        outs = executor.run(program,
+                            feed=feed,
+                            fetch_list=fetch_targets + act_names,
+                            scope=scope)
+        out_float.append(outs[:len(fetch_targets)])
+        for name, act in zip(act_names, outs[len(fetch_targets):]):
+            act_scales[name] = max(act_scales[name],
+                                   float(np.abs(np.array(act)).max()))
+
+    def _update(weight, loss):
+        _logger.info("quant sensitivity - weight: {}; loss={}".format(weight,
+                                                                      loss))
+        sensitivities.setdefault(weight, {})[weight_bits] = loss
+        if sensitivities_file:
+            _save_sensitivities(sensitivities, sensitivities_file)
+
+    if num_workers <= 1:
+        for quant_op in quant_ops:
+            _update(quant_op[2],
+                    _op_loss(executor, program, scope, quant_op, feeds,
+                             fetch_targets, out_float, act_scales,
+                             weight_bits, activation_bits,
+                             weight_quantize_type))
+        return sensitivities
+
+    pool = multiprocessing.get_context('spawn').Pool(
+        num_workers,
+        initializer=_init_worker,
+        initargs=(model_dir, model_filename, params_filename, feeds,
+                  out_float, act_scales, weight_bits, activation_bits,
+                  weight_quantize_type))
+    try:
+        for weight, loss in pool.imap_unordered(_worker_loss, quant_ops):
+            _update(weight, loss)
+    finally:
+        pool.terminate()
+    return sensitivities
+
+
+def get_skip_weights(sensitivities, loss, weight_bits=8):
+    """
+    Get the weights whose ops should not be quantized, because the loss of
+    quantizing one of them is larger than the given ``loss``.
+
+    Args:
+        sensitivities(dict): The sensitivities returned by ``quant_sensitivity``.
+        loss(float): The threshold of loss.
+        weight_bits(int): The quantization bits of weights. Default: 8.
+
+    Returns:
+        dict: The weights mapped to None. It can be used as ``weight_bits_map``
+              in the config of ``quant_aware`` and ``convert``.
+    """
+    skip_weights = {}
+    for weight, losses in sensitivities.items():
+        if weight_bits in losses and losses[weight_bits] > loss:
+            skip_weights[weight] = None
+    return skip_weights
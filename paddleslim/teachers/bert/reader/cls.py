@@ -17,9 +17,15 @@ import os
 import types
 import csv
 import random
+import re
+import hashlib
 import numpy as np
 from . import tokenization
 from .batching import prepare_batch_data
+from .dataset_cache import build_dataset_cache, TokenizedDataset, bucket_batches, prefetch
+
+# The files written by build_dataset_cache with the prefix of _cache_prefix.
+_CACHE_FILE = re.compile(r"^\w+_[0-9a-f]{32}\.")
 
 
 class DataProcessor(object):
@@ -31,13 +37,28 @@ class DataProcessor(object):
                  max_seq_len,
                  do_lower_case,
                  in_tokens,
-                 random_seed=None):
+                 random_seed=None,
+                 cache_dir=None,
+                 prefetch_size=8):
+        """
+        Args:
+          cache_dir: string. The directory of the pre-tokenized dataset cache. The examples of each phase
+                     are tokenized once and cached into it, then batches are read from the cache with
+                     length bucketing and assembled in a background thread. None means tokenizing
+                     examples on the fly. Default: None.
+          prefetch_size: int. The number of batches prefetched by the background thread when cache_dir
+                     is set. Default: 8.
+        """
         self.data_dir = data_dir
         self.max_seq_len = max_seq_len
+        self.vocab_path = vocab_path
+        self.do_lower_case = do_lower_case
         self.tokenizer = tokenization.FullTokenizer(
             vocab_file=vocab_path, do_lower_case=do_lower_case)
         self.vocab = self.tokenizer.vocab
         self.in_tokens = in_tokens
+        self.cache_dir = cache_dir
+        self.prefetch_size = prefetch_size
 
         np.random.seed(random_seed)
 
@@ -124,6 +145,63 @@ class DataProcessor(object):
         """Gets progress for training phase."""
         return self.current_train_example, self.current_train_epoch
 
+    def _get_examples(self, phase):
+        if phase in ['train', 'search_train', 'search_valid']:
+            return self.get_train_examples(self.data_dir)
+        elif phase == 'train_aug':
+            return self.get_train_aug_examples(self.data_dir)
+        elif phase == 'dev':
+            return self.get_dev_examples(self.data_dir)
+        elif phase == 'test':
+            return self.get_test_examples(self.data_dir)
+        raise ValueError(
+            "Unknown phase, which should be in ['train', 'dev', 'test'].")
+
+    def _cache_prefix(self, phase):
+        """The cache is identified by the processor, the phase, the tokenizer
+        settings and the modification time of data files. The files of the
+        cache are skipped when cache_dir is in data_dir."""
+        cache_dir = os.path.realpath(self.cache_dir)
+        mtime = 0
+        for root, dirs, files in os.walk(self.data_dir):
+            dirs[:] = [
+                d for d in dirs
+                if os.path.realpath(os.path.join(root, d)) != cache_dir
+            ]
+            in_cache_dir = os.path.realpath(root) == cache_dir
+            for name in files:
+                if in_cache_dir and _CACHE_FILE.match(name):
+                    continue
+                mtime = max(mtime,
+                            os.path.getmtime(os.path.join(root, name)))
+        key = "|".join([
+            type(self).__name__, phase, os.path.abspath(self.data_dir),
+            str(mtime), os.path.abspath(self.vocab_path),
+            str(self.do_lower_case), str(self.max_seq_len)
+        ])
+        digest = hashlib.md5(key.encode("utf8")).hexdigest()
+        return os.path.join(self.cache_dir, "{}_{}".format(phase, digest))
+
+    def get_cached_dataset(self, phase):
+        """
+        Get the pre-tokenized dataset of phase, which is built on the first call.
+
+        Args:
+          phase: string. 'train', 'train_aug', 'dev' or 'test'.
+
+        Returns:
+          TokenizedDataset: The dataset read from cache.
+        """
+        cache_prefix = self._cache_prefix(phase)
+        if not TokenizedDataset.exists(cache_prefix):
+            examples = self._get_examples(phase)
+            labels = self.get_labels()
+            features = (self.convert_example(index, example, labels,
+                                             self.max_seq_len, self.tokenizer)
+                        for (index, example) in enumerate(examples))
+            build_dataset_cache(features, cache_prefix)
+        return TokenizedDataset(cache_prefix)
+
     def data_generator(self,
                        batch_size,
                        phase='train',
@@ -140,8 +218,13 @@ class DataProcessor(object):
           epoch: int. Total epoches to generate data.
           shuffle: bool. Whether to shuffle examples.
         """
-        search_examples = self.get_train_examples(self.data_dir)
-        random.shuffle(search_examples)
+        if self.cache_dir is not None:
+            return self._cached_data_generator(batch_size, phase, epoch,
+                                               dev_count, shuffle,
+                                               shuffle_seed)
+        if phase in ['search_train', 'search_valid']:
+            search_examples = self.get_train_examples(self.data_dir)
+            random.shuffle(search_examples)
         if phase == 'train':
             examples = self.get_train_examples(self.data_dir)
             self.num_examples['train'] = len(examples)
@@ -156,11 +239,11 @@ class DataProcessor(object):
             self.num_examples['test'] = len(examples)
         elif phase == 'search_train':
             #examples = self.get_train_examples(self.data_dir)
-            self.num_examples['search_train'] = len(search_examples) / 2
+            self.num_examples['search_train'] = len(search_examples) // 2
             examples = search_examples[:self.num_examples['search_train']]
         elif phase == 'search_valid':
             #examples = self.get_train_examples(self.data_dir)
-            self.num_examples['search_valid'] = len(search_examples) / 2
+            self.num_examples['search_valid'] = len(search_examples) // 2
             examples = search_examples[self.num_examples['search_valid']:]
         else:
             raise ValueError(
@@ -228,6 +311,75 @@ class DataProcessor(object):
 
         return wrapper
 
+    def _cached_data_generator(self, batch_size, phase, epoch, dev_count,
+                               shuffle, shuffle_seed):
+        """
+        Generate data from the pre-tokenized dataset cache. Examples with
+        similar lengths are batched together when shuffle is True.
+        """
+        if phase in ['search_train', 'search_valid']:
+            dataset = self.get_cached_dataset('train')
+            search_indices = list(range(len(dataset)))
+            random.shuffle(search_indices)
+            half = len(search_indices) // 2
+            self.num_examples[phase] = half
+            if phase == 'search_train':
+                indices = np.array(search_indices[:half], dtype="int64")
+            else:
+                indices = np.array(search_indices[half:], dtype="int64")
+        else:
+            dataset = self.get_cached_dataset(phase)
+            indices = np.arange(len(dataset))
+            num_key = 'train' if phase == 'train_aug' else phase
+            self.num_examples[num_key] = len(dataset)
+        is_train = phase in ['train', 'search_train']
+
+        def batch_reader():
+            for epoch_index in range(epoch):
+                if is_train:
+                    self.current_train_epoch = epoch_index
+                rng = np.random.RandomState(
+                    shuffle_seed) if shuffle_seed is not None else None
+                batches = bucket_batches(
+                    dataset.lengths[indices],
+                    batch_size,
+                    self.in_tokens,
+                    shuffle=shuffle,
+                    rng=rng)
+                num_read = 0
+                for batch in batches:
+                    batch_data, total_token_num = [], 0
+                    for index in indices[batch]:
+                        token_ids, segment_ids, label_id = dataset[index]
+                        batch_data.append([
+                            token_ids, segment_ids,
+                            list(range(len(token_ids))), label_id
+                        ])
+                        total_token_num += len(token_ids)
+                    num_read += len(batch)
+                    if is_train:
+                        self.current_train_example = num_read
+                    batch_data = self.generate_batch_data(
+                        batch_data,
+                        total_token_num,
+                        voc_size=-1,
+                        mask_id=-1,
+                        return_input_mask=True,
+                        return_max_len=False,
+                        return_num_token=False)
+                    yield self.split_seq_pair(batch_data)
+
+        def wrapper():
+            all_dev_batches = []
+            for batch_data in prefetch(batch_reader, self.prefetch_size)():
+                all_dev_batches.append(batch_data)
+                if len(all_dev_batches) == dev_count:
+                    for batch in all_dev_batches:
+                        yield batch
+                    all_dev_batches = []
+
+        return wrapper
+
     def split_seq_pair(self, data_ids):
         src_ids = data_ids[0]
         sentence_ids = data_ids[2]
@@ -1,13 +1,14 @@
 import sys
 sys.path.append("../../")
 import logging
+import tempfile
 import numpy as np
 import unittest
 import paddle
 import paddle.nn as nn
 from paddle.vision.models import MobileNetV1
 import paddle.vision.transforms as T
-from paddleslim.dygraph.dist import Distill, config2yaml
+from paddleslim.dygraph.dist import Distill, TeacherCache, config2yaml
 from paddleslim.common.log_helper import get_logger
 
 _logger = get_logger(
@@ -205,5 +206,63 @@ class TestImperativeDistillCase1(TestImperativeDistill):
         return './test.yaml'
 
 
+class TestImperativeDistillTeacherCache(unittest.TestCase):
+    def setUp(self):
+        class Model(nn.Layer):
+            def __init__(self):
+                super(Model, self).__init__()
+                self.conv1 = nn.Conv2D(3, 3, 3, padding=1)
+                self.fc = nn.Linear(3 * 8 * 8, 10)
+
+            def forward(self, x):
+                out = self.conv1(x)
+                out = paddle.reshape(out, shape=[x.shape[0], -1])
+                return self.fc(out)
+
+        self.s_model, self.t_model = Model(), Model()
+        self.t_model.eval()
+        self.distill_configs = [{
+            'loss_function': 'MSELoss',
+            'layers': [{
+                "layers_name": ["conv1", "conv1"]
+            }]
+        }, {
+            'loss_function': 'CELoss',
+            'temperature': 1.0,
+            'layers': [{
+                "layers_name": ["fc", "fc"]
+            }]
+        }]
+
+    def test_teacher_cache(self):
+        num_samples, batch_size = 8, 4
+        data = np.random.uniform(
+            -1, 1, [num_samples, 3, 8, 8]).astype('float32')
+        cache = TeacherCache(tempfile.mkdtemp(), num_samples)
+        distill_model = Distill(
+            self.distill_configs,
+            self.s_model,
+            self.t_model,
+            convert_fn=False,
+            teacher_cache=cache)
+
+        def run_epoch():
+            losses = []
+            for start in range(0, num_samples, batch_size):
+                ids = np.arange(start, start + batch_size)
+                img = paddle.to_tensor(data[ids])
+                loss, _, _ = distill_model(img, sample_ids=ids)
+                losses.append(loss.numpy())
+            return losses
+
+        losses = run_epoch()
+        self.assertTrue(cache.contains(np.arange(num_samples)))
+        ### the teacher is skipped when all samples are cached.
+        self.t_model.forward = None
+        cached_losses = run_epoch()
+        for loss, cached_loss in zip(losses, cached_losses):
+            self.assertTrue(np.allclose(loss, cached_loss))
+
+
 if __name__ == '__main__':
     unittest.main()
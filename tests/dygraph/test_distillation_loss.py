@@ -530,6 +530,32 @@ class TestRKDLoss(unittest.TestCase):
             # NOTE: sqrt is included and seed is set for stability
             self.assertTrue(np.allclose(np_loss, pd_loss))
 
+    def test_chunked_rkd_angle_loss(self, ):
+        batch_size = 16
+        feat_dim = 64
+        paddle.seed(0)
+        x = paddle.rand([batch_size, feat_dim])
+        x.stop_gradient = False
+        y = paddle.rand([batch_size, feat_dim])
+
+        pd_loss = RKdAngle()(x, y)
+        pd_loss.backward()
+        grad = x.grad.numpy()
+        x.clear_gradient()
+
+        ### at most 3 anchors in a chunk.
+        chunked_loss = RKdAngle(max_elements=3 * batch_size * batch_size)(x,
+                                                                          y)
+        chunked_loss.backward()
+        np_loss = self.np_rkd_angle(x, y)
+        self.assertTrue(np.allclose(np_loss, chunked_loss.numpy()))
+        self.assertTrue(np.allclose(pd_loss.numpy(), chunked_loss.numpy()))
+        self.assertTrue(np.allclose(grad, x.grad.numpy(), atol=1e-7))
+
+        sampled_loss = RKdAngle(
+            num_anchors=4, max_elements=2 * batch_size * batch_size)(x, y)
+        self.assertTrue(sampled_loss.numpy() >= 0)
+
     def dist_np_rkd_loss(
             self,
             predicts,
@@ -710,5 +736,68 @@ class TestCombinedLoss(unittest.TestCase):
                 self.assertTrue(np.allclose(np_result, pd_result))
 
 
+class TestFusedCombinedLoss(unittest.TestCase):
+    def test_fused_combined_loss(self, ):
+        paddle.seed(0)
+        layers = ["conv1", "conv2", "conv3", "fc"]
+        predicts = {}
+        for model in ["student_0", "teacher_0"]:
+            predicts[model] = {
+                "conv1": paddle.rand([4, 8, 6, 6]),
+                "conv2": paddle.rand([4, 8, 6, 6]),
+                "conv3": paddle.rand([4, 8, 3, 3]),
+                "fc": paddle.rand([4, 10]),
+            }
+        pairs = [["student_0", "teacher_0"]]
+        loss_cfg_list = []
+        for idx, layer in enumerate(["conv1", "conv2", "conv3"]):
+            loss_cfg_list.append({
+                "loss_function": "MSELoss",
+                "weight": float(idx + 1),
+                "layers_name": [layer, layer],
+                "model_name_pairs": pairs,
+                "align_params": {
+                    "align_type": "1x1conv",
+                    "in_channel": 8,
+                    "out_channel": 8
+                }
+            })
+        for idx, layer in enumerate(["conv1", "conv2"]):
+            loss_cfg_list.append({
+                "loss_function": "L1Loss",
+                "weight": 0.5,
+                "layers_name": [layer, layer],
+                "model_name_pairs": pairs
+            })
+        loss_cfg_list.append({
+            "loss_function": "DMLLoss",
+            "weight": 1.0,
+            "act": "softmax",
+            "temperature": 2.0,
+            "layers_name": ["fc", "fc"],
+            "model_name_pairs": pairs
+        })
+
+        fused_loss_func = CombinedLoss(loss_config_list=loss_cfg_list)
+        loss_func = CombinedLoss(loss_config_list=loss_cfg_list, fuse=False)
+        loss_func.set_state_dict(fused_loss_func.state_dict())
+
+        fused_result = fused_loss_func(predicts, None)
+        result = loss_func(predicts, None)
+        self.assertTrue(set(fused_result.keys()) == set(result.keys()))
+        for k in result:
+            self.assertTrue(
+                np.allclose(
+                    fused_result[k].numpy(), result[k].numpy(), atol=1e-6))
+
+        fused_result["loss"].backward()
+        result["loss"].backward()
+        for fused_param, param in zip(fused_loss_func.parameters(),
+                                      loss_func.parameters()):
+            self.assertTrue(
+                np.allclose(
+                    fused_param.grad.numpy(), param.grad.numpy(), atol=1e-6))
+
+
 if __name__ == '__main__':
     unittest.main()
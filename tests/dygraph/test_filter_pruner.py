@@ -22,6 +22,8 @@ import paddle.vision.transforms as T
 from paddle.static import InputSpec as Input
 from paddleslim.dygraph import L1NormFilterPruner, L2NormFilterPruner, FPGMFilterPruner
 from paddleslim.dygraph import Status
+from paddleslim.dygraph.prune.pruning_plan import PruningPlan
+from paddleslim.analysis import flops
 
 
 class TestStatus(unittest.TestCase):
@@ -137,6 +139,97 @@ class TestPruningGroupConv2d(unittest.TestCase):
                 pruner.restore()
 
 
+class TestDryRunFlops(unittest.TestCase):
+    def __init__(self, methodName='runTest'):
+        super(TestDryRunFlops, self).__init__(methodName)
+
+    def runTest(self):
+        with fluid.unique_name.guard():
+            net = paddle.vision.models.mobilenet_v1()
+            ratios = {}
+            for i, param in enumerate(net.parameters()):
+                if len(param.shape) == 4:
+                    ratios[param.name] = 0.1 * (i % 5)
+            pruner = L1NormFilterPruner(net, [1, 3, 128, 128])
+            base_flops = flops(net, [1, 3, 128, 128])
+            self.assertAlmostEqual(
+                pruner.dry_run_flops({}) / base_flops, 1., places=6)
+            shapes = dict([(param.name, param.shape)
+                           for param in net.parameters()])
+            dry_run_flops = pruner.dry_run_flops(ratios)
+            for param in net.parameters():
+                self.assertTrue(shapes[param.name] == param.shape)
+
+            pruner.prune_vars(ratios, 0)
+            pruned_flops = flops(net, [1, 3, 128, 128])
+            # The traced shapes are stale after pruning.
+            self.assertRaises(AssertionError, pruner.dry_run_flops, ratios)
+            pruner.restore()
+            self.assertAlmostEqual(
+                pruner.dry_run_flops(ratios) / dry_run_flops, 1., places=6)
+            self.assertLess(dry_run_flops, base_flops)
+            self.assertAlmostEqual(
+                dry_run_flops / pruned_flops, 1., places=6)
+
+
+class TestLazyPrune(unittest.TestCase):
+    def __init__(self, methodName='runTest'):
+        super(TestLazyPrune, self).__init__(methodName)
+
+    def runTest(self):
+        with fluid.unique_name.guard():
+            net = paddle.vision.models.mobilenet_v1()
+            values = dict([(param.name, param.numpy())
+                           for param in net.parameters()])
+            pruner = L1NormFilterPruner(net, [1, 3, 128, 128])
+            var_name = net.parameters()[0].name
+            for apply in ["lazy", "impretive"]:
+                plan = pruner.prune_var(var_name, 0, 0.5, apply=apply)
+                pruned_shape = net.parameters()[0].shape
+                if apply == "lazy":
+                    self.assertTrue(pruned_shape == list(values[var_name]
+                                                         .shape))
+                    mask = np.array(plan.masks[var_name][0].mask).astype(bool)
+                    self.assertTrue(
+                        np.all(net.parameters()[0].numpy()[~mask] == 0))
+                else:
+                    self.assertTrue(pruned_shape[0] < values[var_name].shape[
+                        0])
+                plan.restore(net)
+                for param in net.parameters():
+                    self.assertTrue(
+                        np.array_equal(param.numpy(), values[param.name]))
+
+
+class TestRestoreGroups(unittest.TestCase):
+    def __init__(self, methodName='runTest'):
+        super(TestRestoreGroups, self).__init__(methodName)
+
+    def runTest(self):
+        with fluid.unique_name.guard():
+            net = paddle.vision.models.mobilenet_v1()
+            groups = dict([(layer.full_name(), layer._groups)
+                           for layer in net.sublayers()
+                           if isinstance(layer, paddle.nn.Conv2D)])
+            pruner = L1NormFilterPruner(net, [1, 3, 128, 128])
+            plan = pruner.prune_var(net.parameters()[0].name, 0, 0.5)
+            pruned_groups = dict([(layer.full_name(), layer._groups)
+                                  for layer in net.sublayers()
+                                  if isinstance(layer, paddle.nn.Conv2D)])
+            self.assertTrue(pruned_groups != groups)
+            # The plan not pruning the depthwise convolutions doesn't
+            # restore their groups.
+            PruningPlan(net.full_name).restore(net)
+            for layer in net.sublayers():
+                if isinstance(layer, paddle.nn.Conv2D):
+                    self.assertEqual(layer._groups,
+                                     pruned_groups[layer.full_name()])
+            plan.restore(net)
+            for layer in net.sublayers():
+                if isinstance(layer, paddle.nn.Conv2D):
+                    self.assertEqual(layer._groups, groups[layer.full_name()])
+
+
 from paddle.fluid import ParamAttr
 
 
@@ -195,6 +288,9 @@ def add_cases(suite):
     suite.addTest(TestFilterPruner(param_names=["conv2d_0.w_0"]))
     suite.addTest(TestPruningGroupConv2d())
     suite.addTest(TestPruningMul())
+    suite.addTest(TestDryRunFlops())
+    suite.addTest(TestLazyPrune())
+    suite.addTest(TestRestoreGroups())
 
 
 def load_tests(loader, standard_tests, pattern):
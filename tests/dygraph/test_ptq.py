@@ -74,6 +74,35 @@ class ImperativeLenet(nn.Layer):
         return x
 
 
+class ShuffledConvBN(nn.Layer):
+    def __init__(self):
+        super(ShuffledConvBN, self).__init__()
+        # The layers are registered in a different order from the forward.
+        self.bn1 = nn.BatchNorm2D(8)
+        self.conv1 = nn.Conv2D(1, 8, 3, padding=1)
+        self.conv2 = nn.Conv2D(8, 8, 3, padding=1)
+        self.bn2 = nn.BatchNorm2D(8)
+        self.fc = nn.Linear(8 * 28 * 28, 10)
+        self.bn3 = nn.BatchNorm1D(10)
+
+    def forward(self, inputs):
+        x = paddle.nn.functional.relu(self.bn1(self.conv1(inputs)))
+        # The output of conv2 is also used by the residual add.
+        y = self.conv2(x)
+        x = self.bn2(y) + y
+        x = paddle.flatten(x, 1)
+        return self.bn3(self.fc(x))
+
+
+class TestFindConvBN(unittest.TestCase):
+    def test_find_conv_bn_names(self):
+        model = ShuffledConvBN()
+        model.train()
+        fuse_list = PTQ().find_conv_bn_names(model, [1, 1, 28, 28])
+        self.assertEqual(fuse_list, [['conv1', 'bn1'], ['fc', 'bn3']])
+        self.assertTrue(model.training)
+
+
 class TestPTQ(unittest.TestCase):
     """
     Test dygraph post training quantization.
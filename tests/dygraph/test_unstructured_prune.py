@@ -1,9 +1,12 @@
 import sys
 sys.path.append("../../")
+import os
+import tempfile
 import unittest
 import paddle
 import numpy as np
 from paddleslim import UnstructuredPruner
+from paddleslim.prune import load_sparse_checkpoint
 from paddle.vision.models import mobilenet_v1
 
 
@@ -69,6 +72,85 @@ class TestUnstructuredPruner(unittest.TestCase):
         cur_sparsity = UnstructuredPruner.total_sparse_conv1x1(self.net_conv1x1)
         self.assertTrue(abs(cur_sparsity - 0.55) < 0.01)
 
+    def test_update_interval(self):
+        net = mobilenet_v1(num_classes=10, pretrained=False)
+        pruner = UnstructuredPruner(
+            net, mode='ratio', ratio=0.3, update_interval=2)
+        pruner.step()
+        threshold = pruner.threshold
+        params = []
+        for name, sub_layer in net.named_sublayers():
+            if not pruner._should_prune_layer(sub_layer):
+                continue
+            for param in sub_layer.parameters(include_sublayers=False):
+                if param.name not in pruner.skip_params:
+                    params.append(np.abs(param.numpy()).flatten())
+        params = np.sort(np.concatenate(params))
+        self.assertEqual(threshold,
+                         params[max(0, round(0.3 * params.size) - 1)].item())
+
+        pruner.ratio = 0.6
+        pruner.step()
+        self.assertEqual(threshold, pruner.threshold)
+        pruner.step()
+        self.assertGreater(pruner.threshold, threshold)
+
+    def test_export_sparse(self):
+        self.pruner.step()
+        self.pruner.update_params()
+        for mask in self.pruner.masks.values():
+            self.assertEqual(mask.dtype, paddle.bool)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = self.pruner.export_sparse(
+                os.path.join(tmp_dir, 'sparse'), format='csr')
+            ckpt = load_sparse_checkpoint(path)
+            state_dict = self.net.state_dict()
+            for name in ckpt:
+                self.assertTrue(
+                    np.array_equal(ckpt[name], state_dict[name].numpy()))
+            net = mobilenet_v1(num_classes=10, pretrained=False)
+            net.set_state_dict(ckpt.to_dict())
+            self.assertEqual(
+                UnstructuredPruner.total_sparse(net),
+                UnstructuredPruner.total_sparse(self.net))
+            ckpt.close()
+
+    def test_sparse_pattern(self):
+        net = mobilenet_v1(num_classes=10, pretrained=False)
+        pruner = UnstructuredPruner(
+            net, mode='ratio', ratio=0.5, sparse_pattern='2:4')
+        pruner.step()
+        pruner.update_params()
+        for param in net.parameters():
+            if param.name not in pruner.masks or len(param.shape) != 4:
+                continue
+            if param.shape[1] % 4 != 0:
+                continue
+            groups = np.moveaxis(param.numpy(), 1, -1).reshape([-1, 4])
+            self.assertTrue(np.all(np.count_nonzero(groups, axis=1) <= 2))
+
+        net = mobilenet_v1(num_classes=10, pretrained=False)
+        pruner = UnstructuredPruner(
+            net,
+            mode='ratio',
+            ratio=0.5,
+            prune_params_type='conv1x1_only',
+            sparse_pattern='4x4')
+        pruner.step()
+        pruner.update_params()
+        for param in net.parameters():
+            if param.name not in pruner.masks:
+                continue
+            out_channels, in_channels = param.shape[:2]
+            if out_channels % 4 != 0 or in_channels % 4 != 0:
+                continue
+            blocks = param.numpy().reshape(
+                [out_channels // 4, 4, in_channels // 4, 4]) != 0
+            nonzeros = blocks.sum(axis=(1, 3))
+            self.assertTrue(np.all((nonzeros == 0) | (nonzeros == 16)))
+        self.assertTrue(
+            abs(UnstructuredPruner.total_sparse_conv1x1(net) - 0.5) < 0.05)
+
 
 if __name__ == "__main__":
     unittest.main()
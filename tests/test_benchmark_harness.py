@@ -0,0 +1,95 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import sys
+sys.path.append("../benchmarks")
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from harness import register, run_case, append_history, load_history, compare, _CallCounter
+
+
+class Counted(object):
+    def work(self):
+        return 1
+
+
+def _prepare(size):
+    def run():
+        if size == 'exit':
+            os._exit(1)
+        elif size == 'sleep':
+            time.sleep(60)
+        Counted().work()
+
+    return (lambda: None), run
+
+
+register(
+    'harness_case', ['ok', 'exit', 'sleep'],
+    counted=['{}:Counted.work'.format(__name__)])(_prepare)
+
+
+class TestHarness(unittest.TestCase):
+    def test_call_counter(self):
+        original = Counted.__dict__['work']
+        target = '{}:Counted.work'.format(__name__)
+        with _CallCounter([target]) as counter:
+            for _ in range(3):
+                Counted().work()
+        self.assertEqual(counter.counts[target], 3)
+        self.assertEqual(Counted().work(), 1)
+        self.assertIs(Counted.__dict__['work'], original)
+
+    def test_run_case(self):
+        result = run_case(__name__, 'harness_case', 'ok', repeat=2)
+        self.assertEqual(len(result['times']), 2)
+        self.assertEqual(result['calls'],
+                         {'{}:Counted.work'.format(__name__): 1})
+        # The child exiting without result is reported at once.
+        start = time.time()
+        result = run_case(__name__, 'harness_case', 'exit', timeout=30)
+        self.assertEqual(result, {'error': 'process exited with code 1'})
+        self.assertLess(time.time() - start, 20)
+        result = run_case(__name__, 'harness_case', 'sleep', timeout=2)
+        self.assertEqual(result, {'error': 'timeout after 2s'})
+
+    def test_compare(self):
+        history_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, history_dir)
+        history_file = os.path.join(history_dir, 'benchmark_history.json')
+        result = {
+            'time_min': 1.,
+            'time_mean': 1.,
+            'times': [1.],
+            'peak_rss_mb': 100.,
+            'calls': {
+                'ops': 10
+            }
+        }
+        append_history(history_file, {'case/1': result}, tag='base')
+        slower = dict(result, time_min=1.5, calls={'ops': 10})
+        append_history(
+            history_file, {'case/1': slower,
+                           'new/1': result}, tag='current')
+        history = load_history(history_file)
+        self.assertEqual(len(history), 2)
+        rows = compare(history[0], history[1], time_threshold=1.2)
+        regressed = [(row[0], row[1]) for row in rows if row[-1]]
+        self.assertEqual(regressed, [('case/1', 'time_min')])
+
+
+if __name__ == '__main__':
+    unittest.main()
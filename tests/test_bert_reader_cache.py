@@ -0,0 +1,120 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import sys
+sys.path.append("../")
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from paddleslim.teachers.bert.reader.cls import MrpcProcessor
+
+VOCAB = [
+    "[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "the", "cat", "sat", "on",
+    "mat", "a", "dog", "ran", "##s", "."
+]
+
+LINES = [
+    "the cat sat on the mat .", "a dog ran .", "the cats sat .",
+    "a dog sat on a mat .", "the dog ran on the mat .", "the cat ran ."
+]
+
+
+class TestBertReaderCache(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.vocab_path = os.path.join(self.data_dir, "vocab.txt")
+        with open(self.vocab_path, "w") as f:
+            f.write("\n".join(VOCAB) + "\n")
+        rows = ["Quality\t#1 ID\t#2 ID\t#1 String\t#2 String"]
+        for i, line in enumerate(LINES):
+            rows.append("{}\t{}\t{}\t{}\t{}".format(i % 2, i, i, line, line))
+        self.train_file = os.path.join(self.data_dir, "train.tsv")
+        with open(self.train_file, "w") as f:
+            f.write("\n".join(rows) + "\n")
+        # The cache is in data_dir, which doesn't change the key of cache.
+        self.cache_dir = os.path.join(self.data_dir, "cache")
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def _processor(self):
+        return MrpcProcessor(
+            data_dir=self.data_dir,
+            vocab_path=self.vocab_path,
+            max_seq_len=16,
+            do_lower_case=True,
+            in_tokens=False,
+            cache_dir=self.cache_dir)
+
+    def _cache_files(self):
+        return sorted(os.listdir(self.cache_dir))
+
+    def test_cache(self):
+        processor = self._processor()
+        dataset = processor.get_cached_dataset('train')
+        examples = processor.get_train_examples(self.data_dir)
+        self.assertEqual(len(dataset), len(examples))
+        for index, example in enumerate(examples):
+            feature = processor.convert_example(
+                index, example,
+                processor.get_labels(), 16, processor.tokenizer)
+            token_ids, segment_ids, label_id = dataset[index]
+            self.assertEqual(token_ids, feature.input_ids)
+            self.assertEqual(segment_ids, feature.segment_ids)
+            self.assertEqual(label_id, feature.label_id)
+        files = self._cache_files()
+        mtimes = [
+            os.path.getmtime(os.path.join(self.cache_dir, name))
+            for name in files
+        ]
+
+        # Hit the cache written by the first processor.
+        processor = self._processor()
+        prefix = processor._cache_prefix('train')
+        self.assertEqual(len(processor.get_cached_dataset('train')), len(LINES))
+        self.assertEqual(self._cache_files(), files)
+        self.assertEqual([
+            os.path.getmtime(os.path.join(self.cache_dir, name))
+            for name in files
+        ], mtimes)
+
+        # The modified data file invalidates the cache.
+        later = time.time() + 10
+        os.utime(self.train_file, (later, later))
+        processor = self._processor()
+        self.assertNotEqual(processor._cache_prefix('train'), prefix)
+        self.assertEqual(len(processor.get_cached_dataset('train')), len(LINES))
+        self.assertEqual(len(self._cache_files()), 2 * len(files))
+
+    def test_cache_in_data_dir(self):
+        self.cache_dir = self.data_dir
+        processor = self._processor()
+        prefix = processor._cache_prefix('train')
+        processor.get_cached_dataset('train')
+        self.assertEqual(self._processor()._cache_prefix('train'), prefix)
+
+    def test_data_generator(self):
+        processor = self._processor()
+        batches = list(
+            processor.data_generator(
+                batch_size=2, phase='train', shuffle=False)())
+        self.assertEqual(len(batches), 3)
+        self.assertEqual(processor.get_num_examples('train'), len(LINES))
+        src_ids = [ids for batch in batches for ids in batch[0]]
+        self.assertEqual(len(src_ids), len(LINES))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import sys
+sys.path.append("../")
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from paddleslim.teachers.bert.reader import tokenization
+from paddleslim.nas.darts.search_space.conv_bert.reader import tokenization as conv_bert_tokenization
+
+VOCAB = [
+    "[PAD]", "[UNK]", "[CLS]", "[SEP]", "un", "##aff", "##able", "a", "##a",
+    "aa", "##aa", "b", "##b", "ab", "##ab", "abc", "##c", "##bc", "##", "#",
+    "##ing", "play", "##play", "é", "##é", "中", "##中", "国", ","
+]
+
+
+def reference_wordpiece(vocab, text, unk_token="[UNK]",
+                        max_input_chars_per_word=100):
+    """The greedy longest-match-first algorithm scanning the substrings."""
+    output_tokens = []
+    for token in text.strip().split():
+        chars = list(token)
+        if len(chars) > max_input_chars_per_word:
+            output_tokens.append(unk_token)
+            continue
+        is_bad = False
+        start = 0
+        sub_tokens = []
+        while start < len(chars):
+            end = len(chars)
+            cur_substr = None
+            while start < end:
+                substr = "".join(chars[start:end])
+                if start > 0:
+                    substr = "##" + substr
+                if substr in vocab:
+                    cur_substr = substr
+                    break
+                end -= 1
+            if cur_substr is None:
+                is_bad = True
+                break
+            sub_tokens.append(cur_substr)
+            start = end
+        if is_bad:
+            output_tokens.append(unk_token)
+        else:
+            output_tokens.extend(sub_tokens)
+    return output_tokens
+
+
+class TestWordpieceTokenizer(unittest.TestCase):
+    def setUp(self):
+        self.vocab = dict((piece, i) for i, piece in enumerate(VOCAB))
+        self.texts = [
+            "unaffable", "unaffablex", "aaaaa", "abcabc", "abab", "playing",
+            "##", "###", "##a", "#a", "a##", "é中国", "中中中", "x", "", "   ",
+            "a b  c", "un aff able", "aaaaaaaaaaaa", "abcx abc"
+        ]
+        # Random words of the characters in vocabulary.
+        rng = random.Random(0)
+        chars = "abcun#fle中国é,x"
+        for _ in range(2000):
+            words = [
+                "".join(
+                    rng.choice(chars) for _ in range(rng.randint(1, 12)))
+                for _ in range(rng.randint(1, 4))
+            ]
+            self.texts.append(" ".join(words))
+
+    def _check(self, module):
+        for max_chars in [100, 5]:
+            tokenizer = module.WordpieceTokenizer(
+                vocab=self.vocab, max_input_chars_per_word=max_chars)
+            for text in self.texts:
+                self.assertEqual(
+                    tokenizer.tokenize(text),
+                    reference_wordpiece(
+                        self.vocab, text, max_input_chars_per_word=max_chars),
+                    msg=text)
+            self.assertEqual(
+                tokenizer.tokenize_many(self.texts), [
+                    reference_wordpiece(
+                        self.vocab, text, max_input_chars_per_word=max_chars)
+                    for text in self.texts
+                ])
+
+    def test_wordpiece(self):
+        self._check(tokenization)
+
+    def test_conv_bert_wordpiece(self):
+        self._check(conv_bert_tokenization)
+
+    def test_edge_cases(self):
+        tokenizer = tokenization.WordpieceTokenizer(
+            vocab=self.vocab, max_input_chars_per_word=5)
+        self.assertEqual(tokenizer.tokenize("unaffable"), ["[UNK]"])
+        self.assertEqual(tokenizer.tokenize("aaaaa"), ["aa", "##aa", "##a"])
+        self.assertEqual(tokenizer.tokenize("abx"), ["[UNK]"])
+        # "##" matches at the beginning, but no piece "###" follows it.
+        self.assertEqual(tokenizer.tokenize("###"), ["[UNK]"])
+        # The piece "##a" matches the beginning of word literally.
+        self.assertEqual(tokenizer.tokenize("##a"), ["##a"])
+        tokenizer = tokenization.WordpieceTokenizer(vocab=self.vocab)
+        self.assertEqual(
+            tokenizer.tokenize("unaffable"), ["un", "##aff", "##able"])
+
+    def test_full_tokenizer(self):
+        vocab_dir = tempfile.mkdtemp()
+        try:
+            vocab_file = os.path.join(vocab_dir, "vocab.txt")
+            with open(vocab_file, "w", encoding="utf8") as f:
+                f.write("\n".join(VOCAB) + "\n")
+            tokenizer = tokenization.FullTokenizer(
+                vocab_file=vocab_file, do_lower_case=True)
+            texts = ["UnAffable, Playing", "中国abc", "Ab ab\tAB"] + self.texts
+            expected = []
+            for text in texts:
+                tokens = []
+                for token in tokenizer.basic_tokenizer.tokenize(text):
+                    tokens.extend(
+                        reference_wordpiece(tokenizer.vocab, token))
+                expected.append(tokens)
+            self.assertEqual(tokenizer.tokenize_many(texts), expected)
+        finally:
+            shutil.rmtree(vocab_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import sys
+sys.path.append("../")
+import unittest
+import numpy as np
+import paddle
+from paddleslim.common.rl_controller.ddpg import DDPG, PrioritizedReplayMemory
+from static_case import StaticCase
+
+
+def _append(memory, values):
+    values = np.asarray(values, dtype='float32')
+    memory.append(
+        np.stack(
+            [values, values], axis=1),
+        values.reshape([-1, 1]),
+        values,
+        np.stack(
+            [values, values], axis=1) + 1,
+        values > 100)
+
+
+class TestPrioritizedReplayMemory(unittest.TestCase):
+    def test_ring_buffer(self):
+        memory = PrioritizedReplayMemory(4, obs_dim=2, act_dim=1)
+        for i in range(6):
+            memory.append([i, i], [i], float(i), [i + 1, i + 1], False)
+        self.assertEqual(memory.size(), 4)
+        # The oldest transitions 0 and 1 are overwritten by 4 and 5.
+        self.assertEqual(memory.obs[:, 0].tolist(), [4., 5., 2., 3.])
+        self.assertEqual(memory.reward.tolist(), [4., 5., 2., 3.])
+        self.assertEqual(memory.next_obs[:, 0].tolist(), [5., 6., 3., 4.])
+
+    def test_batch_append(self):
+        memory = PrioritizedReplayMemory(4, obs_dim=2, act_dim=1)
+        _append(memory, [0., 1.])
+        self.assertEqual(memory.size(), 2)
+        # The batch larger than max_size keeps its last max_size transitions.
+        _append(memory, np.arange(10, 20))
+        self.assertEqual(memory.size(), 4)
+        self.assertEqual(memory.obs[:, 0].tolist(), [18., 19., 16., 17.])
+        self.assertEqual(memory.action[:, 0].tolist(), [18., 19., 16., 17.])
+        _append(memory, [20.])
+        self.assertEqual(memory.obs[:, 0].tolist(), [18., 19., 20., 17.])
+
+    def test_sample_by_priority(self):
+        np.random.seed(0)
+        memory = PrioritizedReplayMemory(8, obs_dim=2, act_dim=1, alpha=1.0)
+        _append(memory, [0., 1., 2.])
+        memory.update_priority([0, 1, 2], [1., 2., 7.])
+        obs, act, reward, next_obs, terminal, index = memory.sample_batch(
+            20000)
+        self.assertEqual(terminal.shape, (20000, 1))
+        self.assertTrue(np.array_equal(reward, index.astype('float32')))
+        # Only the transitions in memory are sampled.
+        freqs = np.bincount(index, minlength=8) / 20000.
+        self.assertTrue(np.allclose(freqs[:3], [0.1, 0.2, 0.7], atol=0.02))
+        self.assertEqual(freqs[3:].sum(), 0)
+
+        # alpha=0 means uniform sampling.
+        memory.alpha = 0.
+        index = memory.sample_batch(20000)[-1]
+        freqs = np.bincount(index, minlength=3) / 20000.
+        self.assertTrue(np.allclose(freqs, [1. / 3] * 3, atol=0.02))
+
+    def test_max_priority(self):
+        memory = PrioritizedReplayMemory(8, obs_dim=2, act_dim=1)
+        _append(memory, [0., 1.])
+        self.assertEqual(memory.priority[:2].tolist(), [1., 1.])
+        # The priorities are the absolute TD errors.
+        memory.update_priority([0, 1], [-5., 0.5])
+        self.assertAlmostEqual(memory.priority[0], 5., places=5)
+        self.assertAlmostEqual(memory._max_priority, 5., places=5)
+        memory.update_priority([0], [2.])
+        self.assertAlmostEqual(memory._max_priority, 5., places=5)
+        # The new transitions get the max priority seen so far.
+        _append(memory, [2.])
+        self.assertAlmostEqual(memory.priority[2], 5., places=5)
+        # The transition with zero TD error can still be sampled.
+        memory.update_priority([1], [0.])
+        self.assertGreater(memory.priority[1], 0)
+
+
+class TestDDPG(StaticCase):
+    def test_batch_update(self):
+        paddle.enable_static()
+        range_tables = [4, 5, 6]
+        controller = DDPG(
+            range_tables,
+            obs_dim=3,
+            controller_batch_size=4,
+            memory_size=16,
+            learn_steps=2)
+        params_dict = controller.param_dict
+        obs = np.random.rand(5, 3).astype('float32')
+        tokens = controller.next_tokens(obs, params_dict)
+        self.assertEqual(tokens.shape, (5, 3))
+        for token in tokens:
+            self.assertTrue(
+                all(0 <= t < r for t, r in zip(token, range_tables)))
+
+        actions = np.random.uniform(-1, 1, [5, 3]).astype('float32')
+        new_params_dict = controller.update(
+            np.random.rand(5),
+            params_dict,
+            obs,
+            actions,
+            np.random.rand(5, 3).astype('float32'),
+            np.zeros([5], dtype='bool'))
+        # All the transitions are appended at once.
+        self.assertEqual(controller.rpm.size(), 5)
+        self.assertEqual(set(new_params_dict.keys()), set(params_dict.keys()))
+        changed = False
+        for name, value in params_dict.items():
+            self.assertEqual(new_params_dict[name].shape, value.shape)
+            changed = changed or not np.allclose(new_params_dict[name],
+                                                 value)
+        self.assertTrue(changed)
+        # The priorities of sampled transitions are their TD errors.
+        self.assertFalse(np.all(controller.rpm.priority[:5] == 1.))
+
+
+if __name__ == '__main__':
+    unittest.main()
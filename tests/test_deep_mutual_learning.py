@@ -85,6 +85,24 @@ class TestDML(unittest.TestCase):
         for epoch_id in range(10):
             train(train_loader, dml_model, dml_optimizer)
 
+    def test_fused_loss(self):
+        models = [Model(), Model(), Model()]
+        dml_model = DML(models)
+        fused_dml_model = DML(models, fuse=True)
+        logits = [
+            paddle.to_tensor(np.random.random([8, 10]).astype("float32"))
+            for _ in range(3)
+        ]
+        labels = paddle.to_tensor(
+            np.random.randint(
+                0, 10, size=[8, 1]).astype("int64"))
+        losses = dml_model.loss(logits, labels)
+        fused_losses = fused_dml_model.loss(logits, labels)
+        for loss, fused_loss in zip(losses, fused_losses):
+            self.assertTrue(
+                np.allclose(
+                    loss.numpy(), fused_loss.numpy(), rtol=1e-4, atol=1e-5))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -14,8 +14,10 @@
 import sys
 sys.path.append("../")
 import unittest
+import numpy as np
 import paddle.fluid as fluid
 from paddleslim.prune import Pruner
+from paddleslim.prune.criterion import distance_sums
 from layers import conv_bn_layer
 from static_case import StaticCase
 
@@ -79,5 +81,19 @@ class TestPrune(StaticCase):
                 self.assertTrue(param.shape == shapes[param.name])
 
 
+class TestDistanceSums(unittest.TestCase):
+    def test_distance_sums(self):
+        value = np.random.random([37, 4, 3, 3]).astype("float32")
+        value[1] = value[0]
+        w = value.reshape([value.shape[0], -1])
+        expected = np.array([
+            np.sqrt(np.sum((w - w[i])**2, axis=1)).sum()
+            for i in range(w.shape[0])
+        ])
+        for chunk_size in [1, 8, 512]:
+            sums = distance_sums(value, chunk_size=chunk_size)
+            self.assertTrue(np.allclose(sums, expected, rtol=1e-4))
+
+
 if __name__ == '__main__':
     unittest.main()
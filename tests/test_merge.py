@@ -14,6 +14,7 @@
 import sys
 sys.path.append("../")
 import unittest
+import numpy as np
 import paddle
 from paddleslim.dist import merge
 from layers import conv_bn_layer
@@ -59,6 +60,51 @@ class TestMerge(StaticCase):
             for op in block.ops:
                 merged_ops.append(op)
         self.assertTrue(len(student_ops) + len(teacher_ops) == len(merged_ops))
+        for op in merged_ops[len(student_ops):]:
+            self.assertTrue(op.has_attr("skip_quant") and
+                            op.attr("skip_quant"))
+
+
+class TestMergeShareParams(StaticCase):
+    def test_merge(self):
+        student_main = paddle.static.Program()
+        student_startup = paddle.static.Program()
+        with paddle.static.program_guard(student_main, student_startup):
+            input = paddle.static.data(name="image", shape=[None, 3, 32, 32])
+            student_predict = conv_bn_layer(input, 8, 3, "s_conv1")
+
+        teacher_main = paddle.static.Program()
+        teacher_startup = paddle.static.Program()
+        with paddle.static.program_guard(teacher_main, teacher_startup):
+            input = paddle.static.data(name="image", shape=[None, 3, 32, 32])
+            conv1 = conv_bn_layer(input, 8, 3, "conv1")
+            teacher_predict = conv_bn_layer(conv1, 8, 3, "conv2")
+
+        place = paddle.CPUPlace()
+        exe = paddle.static.Executor(place)
+        scope = paddle.static.Scope()
+        exe.run(teacher_startup, scope=scope)
+        exe.run(student_startup, scope=scope)
+        merge(
+            teacher_main,
+            student_main, {'image': 'image'},
+            place,
+            scope=scope,
+            share_params=True)
+
+        teacher_weight = np.array(scope.find_var("conv1_weights").get_tensor())
+        merged_weight = np.array(
+            scope.find_var("teacher_conv1_weights").get_tensor())
+        self.assertTrue(np.allclose(teacher_weight, merged_weight))
+
+        out = exe.run(student_main,
+                      feed={
+                          'image':
+                          np.random.random([2, 3, 32, 32]).astype('float32')
+                      },
+                      fetch_list=['teacher_' + teacher_predict.name],
+                      scope=scope)
+        self.assertTrue(out[0].shape == (2, 8, 32, 32))
 
 
 if __name__ == '__main__':
@@ -14,6 +14,7 @@
 import sys
 sys.path.append("../")
 import unittest
+import numpy as np
 from static_case import StaticCase
 import paddle.fluid as fluid
 from paddleslim.prune import Pruner
@@ -83,5 +84,99 @@ class TestPrune(StaticCase):
                 self.assertTrue(param.shape == shapes[param.name])
 
 
+class TestPruneCache(StaticCase):
+    def test_prune_cache(self):
+        main_program = fluid.Program()
+        startup_program = fluid.Program()
+        with fluid.program_guard(main_program, startup_program):
+            input = fluid.data(name="image", shape=[None, 3, 16, 16])
+            conv1 = conv_bn_layer(input, 8, 3, "conv1")
+            conv2 = conv_bn_layer(conv1, 8, 3, "conv2")
+            conv3 = conv_bn_layer(conv2, 8, 3, "conv3")
+
+        place = fluid.CPUPlace()
+        exe = fluid.Executor(place)
+        scope = fluid.Scope()
+        exe.run(startup_program, scope=scope)
+        pruner = Pruner()
+        weight = scope.find_var("conv2_weights").get_tensor()
+        value = np.array(weight)
+        # The smallest filters are 0, 2, 4 and 6.
+        value[::2] *= 0.01
+        weight.set(value, place)
+
+        def prune():
+            pruned_program, param_backup, _ = pruner.prune(
+                main_program,
+                scope,
+                params=["conv2_weights"],
+                ratios=[0.5],
+                place=place,
+                param_backup=True)
+            pruned = np.array(scope.find_var("conv2_weights").get_tensor())
+            for name, backup in param_backup.items():
+                scope.find_var(name).get_tensor().set(backup, place)
+            return pruned
+
+        self.assertTrue(np.allclose(prune(), value[1::2]))
+        self.assertEqual(len(pruner._collections_cache), 1)
+        self.assertEqual(len(pruner._scores_cache), 1)
+        self.assertTrue(np.allclose(prune(), value[1::2]))
+        self.assertEqual(len(pruner._collections_cache), 1)
+
+        # The changed values are scored again.
+        value = np.array(weight)
+        value[::2] *= 1000
+        weight.set(value, place)
+        self.assertTrue(np.allclose(prune(), value[::2]))
+
+    def test_prune_cache_depthwise(self):
+        main_program = fluid.Program()
+        startup_program = fluid.Program()
+        with fluid.program_guard(main_program, startup_program):
+            input = fluid.data(name="image", shape=[None, 3, 16, 16])
+            conv1 = conv_bn_layer(input, 8, 3, "conv1")
+            conv2 = conv_bn_layer(
+                conv1, 8, 3, "conv2", groups=8, use_cudnn=False)
+            conv3 = conv_bn_layer(conv2, 8, 3, "conv3")
+
+        place = fluid.CPUPlace()
+        exe = fluid.Executor(place)
+        scope = fluid.Scope()
+        exe.run(startup_program, scope=scope)
+        pruner = Pruner()
+        weight = scope.find_var("conv1_weights").get_tensor()
+        value = np.array(weight)
+        # The smallest filters are 0, 2, 4 and 6.
+        value[::2] *= 0.01
+        weight.set(value, place)
+
+        def prune():
+            # The groups of depthwise convolution in the graph are changed
+            # by pruning, which shouldn't be seen by the next pruning.
+            pruned_program, param_backup, _ = pruner.prune(
+                main_program,
+                scope,
+                params=["conv1_weights"],
+                ratios=[0.5],
+                place=place,
+                lazy=False,
+                param_backup=True)
+            groups = [
+                op.attr("groups") for op in pruned_program.global_block().ops
+                if op.type == "depthwise_conv2d"
+            ]
+            pruned = np.array(scope.find_var("conv1_weights").get_tensor())
+            for name, backup in param_backup.items():
+                scope.find_var(name).get_tensor().set(backup, place)
+            return pruned, groups
+
+        for _ in range(2):
+            pruned, groups = prune()
+            self.assertTrue(np.allclose(pruned, value[1::2]))
+            self.assertEqual(groups, [4])
+        self.assertEqual(len(pruner._collections_cache), 1)
+
+
 if __name__ == '__main__':
     unittest.main()
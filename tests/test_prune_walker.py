@@ -324,6 +324,53 @@ class TestConv2d(StaticCase):
         self.assertTrue(ret == {'conv1_weights': [0]})
 
 
+class TestVisitedRecord(StaticCase):
+    def test_prune(self):
+        main_program = fluid.Program()
+        startup_program = fluid.Program()
+        with fluid.unique_name.guard():
+            with fluid.program_guard(main_program, startup_program):
+                input = fluid.data(name="image", shape=[1, 3, 16, 16])
+                conv1 = conv_bn_layer(
+                    input, 6, 3, "conv1", groups=1, bias=True, act='relu')
+                conv2 = conv_bn_layer(conv1, 6, 3, "conv2", act='relu')
+
+        graph = GraphWrapper(main_program)
+        cls = PRUNE_WORKER.get("conv2d")
+        weight_var = graph.var("conv1_weights")
+        op = weight_var.outputs()[0]
+        expected = {}
+        pruned_params = []
+        cls(op, pruned_params, {}, True).prune(weight_var, 0, [])
+        for var, axis, _, _ in pruned_params:
+            expected.setdefault(var.name(), []).append(axis)
+
+        visited = VisitedRecord(graph)
+        pruned_params = []
+        worker = cls(op, pruned_params, visited, True)
+        checkpoint = visited.checkpoint()
+        worker.prune(weight_var, 0, [])
+        ret = {}
+        for var, axis, _, _ in pruned_params:
+            ret.setdefault(var.name(), []).append(axis)
+        self.assertTrue(ret == expected)
+
+        # The visited variables are skipped in the next search.
+        pruned_params = []
+        cls(op, pruned_params, visited, True).prune(weight_var, 0, [])
+        self.assertTrue(len(pruned_params) == 0)
+
+        # The visits after checkpoint are removed by rollback.
+        visited.rollback(checkpoint)
+        self.assertTrue(all(len(keys) == 0 for keys in visited.values()))
+        pruned_params = []
+        cls(op, pruned_params, visited, True).prune(weight_var, 0, [])
+        ret = {}
+        for var, axis, _, _ in pruned_params:
+            ret.setdefault(var.name(), []).append(axis)
+        self.assertTrue(ret == expected)
+
+
 class TestPruneWorker(unittest.TestCase):
     def setUp(self):
         paddle.enable_static()
@@ -0,0 +1,66 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import sys
+sys.path.append("../")
+import unittest
+import paddle
+from paddleslim.quant import quant_aware, QuantEvaluator
+from static_case import StaticCase
+from layers import conv_bn_layer
+import numpy as np
+
+
+class TestQuantEvaluator(StaticCase):
+    def test_evaluator(self):
+        image = paddle.static.data(
+            name='image', shape=[None, 1, 28, 28], dtype='float32')
+        conv = conv_bn_layer(image, 8, 3, "conv1")
+        out = paddle.static.nn.fc(conv, size=10, name="fc")
+        main_prog = paddle.static.default_main_program()
+        place = paddle.CPUPlace()
+        exe = paddle.static.Executor(place)
+        exe.run(paddle.static.default_startup_program())
+        for weight_quantize_type in ['abs_max', 'channel_wise_abs_max']:
+            config = {'weight_quantize_type': weight_quantize_type}
+            quant_prog = quant_aware(
+                main_prog.clone(for_test=True),
+                place,
+                config=config,
+                for_test=True)
+            evaluator = QuantEvaluator(quant_prog, place)
+            op_types = [op.type for op in evaluator.program.global_block().ops]
+            self.assertFalse('fake_quantize_abs_max' in op_types)
+            self.assertFalse('fake_channel_wise_quantize_abs_max' in op_types)
+
+            feed = {'image': np.random.random([4, 1, 28, 28]).astype('float32')}
+            expected = exe.run(quant_prog, feed=feed, fetch_list=[out.name])[0]
+            result = exe.run(evaluator.program,
+                             feed=feed,
+                             fetch_list=[out.name])[0]
+            self.assertTrue(np.allclose(expected, result, atol=1e-4))
+
+            # The cache follows the weights after update.
+            weight = paddle.static.global_scope().find_var('fc.w_0')
+            weight.get_tensor().set(
+                np.array(weight.get_tensor()) * 2, place)
+            evaluator.update()
+            expected = exe.run(quant_prog, feed=feed, fetch_list=[out.name])[0]
+            result = exe.run(evaluator.program,
+                             feed=feed,
+                             fetch_list=[out.name])[0]
+            self.assertTrue(np.allclose(expected, result, atol=1e-4))
+
+
+if __name__ == '__main__':
+    unittest.main()
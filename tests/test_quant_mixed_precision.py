@@ -0,0 +1,123 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import sys
+sys.path.append("../")
+import unittest
+import paddle
+from paddleslim.quant import quant_aware, convert, quant_bits_sensitivity, weight_size_costs, search_quant_bits
+from static_case import StaticCase
+from layers import conv_bn_layer
+import numpy as np
+
+
+class TestQuantBitsSearch(StaticCase):
+    def test_search(self):
+        image = paddle.static.data(
+            name='image', shape=[None, 1, 28, 28], dtype='float32')
+        conv = conv_bn_layer(image, 8, 3, "conv1")
+        out = paddle.static.nn.fc(conv, size=10, name="fc")
+        main_prog = paddle.static.default_main_program()
+        place = paddle.CPUPlace()
+        exe = paddle.static.Executor(place)
+        exe.run(paddle.static.default_startup_program())
+        paddle.fluid.io.save_inference_model(
+            dirname='./test_quant_bits',
+            feeded_var_names=[image.name],
+            target_vars=[out],
+            main_program=main_prog.clone(for_test=True),
+            executor=exe,
+            model_filename='model',
+            params_filename='params')
+
+        def sample_generator():
+            for _ in range(32):
+                yield np.random.random([1, 28, 28]).astype('float32'),
+
+        sensitivity = quant_bits_sensitivity(
+            exe,
+            './test_quant_bits',
+            sample_generator=sample_generator,
+            model_filename='model',
+            params_filename='params',
+            batch_size=8,
+            batch_nums=2,
+            scope=paddle.static.Scope())
+        self.assertTrue(len(sensitivity) == 2)
+        for name, losses in sensitivity.items():
+            self.assertEqual(sorted(losses.keys()), [4, 8])
+            self.assertTrue(losses[4] >= losses[8])
+
+        costs = weight_size_costs(main_prog, list(sensitivity.keys()))
+        fp32_size = sum(cost[None] for cost in costs.values())
+        for cost in costs.values():
+            # The 4-bit weights are saved in int8 by convert.
+            self.assertEqual(cost[4], cost[8])
+            self.assertEqual(cost[8], cost[None] / 4)
+        weight_bits_map = search_quant_bits(sensitivity, costs,
+                                            fp32_size / 4)
+        self.assertTrue(
+            sum(costs[name][bits] for name, bits in weight_bits_map.items())
+            <= fp32_size / 4)
+
+        quant_program = quant_aware(
+            main_prog,
+            place,
+            config={'weight_bits_map': weight_bits_map},
+            for_test=True)
+        for op in quant_program.global_block().ops:
+            if op.has_attr('bit_length') and op.input('X')[
+                    0] in weight_bits_map:
+                self.assertEqual(
+                    op.attr('bit_length'), weight_bits_map[op.input('X')[0]])
+
+    def test_convert_mixed_bits(self):
+        image = paddle.static.data(
+            name='image', shape=[None, 1, 28, 28], dtype='float32')
+        conv = conv_bn_layer(image, 8, 3, "conv1")
+        out = paddle.static.nn.fc(conv, size=10, name="fc")
+        main_prog = paddle.static.default_main_program()
+        place = paddle.CPUPlace()
+        exe = paddle.static.Executor(place)
+        exe.run(paddle.static.default_startup_program())
+        weights = [
+            param.name for param in main_prog.all_parameters()
+            if len(param.shape) > 1
+        ]
+        self.assertEqual(len(weights), 2)
+        config = {'weight_bits_map': {weights[0]: 4, weights[1]: 8}}
+        quant_program = quant_aware(
+            main_prog.clone(for_test=True), place, config=config, for_test=True)
+        freezed_program, int8_program = convert(
+            quant_program, place, config=config, save_int8=True)
+        scope = paddle.static.global_scope()
+        for name in weights:
+            self.assertEqual(
+                np.array(scope.find_var(name + '.int8').get_tensor()).dtype,
+                np.int8)
+        feed = {'image': np.random.random([2, 1, 28, 28]).astype('float32')}
+        exe.run(freezed_program, feed=feed, fetch_list=[out.name])
+
+        # The weights of more than 8 bits can't be saved in int8, so they
+        # are rejected before training.
+        config = {'weight_bits_map': {weights[0]: 4, weights[1]: 16}}
+        with self.assertRaises(AssertionError):
+            quant_aware(
+                main_prog.clone(for_test=True),
+                place,
+                config=config,
+                for_test=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
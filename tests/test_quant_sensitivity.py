@@ -0,0 +1,103 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import sys
+sys.path.append("../")
+import os
+import unittest
+import paddle
+from paddleslim.prune import load_sensitivities
+from paddleslim.quant import quant_sensitivity, get_skip_weights
+from static_case import StaticCase
+from layers import conv_bn_layer
+import numpy as np
+
+
+class TestQuantSensitivity(StaticCase):
+    def test_sensitivity(self):
+        image = paddle.static.data(
+            name='image', shape=[None, 1, 28, 28], dtype='float32')
+        conv1 = conv_bn_layer(image, 8, 3, "conv1")
+        conv2 = conv_bn_layer(conv1, 8, 3, "conv2")
+        out = paddle.static.nn.fc(conv2, size=10, name="fc")
+        main_prog = paddle.static.default_main_program()
+        exe = paddle.static.Executor(paddle.CPUPlace())
+        exe.run(paddle.static.default_startup_program())
+        paddle.fluid.io.save_inference_model(
+            dirname='./test_quant_sensitivity',
+            feeded_var_names=[image.name],
+            target_vars=[out],
+            main_program=main_prog.clone(for_test=True),
+            executor=exe,
+            model_filename='model',
+            params_filename='params')
+
+        def sample_generator():
+            # The same samples are used by all the calls.
+            rng = np.random.RandomState(0)
+            for _ in range(32):
+                yield rng.random_sample([1, 28, 28]).astype('float32'),
+
+        sensitivities_file = './quant_sensitivities.data'
+        if os.path.exists(sensitivities_file):
+            os.remove(sensitivities_file)
+        kwargs = dict(
+            sample_generator=sample_generator,
+            model_filename='model',
+            params_filename='params',
+            batch_size=8,
+            batch_nums=2,
+            sensitivities_file=sensitivities_file)
+        scope = paddle.static.Scope()
+        sensitivities = quant_sensitivity(
+            exe, './test_quant_sensitivity', scope=scope, **kwargs)
+        self.assertTrue(len(sensitivities) == 3)
+        self.assertEqual(load_sensitivities(sensitivities_file), sensitivities)
+        for losses in sensitivities.values():
+            self.assertTrue(losses[8] >= 0)
+        # The scales of activations are not left in the scope.
+        self.assertTrue(
+            all(
+                scope.find_var("{}.sensitivity.scale".format(var.name)) is
+                None for var in main_prog.list_vars()))
+
+        # The computed ops are loaded from file and not computed again.
+        loaded = quant_sensitivity(
+            exe,
+            './test_quant_sensitivity',
+            scope=paddle.static.Scope(),
+            num_workers=2,
+            **kwargs)
+        self.assertEqual(loaded, sensitivities)
+
+        # The ops are computed by the worker processes with a new file.
+        os.remove(sensitivities_file)
+        computed = quant_sensitivity(
+            exe,
+            './test_quant_sensitivity',
+            scope=paddle.static.Scope(),
+            num_workers=2,
+            **kwargs)
+        self.assertEqual(load_sensitivities(sensitivities_file), computed)
+        self.assertEqual(set(computed.keys()), set(sensitivities.keys()))
+        for name, losses in sensitivities.items():
+            self.assertAlmostEqual(computed[name][8], losses[8], places=4)
+
+        max_loss = max(losses[8] for losses in sensitivities.values())
+        skip_weights = get_skip_weights(sensitivities, max_loss / 2)
+        self.assertTrue(len(skip_weights) >= 1)
+        self.assertTrue(all(bits is None for bits in skip_weights.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,11 +13,17 @@
 # limitations under the License.
 import sys
 sys.path.append("../")
+import socket
+import threading
 import unittest
 import paddle
 import paddle.fluid as fluid
 from paddleslim.nas import RLNAS
 from paddleslim.analysis import flops
+from paddleslim.common.rl_controller.utils import pack_params, unpack_params, ConnectMessage
+from paddleslim.common.server import Server
+from paddleslim.common.client import Client
+from paddleslim.common.rl_controller.lstm import LSTM
 from static_case import StaticCase
 import numpy as np
 
@@ -129,5 +135,137 @@ class TestRLNAS(StaticCase):
         self.check_chnum_convnum(final_program, current_tokens[0])
 
 
+class TestPackParams(unittest.TestCase):
+    def test_pack_params(self):
+        params_dict = {
+            'fc.w': np.random.rand(4, 3).astype('float32'),
+            'fc.b': np.arange(3).astype('int64')
+        }
+        frames = pack_params(params_dict)
+        unpacked = unpack_params([frames[0]] +
+                                 [frame.tobytes() for frame in frames[1:]])
+        for name, value in params_dict.items():
+            self.assertEqual(unpacked[name].dtype, value.dtype)
+            self.assertTrue(np.array_equal(unpacked[name], value))
+
+
+class AddController(object):
+    """The controller adding the rewards to its parameter."""
+
+    def __init__(self):
+        self.param_dict = {'w': np.zeros([2], dtype='float32')}
+
+    def next_tokens(self, obs, params_dict, is_inference=False):
+        return [params_dict['w'].tolist()] * obs
+
+    def update(self, rewards, params_dict, **kwargs):
+        return {'w': params_dict['w'] + np.float32(rewards)}
+
+
+class TestSyncServer(unittest.TestCase):
+    def setUp(self):
+        # The threads of server are daemons, and Server.close kills the
+        # process, so the server is left running after the test.
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        self.address = ('127.0.0.1', port)
+        self.server = Server(
+            AddController(), self.address, is_sync=True, save_controller=False)
+        self.server.start()
+        self.clients = [
+            Client(AddController(), self.address, 'client_{}'.format(i))
+            for i in range(2)
+        ]
+
+    def _update_in_threads(self, clients, rewards):
+        replies = {}
+
+        def _update(client, reward):
+            replies[client] = client.update(reward)
+
+        threads = [
+            threading.Thread(
+                target=_update, args=(client, reward))
+            for client, reward in zip(clients, rewards)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads, replies
+
+    def _join(self, threads):
+        for thread in threads:
+            thread.join(ConnectMessage.TIMEOUT)
+            # The waiting clients are released when the round is done.
+            self.assertFalse(thread.is_alive())
+
+    def test_sync_round(self):
+        for client in self.clients:
+            client.next_tokens(1)
+            self.assertEqual(client._version, 0)
+        # The params up to date are not sent again.
+        params_dict = self.clients[0]._params_dict
+        self.clients[0].next_tokens(1)
+        self.assertIs(self.clients[0]._params_dict, params_dict)
+
+        threads, replies = self._update_in_threads(self.clients, [1., 2.])
+        self._join(threads)
+        for client in self.clients:
+            self.assertEqual(replies[client], ConnectMessage.WAIT)
+
+        # The gradients of both clients are applied in one round.
+        tokens = self.clients[0].next_tokens(1)
+        self.assertEqual(self.clients[0]._version, 1)
+        self.assertTrue(np.allclose(tokens[0], [3., 3.]))
+
+    def test_client_exit(self):
+        for client in self.clients:
+            client.next_tokens(1)
+        threads, _ = self._update_in_threads(self.clients[:1], [1.])
+        # The round is done when the other client exits.
+        exited = self.clients[1]
+        exited._send(exited._client_socket, ConnectMessage.EXIT)
+        exited._client_socket.recv_multipart()
+        self._join(threads)
+
+        tokens = self.clients[0].next_tokens(1)
+        self.assertEqual(self.clients[0]._version, 1)
+        self.assertTrue(np.allclose(tokens[0], [1., 1.]))
+
+
+class TestLSTMBatchArchs(StaticCase):
+    def test_batch_archs(self):
+        paddle.enable_static()
+        range_tables = [3, 4, 5]
+        controller = LSTM(
+            range_tables, controller_batch_size=2, hidden_size=16)
+        params_dict = controller.param_dict
+        tokens = controller.next_tokens(5, params_dict=params_dict)
+        self.assertEqual(len(tokens), 5)
+        for token in tokens:
+            self.assertTrue(
+                all(0 <= t < r for t, r in zip(token, range_tables)))
+        new_params_dict = controller.update(
+            np.random.rand(5), params_dict=params_dict)
+        for name, value in params_dict.items():
+            self.assertEqual(new_params_dict[name].shape, value.shape)
+        tokens = controller.next_tokens(5, params_dict=new_params_dict)
+        self.assertEqual(len(controller._pred_programs), 1)
+
+    def test_inference_tiles(self):
+        paddle.enable_static()
+        range_tables = [50] * 4
+        controller = LSTM(
+            range_tables, controller_batch_size=2, hidden_size=32)
+        tokens = controller.next_tokens(
+            8, params_dict=controller.param_dict, is_inference=True)
+        self.assertEqual(len(tokens), 8)
+        # Each controller batch gets its own random inputs, so the archs of
+        # the batches are not repeated.
+        tiles = set(str(tokens[i:i + 2]) for i in range(0, 8, 2))
+        self.assertGreater(len(tiles), 1)
+
+
 if __name__ == '__main__':
     unittest.main()
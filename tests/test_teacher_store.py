@@ -0,0 +1,87 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import sys
+sys.path.append("../")
+import tempfile
+import unittest
+import numpy as np
+import paddle
+from paddleslim.dist import save_teacher_outputs, soft_label_loss
+from layers import conv_bn_layer
+from static_case import StaticCase
+
+
+class TestTeacherStore(StaticCase):
+    def test_teacher_store(self):
+        teacher_main = paddle.static.Program()
+        teacher_startup = paddle.static.Program()
+        with paddle.static.program_guard(teacher_main, teacher_startup):
+            input = paddle.static.data(name="image", shape=[None, 3, 16, 16])
+            conv1 = conv_bn_layer(input, 8, 3, "conv1")
+            out = paddle.static.nn.fc(conv1, 10)
+
+        place = paddle.CPUPlace()
+        exe = paddle.static.Executor(place)
+        exe.run(teacher_startup)
+
+        images = [
+            np.random.random([4, 3, 16, 16]).astype('float32')
+            for _ in range(3)
+        ]
+
+        def reader():
+            for image in images:
+                yield {'image': image}
+
+        store = save_teacher_outputs(
+            teacher_main,
+            reader, [conv1.name, out.name],
+            place,
+            tempfile.mkdtemp(),
+            dtype='float32',
+            top_k={out.name: 3})
+        self.assertTrue(store.num_samples == 12)
+
+        ids = [5, 0, 11]
+        conv1_outs = np.concatenate([
+            exe.run(teacher_main.clone(for_test=True),
+                    feed={'image': image},
+                    fetch_list=[conv1.name])[0] for image in images
+        ])
+        logits = np.concatenate([
+            exe.run(teacher_main.clone(for_test=True),
+                    feed={'image': image},
+                    fetch_list=[out.name])[0] for image in images
+        ])
+        outputs = store.get(ids)
+        self.assertTrue(np.allclose(outputs[conv1.name], conv1_outs[ids]))
+        top3 = np.sort(logits[ids], axis=-1)[:, -3:]
+        self.assertTrue(
+            np.allclose(np.sort(outputs[out.name], axis=-1)[:, -3:], top3))
+        self.assertTrue(np.all((outputs[out.name] == -1e9).sum(-1) == 7))
+
+        student_main = paddle.static.Program()
+        with paddle.static.program_guard(student_main):
+            input = paddle.static.data(name="image", shape=[None, 3, 16, 16])
+            student_out = paddle.static.nn.fc(input, 10)
+        store.create_inputs(student_main)
+        with paddle.static.program_guard(student_main):
+            distill_loss = soft_label_loss('teacher_' + out.name,
+                                           student_out.name, student_main)
+        feed = store.feed(ids)
+        self.assertTrue('teacher_' + out.name in feed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+# Copyright (c) 2021  PaddlePaddle Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import sys
+sys.path.append("../")
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import paddle
+from paddleslim.common import tracer, Tracer
+from paddleslim.prune import Pruner
+from static_case import StaticCase
+from layers import conv_bn_layer
+
+
+class TestTracer(unittest.TestCase):
+    def test_nested_spans(self):
+        t = Tracer()
+        with t.span('disabled'):
+            t.counter('count')
+        self.assertEqual(t.summary()['phases'], {})
+
+        t.enable()
+        with t.span('outer', 'walk'):
+            # The name and phase in args are recorded as args.
+            with t.span('inner', 'io', name='x', phase='y'):
+                t.gauge('size', 64)
+            t.counter('count', 2)
+        t.disable()
+        summary = t.summary()
+        walk, io = summary['phases']['walk'], summary['phases']['io']
+        self.assertEqual(walk['count'], 1)
+        self.assertAlmostEqual(walk['self'] + io['self'], walk['total'])
+        self.assertEqual(summary['counters'], {'count': 2})
+        self.assertEqual(summary['gauges'], {'size': 64})
+
+        trace_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, trace_dir)
+        trace_file = os.path.join(trace_dir, 'trace.json')
+        t.export_chrome_trace(trace_file)
+        with open(trace_file) as f:
+            events = json.load(f)['traceEvents']
+        spans = dict((e['name'], e) for e in events if e['ph'] == 'X')
+        self.assertEqual(sorted(spans.keys()), ['inner', 'outer'])
+        self.assertEqual(spans['inner']['cat'], 'io')
+        self.assertEqual(spans['inner']['args'], {'name': 'x', 'phase': 'y'})
+        self.assertTrue('args' not in spans['outer'])
+
+
+class TestPruneTrace(StaticCase):
+    def test_prune(self):
+        main_program = paddle.static.default_main_program()
+        image = paddle.static.data(
+            name="image", shape=[None, 3, 16, 16], dtype='float32')
+        conv1 = conv_bn_layer(image, 8, 3, "conv1")
+        conv2 = conv_bn_layer(conv1, 8, 3, "conv2")
+        place = paddle.CPUPlace()
+        exe = paddle.static.Executor(place)
+        exe.run(paddle.static.default_startup_program())
+
+        tracer.reset()
+        tracer.enable()
+        try:
+            Pruner().prune(
+                main_program,
+                paddle.static.global_scope(),
+                params=["conv1_weights"],
+                ratios=[0.5],
+                place=place)
+        finally:
+            tracer.disable()
+        summary = tracer.summary()
+        for phase in ['prune', 'graph_walk', 'tensor_copy']:
+            self.assertTrue(phase in summary['phases'])
+        self.assertTrue(summary['counters']['pruned_tensor_bytes'] > 0)
+        tracer.reset()
+
+
+if __name__ == '__main__':
+    unittest.main()
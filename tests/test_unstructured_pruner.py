@@ -1,10 +1,12 @@
 import sys
 sys.path.append("../")
+import os
+import tempfile
 import unittest
 from static_case import StaticCase
 import paddle.fluid as fluid
 import paddle
-from paddleslim.prune import UnstructuredPruner
+from paddleslim.prune import UnstructuredPruner, load_sparse_checkpoint
 from layers import conv_bn_layer
 import numpy as np
 
@@ -13,6 +15,7 @@ class TestUnstructuredPruner(StaticCase):
     def __init__(self, *args, **kwargs):
         super(TestUnstructuredPruner, self).__init__(*args, **kwargs)
         paddle.enable_static()
+        self.tmp_dir = tempfile.TemporaryDirectory()
         self._gen_model()
 
     def _gen_model(self):
@@ -54,12 +57,35 @@ class TestUnstructuredPruner(StaticCase):
             place=place,
             prune_params_type='conv1x1_only',
             local_sparsity=False)
+        self.pruner_interval = UnstructuredPruner(
+            self.main_program,
+            'ratio',
+            scope=self.scope,
+            place=place,
+            update_interval=2)
 
     def test_unstructured_prune(self):
         for param in self.main_program.global_block().all_parameters():
             mask_name = param.name + "_mask"
-            mask_shape = self.scope.find_var(mask_name).get_tensor().shape()
-            self.assertTrue(tuple(mask_shape) == param.shape)
+            if param.name in self.pruner.skip_params:
+                self.assertTrue(param.name not in self.pruner.masks)
+                continue
+            t_mask = self.scope.find_var(mask_name).get_tensor()
+            self.assertTrue(tuple(t_mask.shape()) == param.shape)
+            self.assertEqual(np.array(t_mask).dtype, np.bool_)
+
+    def test_export_sparse(self):
+        self.pruner.step()
+        self.pruner.update_params()
+        for fmt in ['bitmap', 'csr']:
+            path = os.path.join(self.tmp_dir.name, fmt)
+            path = self.pruner.export_sparse(
+                self.main_program, path, format=fmt)
+            ckpt = load_sparse_checkpoint(path)
+            for param in self.main_program.all_parameters():
+                value = np.array(self.scope.find_var(param.name).get_tensor())
+                self.assertTrue(np.array_equal(ckpt[param.name], value))
+            ckpt.close()
 
     def test_sparsity(self):
         ori_sparsity = UnstructuredPruner.total_sparse(self.main_program)
@@ -114,6 +140,36 @@ class TestUnstructuredPruner(StaticCase):
         print('current sparsity: {}.'.format(cur_sparsity))
         self.assertGreater(cur_sparsity, ori_sparsity)
 
+    def test_update_interval(self):
+        self.pruner_interval.ratio = 0.3
+        self.pruner_interval.step()
+        threshold = self.pruner_interval.threshold
+        self.pruner_interval.ratio = 0.6
+        self.pruner_interval.step()
+        self.assertEqual(threshold, self.pruner_interval.threshold)
+        self.pruner_interval.step()
+        self.assertGreater(self.pruner_interval.threshold, threshold)
+
+    def test_sparse_pattern(self):
+        pruner = UnstructuredPruner(
+            self.main_program,
+            'ratio',
+            ratio=0.5,
+            scope=self.scope,
+            place=paddle.static.cpu_places()[0],
+            sparse_pattern='2:4')
+        pruner.step()
+        pruner.update_params()
+        self.assertEqual(pruner.threshold, float('inf'))
+        for param in self.main_program.all_parameters():
+            if param.name not in pruner.masks or len(param.shape) != 4:
+                continue
+            if param.shape[1] % 4 != 0:
+                continue
+            value = np.array(self.scope.find_var(param.name).get_tensor())
+            groups = np.moveaxis(value, 1, -1).reshape([-1, 4])
+            self.assertTrue(np.all(np.count_nonzero(groups, axis=1) <= 2))
+
 
 if __name__ == '__main__':
     unittest.main()